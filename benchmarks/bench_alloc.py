@@ -0,0 +1,128 @@
+"""
+Benchmark Allocations
+=====================
+
+Measures the memory held by parsed commands and the memory allocated while executing them, with tracemalloc.
+
+Commands are parsed with the cache of parsed commands disabled. Queries are executed against a registry that caches
+the values of alien numbers and against one that doesn't, i.e. evaluates every alien number anew.
+
+Run from the project root directory:
+
+    python -m benchmarks.bench_alloc
+"""
+import random
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+from merchantsguide.parse_input import parse_input, set_cache_size, PARSE_CACHE_SIZE
+from merchantsguide.registry import Registry
+from merchantsguide.roman2int import int2roman
+from benchmarks.workloads import alien_words
+
+ALIENS = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+
+
+def lines(n: int, rng: random.Random) -> dict:
+    """
+    Generate distinct lines of each type of command.
+
+    :param n: the number of lines of each type
+    :param rng: the random number generator
+    :return: the lines by type
+    """
+    def number():
+        return " ".join(ALIENS[c] for c in int2roman(rng.randrange(1, 4000)))
+
+    return {
+        "NumeralUpdateCommand": [f"{alien} is {rng.choice('IVXLCDM')}" for alien in alien_words(n, rng)],
+        "MineralUpdateCommand": [f"{number()} Silver is {i} Credits" for i in range(n)],
+        "NumberQueryCommand": [f"how much is {number()} ?" for _ in range(n)],
+        "MineralQueryCommand": [f"how many Credits is {number()} Silver ?" for _ in range(n)],
+        "UnknownCommand": [f"what is {i} ?" for i in range(n)]
+    }
+
+
+def retained(inputs: [str]) -> float:
+    """
+    Measure the memory held by the commands parsed from lines.
+
+    :param inputs: the lines
+    :return: the number of bytes per command
+    """
+    commands = [None] * len(inputs)
+    start = tracemalloc.get_traced_memory()[0]
+    for i, line in enumerate(inputs):
+        commands[i] = parse_input(line)
+    return (tracemalloc.get_traced_memory()[0] - start) / len(inputs)
+
+
+class _NoOp:
+    """
+    A command that does nothing, used to measure the overhead of the measurement.
+    """
+
+    def execute(self, registry: Registry):
+        pass
+
+
+def transient(commands: list, registry: Registry) -> (float, float):
+    """
+    Measure the memory allocated while executing commands and the time it takes, one command at a time.
+
+    The peak of the memory allocated by each execution is measured, including its response, but not the overhead of
+    the measurement itself.
+
+    :param commands: the commands
+    :param registry: the registry to execute them against
+    :return: the median peak number of bytes allocated by an execution, and the average time in ns
+    """
+    def peak(cmd) -> int:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        cmd.execute(registry)
+        return tracemalloc.get_traced_memory()[1] - before
+
+    tracemalloc.start()
+    try:
+        no_op = _NoOp()
+        overhead = min(peak(no_op) for _ in range(100))
+        # the median ignores the rare executions that trigger the growth of a table, e.g. of the number cache
+        allocated = median(peak(cmd) for cmd in commands) - overhead
+    finally:
+        tracemalloc.stop()
+    start = perf_counter()
+    for cmd in commands:
+        cmd.execute(registry)
+    elapsed = perf_counter() - start
+    return allocated, elapsed / len(commands) * 1e9
+
+
+def main(n: int = 10000):
+    rng = random.Random(0)
+    set_cache_size(0)
+    by_type = lines(n, rng)
+    print(f"{'command':24}{'bytes held':>12}{'bytes/exec':>12}{'uncached':>12}{'ns/exec':>10}")
+    for name, inputs in by_type.items():
+        tracemalloc.start()
+        size = retained(inputs)
+        tracemalloc.stop()
+        commands = [parse_input(line) for line in inputs]
+
+        results = []
+        for cache_size in [2 * n, 0]:
+            registry = Registry.new(cache_size)
+            for roman, alien in ALIENS.items():
+                registry.update_numeral(alien, roman)
+            registry.update_mineral("Silver", 17)
+            for cmd in commands:
+                cmd.execute(registry)
+            results.append(transient(commands, registry))
+        (cached, _), (uncached, elapsed) = results
+        print(f"{name:24}{size:12.1f}{cached:12.0f}{uncached:12.0f}{elapsed:10.0f}")
+    set_cache_size(PARSE_CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark Bulk Conversion
+=========================
+
+Compares the bulk conversion with NumPy to a loop over roman2int or over alien numbers.
+
+Run from the project root directory, optionally passing the number of items:
+
+    python -m benchmarks.bench_bulk 1000000
+"""
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from merchantsguide.commands import _alien2int
+from merchantsguide.registry import Registry
+from merchantsguide.roman2int import roman2int, roman2int_many, alien2int_many, int2roman
+
+
+def loop(numbers: [str]) -> [int]:
+    values = []
+    for s in numbers:
+        try:
+            values.append(roman2int(s))
+        except ValueError:
+            values.append(-1)
+    return values
+
+
+def alien_loop(numbers: [[str]], registry: Registry) -> [int]:
+    values = []
+    for number in numbers:
+        try:
+            values.append(_alien2int(number, registry))
+        except ValueError:
+            values.append(-1)
+    return values
+
+
+def report(name: str, n: int, f, *args):
+    start = perf_counter()
+    f(*args)
+    elapsed = perf_counter() - start
+    print(f"{name:24}{elapsed * 1e3:10.1f} ms  {elapsed / n * 1e9:8.1f} ns/item")
+
+
+def main(n: int):
+    rng = random.Random(0)
+    numbers = [int2roman(rng.randrange(4000)) for _ in range(n)]
+    print(f"{n} Roman numbers")
+    report("roman2int loop", n, loop, numbers)
+    report("roman2int_many (list)", n, roman2int_many, numbers)
+    array = np.array(numbers)
+    report("roman2int_many (array)", n, roman2int_many, array)
+
+    registry = Registry.new()
+    aliens = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+    for roman, alien in aliens.items():
+        registry.update_numeral(alien, roman)
+    alien_numbers = [[aliens[c] for c in s] for s in numbers]
+    print(f"{n} alien numbers")
+    report("_alien2int loop", n, alien_loop, alien_numbers, registry)
+    report("alien2int_many", n, alien2int_many, alien_numbers, registry.alien_numerals)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
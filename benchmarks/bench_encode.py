@@ -0,0 +1,57 @@
+"""
+Benchmark Encoding
+==================
+
+Compares encoding integers as Roman and alien numbers one at a time and in bulk, and measures the cost of rebuilding
+the alien encoder after a numeral update.
+
+Run from the project root directory, optionally passing the number of integers:
+
+    python -m benchmarks.bench_encode 1000000
+"""
+import random
+import sys
+from time import perf_counter
+
+from merchantsguide.registry import Registry
+from merchantsguide.roman2int import int2roman, int2roman_many
+
+
+def translate(numbers: [int], registry: Registry) -> [str]:
+    # encoding without the precomputed encoder: look up the alien numeral of each Roman numeral
+    reverse = {roman: alien for alien, roman in registry.alien_numerals.items()}
+    return [" ".join([reverse[r] for r in int2roman(n)]) for n in numbers]
+
+
+def report(name: str, n: int, f, *args):
+    start = perf_counter()
+    f(*args)
+    elapsed = perf_counter() - start
+    print(f"{name:24}{elapsed * 1e3:10.1f} ms  {elapsed / n * 1e9:8.1f} ns/item")
+
+
+def main(n: int):
+    rng = random.Random(0)
+    numbers = [rng.randrange(1, 4000) for _ in range(n)]
+    registry = Registry.new()
+    for alien, roman in zip(["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"], "IVXLCDM"):
+        registry.update_numeral(alien, roman)
+
+    print(f"{n} integers")
+    report("int2roman loop", n, lambda: [int2roman(x) for x in numbers])
+    report("int2roman_many", n, int2roman_many, numbers)
+    report("translate loop", n, translate, numbers, registry)
+    report("int2alien loop", n, lambda: [registry.int2alien(x) for x in numbers])
+    report("int2alien_many", n, registry.int2alien_many, numbers)
+
+    rounds = 1000
+    start = perf_counter()
+    for i in range(rounds):
+        registry.update_numeral("bork", "IV"[i % 2])
+        registry.int2alien(1)
+    elapsed = perf_counter() - start
+    print(f"{'update and rebuild':24}{elapsed / rounds * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
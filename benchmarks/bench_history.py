@@ -0,0 +1,68 @@
+"""
+Benchmark History
+=================
+
+Measures the memory held by the price history of a mineral, i.e. by its arrays, and the latency of price updates,
+point-in-time queries and range queries, for a mineral with many price updates.
+
+Run from the project root directory, optionally passing the number of price updates:
+
+    python -m benchmarks.bench_history 1000000
+"""
+import random
+import sys
+from fractions import Fraction
+from time import perf_counter
+
+from merchantsguide.registry import Registry
+
+
+def report(name: str, n: int, f, *args):
+    start = perf_counter()
+    for _ in range(n):
+        f(*args)
+    elapsed = perf_counter() - start
+    print(f"{name:28}{elapsed / n * 1e6:10.2f} us")
+
+
+def main(n: int):
+    rng = random.Random(0)
+    prices = [Fraction(rng.randint(1, 10 ** 6), rng.randint(1, 100)) for _ in range(n)]
+    registry = Registry.new()
+
+    t = perf_counter()
+    for price in prices:
+        registry.update_mineral("Gold", price)
+    elapsed = perf_counter() - t
+    history, _ = registry.price_history["Gold"]
+    series = sum(map(sys.getsizeof, [history.times, history.numerators, history.denominators]))
+    t = perf_counter()
+    registry.get_unit_price_range("Gold", 1, n)
+    build = perf_counter() - t
+    index = sum(map(sys.getsizeof, history._lows + history._highs))
+
+    print(f"{n} price updates of one mineral")
+    print(f"{'update_mineral':28}{elapsed / n * 1e6:10.2f} us")
+    print(f"{'series':28}{series / 2 ** 20:10.1f} MiB  {series / n:6.1f} B/update")
+    print(f"{'range index':28}{index / 2 ** 20:10.1f} MiB  {index / n:6.1f} B/update, built in {build:.2f} s")
+
+    queries = [rng.randint(1, n) for _ in range(10000)]
+    t = perf_counter()
+    for update in queries:
+        registry.get_unit_price_at("Gold", update)
+    print(f"{'get_unit_price_at':28}{(perf_counter() - t) / len(queries) * 1e6:10.2f} us")
+    ranges = [sorted(rng.sample(range(1, n + 1), 2)) for _ in range(10000)]
+    t = perf_counter()
+    for start, end in ranges:
+        registry.get_unit_price_range("Gold", start, end)
+    print(f"{'get_unit_price_range':28}{(perf_counter() - t) / len(ranges) * 1e6:10.2f} us")
+
+    # Appending invalidates the last block of each level of the index only.
+    def update_and_query():
+        registry.update_mineral("Gold", 7)
+        registry.get_unit_price_range("Gold", 1, registry.price_updates)
+    report("update + range query", 1000, update_and_query)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
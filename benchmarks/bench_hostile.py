@@ -0,0 +1,51 @@
+"""
+Benchmark Hostile Inputs
+========================
+
+Measures how fast long malformed alien numbers are rejected, compared to translating all numerals and parsing the
+resulting string before rejecting them.
+
+Each input is a query of an alien number with many numerals that is either not a valid Roman number or contains an
+unknown numeral, early or late. The commands are parsed once; only their execution is timed.
+
+Run from the project root directory, optionally passing the number of numerals per query:
+
+    python -m benchmarks.bench_hostile 10000
+"""
+import sys
+from timeit import repeat
+
+from merchantsguide.commands import NumberQueryCommand
+from merchantsguide.registry import Registry
+from merchantsguide.roman2int import roman2int
+from benchmarks.workloads import hostile_numbers
+
+ALIENS = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+
+
+def translate_first(alien: (str, ...), registry: Registry) -> str:
+    # rejecting the number after translating all numerals and parsing the resulting string
+    try:
+        return str(roman2int("".join(map(registry.get_numeral, alien))))
+    except ValueError as e:
+        return str(e)
+
+
+def main(n: int):
+    registry = Registry.new(number_cache_size=0)
+    for roman, alien in ALIENS.items():
+        registry.update_numeral(alien, roman)
+
+    print(f"{n} numerals per query{'translate first':>20}{'streaming':>14}")
+    for name, alien in hostile_numbers(n, ALIENS).items():
+        cmd = NumberQueryCommand(alien)
+        assert cmd.execute(registry) == translate_first(cmd.alien_number, registry)
+        times = []
+        for stmt in [lambda: translate_first(cmd.alien_number, registry), lambda: cmd.execute(registry)]:
+            number = max(1, 100000 // n)
+            times.append(min(repeat(stmt, number=number, repeat=5)) / number)
+        print(f"{name:24}{times[0] * 1e6:17.1f} us{times[1] * 1e6:11.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,40 @@
+"""
+Benchmark Parallel
+==================
+
+Measures how the throughput of the parallel mode scales with the number of worker processes.
+
+Run from the project root directory, optionally passing the log size and the numbers of workers:
+
+    python -m benchmarks.bench_parallel 1000000 1 2 4 8 16
+"""
+import io
+import os
+import sys
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.parallel import run_parallel
+from merchantsguide.registry import Registry
+from benchmarks.workloads import generate_log
+
+
+def main(n: int, worker_counts: [int]):
+    log = "".join(f"{line}\n" for line in generate_log(n, query_ratio=0.999))
+    print(f"{os.cpu_count()} processors, {n} lines")
+
+    Registry().reset()
+    start = perf_counter()
+    Merchant.run_stream(io.StringIO(log), io.StringIO())
+    print(f"{'serial':>10}  {n / (perf_counter() - start):12.0f} lines/s")
+
+    for workers in worker_counts:
+        Registry().reset()
+        start = perf_counter()
+        run_parallel(io.StringIO(log), io.StringIO(), workers)
+        print(f"{workers:>3} workers  {n / (perf_counter() - start):12.0f} lines/s")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 10 ** 6, args[1:] or [1, 2, 4, 8, 16])
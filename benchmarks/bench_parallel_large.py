@@ -0,0 +1,49 @@
+"""
+Benchmark Parallel Large
+========================
+
+Measures the parallel mode against a registry with many minerals, whose snapshots are expensive to send to the worker
+processes, cf. merchantsguide.parallel.
+
+Each snapshot is published once, no matter how many batches its queries are split into, so the throughput should
+hardly depend on the batch size. The size of a pickled snapshot and the time to publish one are printed for reference.
+
+Run from the project root directory, optionally passing the number of minerals, the log size and the numbers of
+workers:
+
+    python -m benchmarks.bench_parallel_large 10000 1000000 2 4 8
+"""
+import io
+import os
+import sys
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.parallel import run_parallel
+from merchantsguide.registry import Registry
+from benchmarks.workloads import generate_log, ROMAN_NUMERALS
+
+
+def main(minerals: int, n: int, worker_counts: [int]):
+    lines = generate_log(len(ROMAN_NUMERALS) + minerals + n, query_ratio=0.9999, minerals=minerals)
+    # the numeral and mineral definitions are executed up front, the rest is timed
+    setup = len(ROMAN_NUMERALS) + minerals
+    log = "".join(f"{line}\n" for line in lines[setup:])
+    registry = Registry.new()
+    Merchant(registry).run_stream(io.StringIO("".join(f"{line}\n" for line in lines[:setup])), io.StringIO())
+
+    start = perf_counter()
+    size = len(registry.dumps())
+    print(f"{os.cpu_count()} processors, {minerals} minerals, {n} lines, "
+          f"{size} bytes and {(perf_counter() - start) * 1e3:.1f} ms per snapshot")
+
+    for workers in worker_counts:
+        for batch_size in [100, 1000, 10000]:
+            start = perf_counter()
+            run_parallel(io.StringIO(log), io.StringIO(), workers, registry.snapshot(), batch_size)
+            print(f"{workers:>3} workers, batches of {batch_size:>5}  {n / (perf_counter() - start):12.0f} lines/s")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 10000, args[1] if len(args) > 1 else 10 ** 6, args[2:] or [2, 4, 8])
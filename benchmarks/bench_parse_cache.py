@@ -0,0 +1,39 @@
+"""
+Benchmark Parse Cache
+=====================
+
+Measures the streaming throughput on a Zipf-distributed query log for several sizes of the cache of parsed commands.
+
+Run from the project root directory, optionally passing the number of lines and the number of distinct queries:
+
+    python -m benchmarks.bench_parse_cache 1000000 20000
+"""
+import io
+import os
+import sys
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import cache_info, set_cache_size, PARSE_CACHE_SIZE
+from merchantsguide.registry import Registry
+from benchmarks.workloads import zipf_log
+
+
+def main(n: int, distinct: int):
+    log = "".join(f"{line}\n" for line in zipf_log(n, distinct))
+    print(f"{n} lines, {distinct} distinct queries")
+    for size in [0, 256, PARSE_CACHE_SIZE, 65536]:
+        set_cache_size(size)
+        with open(os.devnull, "w") as out:
+            start = perf_counter()
+            Merchant(Registry.new()).run_stream(io.StringIO(log), out)
+            elapsed = perf_counter() - start
+        info = cache_info()
+        hit_ratio = info.hits / (info.hits + info.misses)
+        print(f"cache size {size:>6}{n / elapsed:12.0f} lines/s  hit ratio {hit_ratio:6.1%}  "
+              f"{info.evictions:>8} evictions")
+    set_cache_size(PARSE_CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6, int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
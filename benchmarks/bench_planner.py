@@ -0,0 +1,56 @@
+"""
+Benchmark Planner
+=================
+
+Compares line-by-line execution to executing the whole script with the planner, cf. merchantsguide.planner, on logs
+with increasing shares of updates. The logs are parsed beforehand, because parsing costs the same either way.
+
+Run from the project root directory, optionally passing the number of lines:
+
+    python -m benchmarks.bench_planner 200000
+"""
+import sys
+from time import perf_counter
+
+from merchantsguide.parse_input import parse_input
+from merchantsguide.planner import execute_script
+from merchantsguide.registry import Registry
+from benchmarks.workloads import scaled_log
+
+
+def eager(commands: list, registry: Registry) -> list:
+    responses = [cmd.execute(registry) for cmd in commands]
+    return [res for res in responses if res]
+
+
+def timed(run, commands: list) -> (float, list):
+    """
+    Execute a script with a fresh registry.
+
+    :param run: eager or execute_script
+    :param commands: the script
+    :return: the best time of five runs, and the responses
+    """
+    best = None
+    for _ in range(5):
+        registry = Registry.new()
+        start = perf_counter()
+        responses = run(commands, registry)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, responses
+
+
+def main(n: int):
+    for minerals in [20, 1000]:
+        for ratio in [0.1, 0.5, 0.9, 0.99]:
+            commands = [parse_input(line) for line in scaled_log(n, minerals=minerals, update_ratio=ratio)]
+            slow, expected = timed(eager, commands)
+            fast, responses = timed(execute_script, commands)
+            assert responses == expected
+            print(f"minerals={minerals:<5} updates={ratio:4.0%}  line by line {n / slow:10.0f} lines/s  "
+                  f"planned {n / fast:10.0f} lines/s  {slow / fast:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
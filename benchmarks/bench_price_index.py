@@ -0,0 +1,75 @@
+"""
+Benchmark Price Index
+=====================
+
+Compares the queries for the most valuable minerals and for the minerals in a range of unit prices, answered with the
+registry's price index, against a baseline that scans and sorts all minerals per query. Also measures the cost that
+the index adds to price updates.
+
+Run from the project root directory, optionally passing the number of minerals:
+
+    python -m benchmarks.bench_price_index 50000
+"""
+import random
+import sys
+from fractions import Fraction
+from time import perf_counter
+from timeit import repeat
+
+from merchantsguide.registry import Registry
+
+
+def best(f, number: int) -> float:
+    """
+    Measure the latency of a function.
+
+    :param f: the function
+    :param number: the number of calls per repetition
+    :return: the lowest latency of five repetitions in microseconds
+    """
+    return min(repeat(f, number=number, repeat=5)) / number * 1e6
+
+
+def scan_top(registry: Registry, k: int) -> [str]:
+    return sorted(registry.mineral_prices, key=lambda m: (Fraction(*registry.mineral_prices[m]), m))[:-k - 1:-1]
+
+
+def scan_between(registry: Registry, low: int, high: int) -> [str]:
+    prices = registry.mineral_prices
+    return sorted((m for m, price in prices.items() if low <= Fraction(*price) <= high),
+                  key=lambda m: (Fraction(*prices[m]), m))
+
+
+def main(n: int):
+    rng = random.Random(0)
+    minerals = [f"M{i}" for i in range(n)]
+    registry = Registry.new()
+    for mineral in minerals:
+        registry.update_mineral(mineral, Fraction(rng.randint(1, 10 ** 6), rng.randint(1, 100)))
+    updates = [(rng.choice(minerals), Fraction(rng.randint(1, 10 ** 6), rng.randint(1, 100))) for _ in range(10000)]
+
+    def update():
+        for mineral, price in updates:
+            registry.update_mineral(mineral, price)
+    # a range that holds about 0.1% of the minerals
+    low, high = 5000, 5050
+
+    print(f"{n} minerals")
+    print(f"{'update without index':28}{best(update, 1) / len(updates):10.2f} us")
+    start = perf_counter()
+    registry.get_most_valuable(1)
+    print(f"{'building the index':28}{(perf_counter() - start) * 1000:10.2f} ms")
+    print(f"{'update with index':28}{best(update, 1) / len(updates):10.2f} us")
+    assert registry.get_most_valuable(10) == scan_top(registry, 10)
+    assert registry.get_minerals_between(low, high) == scan_between(registry, low, high)
+
+    for name, indexed, scan in [
+        ("top 10", lambda: registry.get_most_valuable(10), lambda: scan_top(registry, 10)),
+        ("price range", lambda: registry.get_minerals_between(low, high), lambda: scan_between(registry, low, high))
+    ]:
+        fast, slow = best(indexed, 100), best(scan, 1)
+        print(f"{name:28}{fast:10.2f} us indexed{slow:12.2f} us scanned{slow / fast:8.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,70 @@
+"""
+Benchmark Pricing
+=================
+
+Compares the price calculation of mineral queries with float unit prices, Fraction arithmetic and the integer-only
+arithmetic used by MineralQueryCommand, and times complete queries.
+
+Run from the project root directory:
+
+    python -m benchmarks.bench_pricing
+"""
+from fractions import Fraction
+from timeit import repeat
+
+from merchantsguide.commands import MineralQueryCommand, MineralUpdateCommand, NumeralUpdateCommand
+from merchantsguide.registry import Registry
+
+N = 100000
+
+
+def report(name: str, f):
+    t = min(repeat(f, number=N, repeat=5))
+    print(f"{name:28}{t / N * 1e9:8.1f} ns/query")
+
+
+def round_float(units: int, per_unit: float) -> int:
+    """
+    The price calculation of MineralQueryCommand with float unit prices, as it used to be.
+    """
+    return round(units * per_unit)
+
+
+def round_fraction(units: int, per_unit: Fraction) -> int:
+    """
+    The price calculation with Fraction arithmetic.
+    """
+    return round(units * per_unit)
+
+
+def round_exact(units: int, per_unit: (int, int)) -> int:
+    """
+    The price calculation of MineralQueryCommand.
+    """
+    numerator, denominator = per_unit
+    price, remainder = divmod(units * numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and price & 1):
+        price += 1
+    return price
+
+
+def main():
+    units, price, num_units = 42, 57800, 6
+    per_unit_float = price / num_units
+    per_unit = Fraction(price, num_units)
+
+    report("float arithmetic", lambda: round_float(units, per_unit_float))
+    report("Fraction arithmetic", lambda: round_fraction(units, per_unit))
+    per_unit_pair = per_unit.as_integer_ratio()
+    report("integer arithmetic", lambda: round_exact(units, per_unit_pair))
+
+    registry = Registry.new()
+    NumeralUpdateCommand("glob", "I").execute(registry)
+    NumeralUpdateCommand("prok", "V").execute(registry)
+    MineralUpdateCommand("Gold", ["glob", "prok"], price).execute(registry)
+    query = MineralQueryCommand(["glob", "prok"], "Gold")
+    report("MineralQueryCommand.execute", lambda: query.execute(registry))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark Profiling
+===================
+
+Measures the overhead of profiling on the streaming throughput, and prints the profile of a generated log.
+
+Run from the project root directory, optionally passing the number of lines:
+
+    python -m benchmarks.bench_profile 100000
+"""
+import io
+import os
+import sys
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import set_cache_size, PARSE_CACHE_SIZE
+from merchantsguide.profiling import Profiler
+from merchantsguide.registry import Registry
+from benchmarks.workloads import generate_log
+
+
+def run(log: str) -> float:
+    set_cache_size(PARSE_CACHE_SIZE)
+    with open(os.devnull, "w") as out:
+        start = perf_counter()
+        Merchant(Registry.new()).run_stream(io.StringIO(log), out)
+        return perf_counter() - start
+
+
+def main(n: int):
+    log = "".join(f"{line}\n" for line in generate_log(n))
+    profiler = Profiler()
+    baseline = run(log)
+    profiler.enable()
+    profiled = run(log)
+    profiler.disable()
+    disabled = run(log)
+    print(f"{n} lines")
+    for name, elapsed in [("never enabled", baseline), ("enabled", profiled), ("disabled again", disabled)]:
+        print(f"{name:16}{n / elapsed:12.0f} lines/s")
+
+    print(f"{'stage':32}{'count':>10}{'total ms':>10}{'self ms':>10}{'p50 ns':>10}{'p99 ns':>10}")
+    for stage, summary in profiler.report()["stages"].items():
+        if summary["count"]:
+            print(f"{stage:32}{summary['count']:10}{summary['total_ns'] / 1e6:10.1f}{summary['self_ns'] / 1e6:10.1f}"
+                  f"{summary['p50_ns']:10}{summary['p99_ns']:10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
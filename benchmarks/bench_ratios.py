@@ -0,0 +1,148 @@
+"""
+Benchmark Ratios
+================
+
+Measures relative pricing, cf. merchantsguide.ratios, for 10^3 to 10^5 minerals that are connected by as many exchange
+ratios: the cost of a ratio update, and the cost of valuing a mineral through its ratios, compared to a baseline that
+searches the graph of ratios for a mineral with a price in Credits on every query.
+
+The ratios form a random tree with long paths, and are consistent with random unit prices, so that the exact values
+of chained ratios stay small. One mineral of the tree has a price in Credits.
+
+Run from the project root directory, optionally passing the largest number of minerals:
+
+    python -m benchmarks.bench_ratios 100000
+"""
+import random
+import sys
+from fractions import Fraction
+from time import perf_counter
+from timeit import repeat
+
+from merchantsguide.commands import MineralQueryCommand, NumeralUpdateCommand
+from merchantsguide.registry import Registry
+
+
+def best(f, number: int) -> float:
+    """
+    Measure the latency of a function.
+
+    :param f: the function
+    :param number: the number of calls per repetition
+    :return: the lowest latency of five repetitions in microseconds
+    """
+    return min(repeat(f, number=number, repeat=5)) / number * 1e6
+
+
+def search(edges: dict, prices: dict, mineral: str) -> Fraction:
+    """
+    Value a mineral by searching the graph of ratios for a mineral with a price in Credits.
+
+    :param edges: the minerals each mineral has a ratio to, and the ratio of the other mineral's value to its value
+    :param prices: the unit prices in Credits
+    :param mineral: the mineral
+    :return: the unit price
+    """
+    seen, todo = {mineral}, [(mineral, Fraction(1))]
+    while todo:
+        m, ratio = todo.pop()
+        if m in prices:
+            return prices[m] / ratio
+        for other, r in edges[m]:
+            if other not in seen:
+                seen.add(other)
+                todo.append((other, ratio * r))
+    raise ValueError(f"Unknown mineral '{mineral}'")
+
+
+def ratio_tree(n: int, rng: random.Random) -> ([str], [Fraction], list):
+    """
+    Generate minerals with random unit prices, connected by a random tree of ratios that agree with the prices.
+
+    :param n: the number of minerals
+    :param rng: the random number generator
+    :return: the minerals, their unit prices, and the ratios as triples of two minerals and the ratio of their prices
+    """
+    minerals = [f"M{i}" for i in range(n)]
+    values = [Fraction(rng.randint(1, 1000), rng.randint(1, 10)) for _ in range(n)]
+    # each mineral is quoted against one of the few minerals before it, which makes for long paths
+    ratios = [(minerals[i], minerals[j], values[i] / values[j])
+              for i in range(1, n) for j in [rng.randint(max(0, i - 3), i - 1)]]
+    rng.shuffle(ratios)
+    return minerals, values, ratios
+
+
+def ratio_graph(minerals: [str], ratios: list) -> dict:
+    """
+    Build the graph of ratios searched by the baseline.
+
+    :param minerals: the minerals
+    :param ratios: the ratios, cf. ratio_tree
+    :return: the edges, cf. search
+    """
+    edges = {m: [] for m in minerals}
+    for mineral, other, ratio in ratios:
+        edges[mineral].append((other, 1 / ratio))
+        edges[other].append((mineral, ratio))
+    return edges
+
+
+def measure(n: int):
+    """
+    Measure relative pricing for a number of minerals and print the results.
+
+    :param n: the number of minerals
+    :return: None
+    """
+    rng = random.Random(0)
+    minerals, values, ratios = ratio_tree(n, rng)
+
+    registry = Registry.new()
+    start = perf_counter()
+    for mineral, other, ratio in ratios:
+        registry.update_ratio(mineral, other, ratio)
+    update = (perf_counter() - start) / len(ratios) * 1e6
+    registry.update_mineral(minerals[-1], values[-1])
+
+    queried = rng.choices(minerals, k=1000)
+    start = perf_counter()
+    for mineral in queried:
+        registry.get_unit_price(mineral)
+    first = (perf_counter() - start) / len(queried) * 1e6
+
+    def lookup():
+        for mineral in queried:
+            registry.get_unit_price(mineral)
+
+    NumeralUpdateCommand("glob", "I").execute(registry)
+    commands = [MineralQueryCommand(["glob"], mineral) for mineral in queried]
+
+    def query():
+        for cmd in commands:
+            cmd.execute(registry)
+
+    edges = ratio_graph(minerals, ratios)
+    prices = {minerals[-1]: values[-1]}
+    sample = queried[:10]
+    for mineral in sample:
+        assert Fraction(*registry.get_unit_price(mineral)) == search(edges, prices, mineral)
+
+    def baseline():
+        for mineral in sample:
+            search(edges, prices, mineral)
+
+    warm, slow = best(lookup, 1) / len(queried), best(baseline, 1) / len(sample)
+    print(f"{n:7} minerals: {update:8.2f} us per ratio update, {first:8.2f} us per first lookup, "
+          f"{warm:8.2f} us per lookup, {best(query, 1) / len(commands):8.2f} us per mineral query, "
+          f"{slow:10.2f} us per graph search ({slow / warm:.0f}x)")
+
+
+def main(largest: int):
+    n = 1000
+    while n <= largest:
+        measure(n)
+        n *= 10
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
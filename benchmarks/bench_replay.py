@@ -0,0 +1,74 @@
+"""
+Benchmark Replay
+================
+
+Compares replaying a command log from text, with and without the cache of parsed commands, to replaying the log
+compiled to the binary format of merchantsguide.opcodes. Also reports the time to compile the log and the sizes of
+both files.
+
+Run from the project root directory, optionally passing the number of lines:
+
+    python -m benchmarks.bench_replay 1000000
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.opcodes import compile_log, replay
+from merchantsguide.parse_input import set_cache_size, PARSE_CACHE_SIZE
+from merchantsguide.registry import Registry
+from benchmarks.workloads import generate_log
+
+
+def timed(f, *args) -> float:
+    start = perf_counter()
+    f(*args)
+    return perf_counter() - start
+
+
+def replay_text(path: str):
+    with open(path) as f, open(os.devnull, "w") as out:
+        Merchant(Registry.new()).run_stream(f, out)
+
+
+def replay_uncached(path: str):
+    set_cache_size(0)
+    try:
+        replay_text(path)
+    finally:
+        set_cache_size(PARSE_CACHE_SIZE)
+
+
+def replay_binary(path: str):
+    with open(os.devnull, "w") as out:
+        replay(path, out, Registry.new())
+
+
+def main(n: int):
+    directory = tempfile.mkdtemp()
+    text, binary = os.path.join(directory, "log.txt"), os.path.join(directory, "log.bin")
+    try:
+        with open(text, "w") as f:
+            for i in range(0, n, 100000):
+                f.write("".join(f"{line}\n" for line in generate_log(min(100000, n - i), seed=i)))
+        with open(text) as f:
+            elapsed = timed(compile_log, f, binary)
+        print(f"{n} lines, compiled in {elapsed:.2f} s")
+        for name, path in [("text", text), ("binary", binary)]:
+            size = os.path.getsize(path)
+            print(f"{name + ' size':28}{size / 2 ** 20:10.1f} MiB  {size / n:6.1f} B/line")
+        for name, f, path in [("text replay", replay_text, text), ("text replay, no cache", replay_uncached, text),
+                              ("binary replay", replay_binary, binary)]:
+            elapsed = min(timed(f, path) for _ in range(3))
+            print(f"{name:28}{n / elapsed:10.0f} lines/s")
+    finally:
+        for path in [text, binary]:
+            if os.path.exists(path):
+                os.unlink(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
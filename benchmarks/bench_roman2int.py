@@ -0,0 +1,47 @@
+"""
+Benchmark roman2int
+===================
+
+Compares the grammar, the state machine and the index, and reports the size and build time of the index.
+
+Run from the project root directory:
+
+    python -m benchmarks.bench_roman2int
+"""
+import random
+import sys
+from timeit import timeit
+
+from merchantsguide import roman2int as r2i
+
+
+def index_footprint() -> int:
+    """
+    Approximate the memory footprint of the index in bytes, i.e. the containers plus the keys and values they hold.
+
+    :return: the size in bytes
+    """
+    size = sys.getsizeof(r2i.ROMAN_INDEX) + sys.getsizeof(r2i.INT_INDEX)
+    size += sum(map(sys.getsizeof, r2i.INT_INDEX))
+    # small ints are cached by the interpreter, larger ones are not
+    size += sum(sys.getsizeof(v) for v in r2i.ROMAN_INDEX.values() if v > 256)
+    return size
+
+
+def main():
+    r2i.ROMAN_INDEX.clear()
+    r2i.INT_INDEX.clear()
+    build = timeit(r2i.build_index, number=1)
+    print(f"index build time:  {build * 1e3:8.3f} ms")
+    print(f"index footprint:   {index_footprint() / 1024:8.1f} KiB")
+
+    numerals = random.Random(0).choices(r2i.INT_INDEX, k=1000)
+    for name in ["roman2int_grammar", "roman2int", "roman2int_indexed"]:
+        f = getattr(r2i, name)
+        repeat = 10 if name == "roman2int_grammar" else 100
+        t = timeit(lambda: [f(s) for s in numerals], number=repeat)
+        print(f"{name + ':':19}{t / (repeat * len(numerals)) * 1e6:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
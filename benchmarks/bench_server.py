@@ -0,0 +1,64 @@
+"""
+Benchmark Server
+================
+
+Runs a server in a separate process and a load generator with many concurrent connections, each of which sends one
+query at a time and waits for the response. Reports the latency percentiles and the overall throughput.
+
+Run from the project root directory, optionally passing the number of connections and of queries per connection:
+
+    python -m benchmarks.bench_server 1000 100
+"""
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+
+from merchantsguide.server import serve
+
+PORT = 8765
+SETUP = ["glob is I", "prok is V", "pish is X", "tegj is L", "glob prok Gold is 57800 Credits"]
+QUERIES = ["how much is pish tegj glob glob ?", "how many Credits is glob prok Gold ?"]
+
+
+async def client(n: int, latencies: [float]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    for i in range(n):
+        start = time.perf_counter()
+        writer.write(f"{QUERIES[i % len(QUERIES)]}\n".encode())
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(connections: int, n: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write("".join(f"{line}\n" for line in SETUP).encode())
+    for _ in SETUP:
+        await reader.readline()
+    writer.close()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n, latencies) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{connections} connections x {n} queries")
+    print(f"p50 {quantiles[49] * 1e3:8.2f} ms   p99 {quantiles[98] * 1e3:8.2f} ms   {len(latencies) / elapsed:10.0f} req/s")
+
+
+def main(connections: int, n: int):
+    server = multiprocessing.Process(target=serve, args=("127.0.0.1", PORT), daemon=True)
+    server.start()
+    time.sleep(1)
+    try:
+        asyncio.run(load(connections, n))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 100][len(args):]))
@@ -0,0 +1,111 @@
+"""
+Benchmark Shared
+================
+
+Measures the read throughput of 1 to 16 reader processes that answer queries from a shared registry, cf.
+merchantsguide.shared, while the main process keeps updating prices. Also compares the cost of publishing an update
+through shared memory to the cost of pickling a snapshot of the registry, as needed to send it to another process.
+
+Run from the project root directory, optionally passing the duration of each measurement in seconds and the number
+of updates per second:
+
+    python -m benchmarks.bench_shared 2 10000
+"""
+import pickle
+import random
+import sys
+from multiprocessing import Event, Process, Queue
+from time import perf_counter, sleep
+
+from merchantsguide.parse_input import parse_input
+from merchantsguide.shared import SharedRegistry, SharedRegistryView, SharedTables
+from benchmarks.workloads import scaled_log
+
+
+def read(name: str, lines: [str], ready, stop, results: Queue):
+    """
+    Answer queries from a shared registry until stopped, and report the number of queries and retries.
+    """
+    view = SharedRegistryView(SharedTables.attach(name))
+    commands = [parse_input(line) for line in lines]
+    ready.set()
+    queries = 0
+    while not stop.is_set():
+        for cmd in commands:
+            view.execute(cmd)
+        queries += len(commands)
+    results.put((queries, view.retries))
+    view.tables.close()
+
+
+def measure(registry: SharedRegistry, readers: int, lines: [str], updates: [tuple], duration: float,
+            rate: int) -> (float, float, float):
+    """
+    Measure the throughput of readers during concurrent updates.
+
+    :return: the queries per second, the share of retried queries and the updates per second
+    """
+    stop, results = Event(), Queue()
+    events = [Event() for _ in range(readers)]
+    processes = [Process(target=read, args=(registry.tables.name, lines, event, stop, results)) for event in events]
+    for process in processes:
+        process.start()
+    for event in events:
+        event.wait()
+
+    start = perf_counter()
+    done = 0
+    while perf_counter() - start < duration:
+        i = done % len(updates)
+        for mineral, price in updates[i:i + 100]:
+            registry.update_mineral(mineral, price)
+        done += 100
+        # keep to the rate of updates
+        sleep(max(0.0, start + done / rate - perf_counter()))
+    elapsed = perf_counter() - start
+    stop.set()
+    counts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    queries, retries = map(sum, zip(*counts))
+    return queries / elapsed, retries / max(queries, 1), done / elapsed
+
+
+def main(duration: float, rate: int):
+    log = scaled_log(1000, minerals=20, update_ratio=0)
+    definitions, queries = log[:-1000], log[-1000:]
+    registry = SharedRegistry()
+    try:
+        for line in definitions:
+            parse_input(line).execute(registry)
+        rng = random.Random(0)
+        minerals = list(registry.mineral_prices)
+        updates = [(rng.choice(minerals), rng.randint(1, 10000)) for _ in range(10000)]
+
+        start = perf_counter()
+        for mineral, price in updates:
+            registry.tables.set_price(mineral, price, 1)
+        shared = (perf_counter() - start) / len(updates)
+        start = perf_counter()
+        size = len(pickle.dumps(registry.snapshot()))
+        pickled = perf_counter() - start
+        print(f"publishing an update: {shared * 1e6:.2f} us shared, {pickled * 1e6:.2f} us pickled ({size} bytes) "
+              f"per reader")
+
+        commands = [parse_input(line) for line in queries]
+        start = perf_counter()
+        for cmd in commands:
+            cmd.execute(registry)
+        print(f"{'local registry':10}{len(commands) / (perf_counter() - start):12.0f} queries/s, without updates")
+
+        for readers in [1, 2, 4, 8, 16]:
+            throughput, retried, updated = measure(registry, readers, queries, updates, duration, rate)
+            print(f"{readers:2} readers {throughput:12.0f} queries/s {throughput / readers:12.0f} per reader "
+                  f"{retried:8.2%} retried, {updated:8.0f} updates/s")
+    finally:
+        registry.tables.close()
+        registry.tables.unlink()
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0, int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
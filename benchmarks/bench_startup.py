@@ -0,0 +1,60 @@
+"""
+Benchmark Startup
+=================
+
+Measures the wall time of short-lived invocations and the time it takes to import the modules of the package.
+
+Run from the project root directory, optionally passing the number of runs:
+
+    python -m benchmarks.bench_startup 20
+"""
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+
+def wall_time(args: [str], runs: int) -> float:
+    """
+    Measure the median wall time of running the interpreter with some arguments and a single line of input.
+
+    :param args: the arguments
+    :param runs: the number of runs
+    :return: the time in ms
+    """
+    times = []
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run([sys.executable, *args], input="how much is glob ?\n", capture_output=True, check=True,
+                       text=True)
+        times.append(perf_counter() - start)
+    return median(times) * 1e3
+
+
+def import_times() -> [(str, int)]:
+    """
+    Measure the cumulative import times of the modules imported when running a single command.
+
+    :return: the names of the modules and their cumulative import times in us, slowest first
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "merchantsguide"], input="how much is glob ?\n",
+                            capture_output=True, check=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            times.append((name.strip(), int(cumulative)))
+    return sorted(times, key=lambda t: -t[1])
+
+
+def main(runs: int):
+    for name, args in [("python", ["-c", "pass"]), ("import", ["-c", "import merchantsguide.merchant"]),
+                       ("one line", ["-m", "merchantsguide"])]:
+        print(f"{name:12}{wall_time(args, runs):8.1f} ms")
+    print("slowest imports (cumulative):")
+    for name, cumulative in import_times()[:10]:
+        print(f"  {name:36}{cumulative / 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,52 @@
+"""
+Benchmark Store
+===============
+
+Compares a cold start from a store's snapshot with replaying the equivalent update commands.
+
+Run from the project root directory, optionally passing the numbers of minerals:
+
+    python -m benchmarks.bench_store 1000 10000 100000
+"""
+import io
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+from merchantsguide.store import RegistryStore
+from benchmarks.workloads import ROMAN_NUMERALS, alien_words
+
+
+def main(sizes: [int]):
+    rng = random.Random(0)
+    for n in sizes:
+        numerals = alien_words(len(ROMAN_NUMERALS), rng)
+        lines = [f"{alien} is {roman}" for alien, roman in zip(numerals, ROMAN_NUMERALS)]
+        lines += [f"{numerals[0]} {mineral.capitalize()} is {rng.randint(1, 10000)} Credits"
+                  for mineral in alien_words(n, rng)]
+        text = "".join(f"{line}\n" for line in lines)
+
+        start = perf_counter()
+        Merchant(Registry.new()).run_stream(io.StringIO(text), io.StringIO())
+        replay = perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as path:
+            store = RegistryStore(path, sync=False)
+            registry = store.load()
+            Merchant(registry).run_stream(io.StringIO(text), io.StringIO())
+            store.close(registry)
+
+            start = perf_counter()
+            store = RegistryStore(path)
+            store.load()
+            load = perf_counter() - start
+            store.close()
+
+        print(f"{len(lines):>8} updates  replay {replay * 1e3:10.2f} ms  snapshot {load * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,51 @@
+"""
+Benchmark Streaming
+===================
+
+Compares the throughput of the REPL and the streaming mode on generated logs.
+
+Run from the project root directory, optionally passing the log sizes:
+
+    python -m benchmarks.bench_stream 100000 1000000 10000000
+"""
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from merchantsguide import merchant
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+from benchmarks.workloads import generate_log
+
+
+def run_repl(path: str):
+    with open(path) as f, open(os.devnull, "w") as out, redirect_stdout(out):
+        merchant.stdin = f
+        Merchant.repl()
+
+
+def run_stream(path: str):
+    with open(path) as f, open(os.devnull, "w") as out:
+        Merchant.run_stream(f, out)
+
+
+def main(sizes: [int]):
+    for n in sizes:
+        with tempfile.NamedTemporaryFile("w", suffix=".log", delete=False) as f:
+            for i in range(0, n, 100000):
+                f.write("".join(f"{line}\n" for line in generate_log(min(100000, n - i), seed=i)))
+        try:
+            for mode in [run_repl, run_stream]:
+                Registry().reset()
+                start = perf_counter()
+                mode(f.name)
+                elapsed = perf_counter() - start
+                print(f"{n:>10} lines  {mode.__name__:12}{n / elapsed:12.0f} lines/s")
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10 ** 5, 10 ** 6])
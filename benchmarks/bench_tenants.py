@@ -0,0 +1,104 @@
+"""
+Benchmark Tenants
+=================
+
+Measures the memory held by the registries of many tenants with tracemalloc, and the latency of queries with a tenant
+prefix for few and many tenants.
+
+All tenants define the same numerals and their own mineral prices. The tenants either define the numerals one by one,
+or do so and share their numeral tables afterwards, or start from a template registry that defines the numerals.
+
+Run from the project root directory, optionally passing the number of tenants:
+
+    python -m benchmarks.bench_tenants 10000
+"""
+import gc
+import random
+import sys
+import tracemalloc
+from timeit import repeat
+
+from merchantsguide.parse_input import set_cache_size, PARSE_CACHE_SIZE
+from merchantsguide.registry import Registry
+from merchantsguide.tenants import TenantMerchant, Tenants
+from benchmarks.workloads import alien_words
+
+ALIENS = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+
+
+def populate(n: int, minerals: [str], mode: str) -> Tenants:
+    """
+    Create tenants that define the same numerals and their own mineral prices.
+
+    :param n: the number of tenants
+    :param minerals: the minerals that each tenant prices
+    :param mode: "independent", "shared" or "template", cf. the module docstring
+    :return: the tenants
+    """
+    template = Registry.new()
+    if mode == "template":
+        for roman, alien in ALIENS.items():
+            template.update_numeral(alien, roman)
+    tenants = Tenants(template)
+    merchant = TenantMerchant(tenants)
+    for i in range(n):
+        if mode != "template":
+            for roman, alien in ALIENS.items():
+                merchant.single_command(f"@desk{i} {alien} is {roman}")
+        for j, mineral in enumerate(minerals):
+            merchant.single_command(f"@desk{i} glob {mineral} is {i + j + 1} Credits")
+    if mode == "shared":
+        tenants.share_numerals()
+    return tenants
+
+
+def memory(n: int, minerals: [str], mode: str) -> float:
+    """
+    Measure the memory held by the registries of tenants. The cache of parsed commands is disabled meanwhile.
+
+    :param n: the number of tenants
+    :param minerals: the minerals that each tenant prices
+    :param mode: cf. populate
+    :return: the number of bytes per tenant
+    """
+    set_cache_size(0)
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    tenants = populate(n, minerals, mode)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    set_cache_size(PARSE_CACHE_SIZE)
+    del tenants
+    return size / n
+
+
+def latency(n: int, minerals: [str]) -> float:
+    """
+    Measure the latency of a query of a random tenant, by its prefix.
+
+    :param n: the number of tenants
+    :param minerals: the minerals that each tenant prices
+    :return: the latency in microseconds
+    """
+    merchant = TenantMerchant(populate(n, minerals, "template"))
+    rng = random.Random(0)
+    lines = [f"@desk{rng.randrange(n)} how many Credits is pish glob {rng.choice(minerals)} ?" for _ in range(10000)]
+
+    def run():
+        for line in lines:
+            merchant.single_command(line)
+    return min(repeat(run, number=1, repeat=5)) / len(lines) * 1e6
+
+
+def main(n: int):
+    minerals = [w.capitalize() for w in alien_words(20, random.Random(0))]
+    tracemalloc.start()
+    for mode in ["independent", "shared", "template"]:
+        print(f"{n} tenants, {mode:12}{memory(n, minerals, mode) / 1024:8.2f} KiB/tenant")
+    tracemalloc.stop()
+    for tenants in [1, n]:
+        print(f"query of one of {tenants} tenants{latency(tenants, minerals):8.2f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,271 @@
+"""
+Benchmark Suite
+===============
+
+Measures roman2int, parse_input, the execution of each type of command, the rejection of long malformed alien numbers
+and the Merchant end to end on reproducible synthetic workloads, cf. benchmarks.workloads, as well as the startup time
+of the interpreter alone, of importing the package and of running a single command. Compares runs to flag regressions.
+
+Each benchmark times a batch of operations several times and reports the best time per operation. Run the suite from
+the project root directory, saving the results as JSON:
+
+    python -m benchmarks.suite run --output before.json
+    python -m benchmarks.suite run --output after.json --filter merchant
+
+and compare two runs, which exits with status 1 if a benchmark got slower by more than the threshold:
+
+    python -m benchmarks.suite compare before.json after.json --threshold 10
+"""
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from time import perf_counter
+
+from merchantsguide.commands import NumberQueryCommand
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import parse_input, set_backend, set_cache_size, BACKENDS, DEFAULT_BACKEND
+from merchantsguide.parse_input import PARSE_CACHE_SIZE
+from merchantsguide.registry import Registry
+from merchantsguide.roman2int import int2roman, roman2int
+from benchmarks.workloads import hostile_numbers, numbers_of_length, scaled_log
+
+
+def _command_lines(n: int, **params) -> ([str], [str]):
+    """
+    Auxiliary function that generates a log and separates the definitions from the remaining lines.
+
+    :param n: the number of lines after the definitions
+    :param params: the parameters of the workload, cf. scaled_log
+    :return: the definitions and the remaining lines
+    """
+    lines = scaled_log(n, **params)
+    return lines[:-n], lines[-n:]
+
+
+def bench_roman2int(scale: float, length: int):
+    numbers = [int2roman(n) for n in numbers_of_length(length)] * max(1, int(10 * scale))
+
+    def run():
+        for s in numbers:
+            roman2int(s)
+    return run, len(numbers)
+
+
+def bench_parse_input(scale: float, backend: str, cached: bool):
+    _, lines = _command_lines(int(2000 * scale) or 1)
+
+    def run():
+        set_backend(backend)
+        set_cache_size(PARSE_CACHE_SIZE if cached else 0)
+        try:
+            for line in lines:
+                parse_input(line)
+        finally:
+            set_backend(DEFAULT_BACKEND)
+            set_cache_size(PARSE_CACHE_SIZE)
+    return run, len(lines)
+
+
+def bench_execute(scale: float, command: str):
+    definitions, lines = _command_lines(int(50000 * scale) or 1, update_ratio=0.5)
+    registry = Registry.new()
+    for line in definitions:
+        parse_input(line).execute(registry)
+    commands = [cmd for cmd in map(parse_input, lines) if type(cmd).__name__ == command]
+    if command == "UnknownCommand":
+        commands = [parse_input("foo")] * 1000
+
+    def run():
+        for cmd in commands:
+            cmd.execute(registry)
+    return run, len(commands)
+
+
+def bench_hostile(scale: float, kind: str):
+    aliens = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+    registry = Registry.new()
+    for roman, alien in aliens.items():
+        registry.update_numeral(alien, roman)
+    commands = [NumberQueryCommand(hostile_numbers(1000, aliens)[kind])] * max(1, int(100 * scale))
+
+    def run():
+        for cmd in commands:
+            cmd.execute(registry)
+    return run, len(commands)
+
+
+def bench_merchant(scale: float, **params):
+    log = "".join(f"{line}\n" for line in scaled_log(int(20000 * scale) or 1, **params))
+
+    def run():
+        with open(os.devnull, "w") as out:
+            Merchant(Registry.new()).run_stream(io.StringIO(log), out)
+    return run, log.count("\n")
+
+
+def bench_startup(scale: float, command: str):
+    args = {
+        "python": ["-c", "pass"],
+        "import": ["-c", "import merchantsguide.merchant"],
+        "one line": ["-m", "merchantsguide"]
+    }[command]
+    runs = max(1, int(10 * scale))
+
+    def run():
+        for _ in range(runs):
+            subprocess.run([sys.executable, *args], input="how much is glob ?\n", capture_output=True, check=True,
+                           text=True)
+    return run, runs
+
+
+# The benchmarks by name: functions that prepare a workload, given a scale in (0, 1] that shrinks it for quick runs
+# and the parameters of the workload, and return a function to time and the number of operations per call.
+BENCHMARKS = {}
+for length in [1, 4, 8, 15]:
+    BENCHMARKS[f"roman2int[length={length}]"] = bench_roman2int, {"length": length}
+for backend in sorted(BACKENDS):
+    BENCHMARKS[f"parse_input[{backend}]"] = bench_parse_input, {"backend": backend, "cached": False}
+    BENCHMARKS[f"parse_input[{backend},cached]"] = bench_parse_input, {"backend": backend, "cached": True}
+for command in ["NumeralUpdateCommand", "MineralUpdateCommand", "NumberQueryCommand", "MineralQueryCommand",
+                "UnknownCommand"]:
+    BENCHMARKS[f"execute[{command}]"] = bench_execute, {"command": command}
+for kind in ["invalid early", "invalid late", "unknown first", "unknown last", "too long"]:
+    BENCHMARKS[f"hostile[{kind}]"] = bench_hostile, {"kind": kind}
+for name, params in [("default", {}), ("numerals=70", {"numerals": 70}), ("minerals=1000", {"minerals": 1000}),
+                     ("length=12", {"length": 12}), ("updates=50%", {"update_ratio": 0.5})]:
+    BENCHMARKS[f"merchant[{name}]"] = bench_merchant, params
+for command in ["python", "import", "one line"]:
+    BENCHMARKS[f"startup[{command}]"] = bench_startup, {"command": command}
+
+
+def run_benchmark(name: str, scale: float = 1.0, repeat: int = 5) -> dict:
+    """
+    Run a benchmark several times.
+
+    :param name: the name of the benchmark
+    :param scale: the scale of the workload, cf. BENCHMARKS
+    :param repeat: the number of times to run it
+    :return: the result, i.e. the best and median time per operation in nanoseconds and the number of operations
+    """
+    setup, params = BENCHMARKS[name]
+    run, ops = setup(scale, **params)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        times.append(perf_counter() - start)
+    times.sort()
+    return {
+        "ns_per_op": times[0] / ops * 1e9,
+        "median_ns_per_op": times[len(times) // 2] / ops * 1e9,
+        "ops": ops,
+        "repeat": repeat,
+        "params": params
+    }
+
+
+def _metadata() -> dict:
+    """
+    Auxiliary function that describes the environment of a run.
+
+    :return: the description
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor()
+    }
+
+
+def run_suite(names: [str], scale: float = 1.0, repeat: int = 5, verbose: bool = True) -> dict:
+    """
+    Run benchmarks.
+
+    :param names: the names of the benchmarks
+    :param scale: the scale of the workloads, cf. BENCHMARKS
+    :param repeat: the number of times to run each benchmark
+    :param verbose: whether to print each result
+    :return: the results by name, with the metadata of the run
+    """
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(name, scale, repeat)
+        if verbose:
+            print(f"{name:40}{results[name]['ns_per_op']:12.1f} ns/op")
+    return {"metadata": _metadata(), "scale": scale, "results": results}
+
+
+def compare(base: dict, new: dict, threshold: float = 10.0) -> [str]:
+    """
+    Compare the results of two runs and print the relative change of each benchmark that is part of both.
+
+    :param base: the results of the baseline run
+    :param new: the results of the new run
+    :param threshold: the increase of the time per operation in percent that counts as a regression
+    :return: the names of the regressed benchmarks
+    """
+    if base.get("scale") != new.get("scale"):
+        print(f"warning: comparing runs of different scales ({base.get('scale')} and {new.get('scale')})")
+    regressions = []
+    print(f"{'benchmark':40}{'base ns/op':>12}{'new ns/op':>12}{'change':>9}")
+    for name in sorted(base["results"].keys() & new["results"].keys()):
+        before, after = base["results"][name]["ns_per_op"], new["results"][name]["ns_per_op"]
+        change = (after / before - 1) * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:40}{before:12.1f}{after:12.1f}{change:+8.1f}%{flag}")
+    for name in sorted(base["results"].keys() ^ new["results"].keys()):
+        print(f"{name:40} only in {'the base' if name in base['results'] else 'the new'} run")
+    return regressions
+
+
+def main(argv: [str] = None) -> int:
+    parser = ArgumentParser(prog="python -m benchmarks.suite", description="Run and compare benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("--output", metavar="FILE", help="save the results as JSON to FILE")
+    run.add_argument("--filter", metavar="TEXT", help="only run the benchmarks whose name contains TEXT")
+    run.add_argument("--scale", type=float, default=1.0, help="scale the workloads, e.g. 0.1 for a quick run")
+    run.add_argument("--repeat", type=int, default=5, help="run each benchmark this many times (default: 5)")
+    cmp = commands.add_parser("compare", help="compare the results of two runs")
+    cmp.add_argument("base", help="the results of the baseline run")
+    cmp.add_argument("new", help="the results of the new run")
+    cmp.add_argument("--threshold", type=float, default=10.0,
+                     help="flag benchmarks that got slower by more than this many percent (default: 10)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+        results = run_suite(names, args.scale, args.repeat)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Workloads
+=========
+
+Generators of synthetic command logs for the benchmarks.
+"""
+import random
+
+# Alien numerals are random pronounceable words, one for each Roman numeral.
+ROMAN_NUMERALS = "IVXLCDM"
+
+
+def alien_words(n: int, rng: random.Random) -> [str]:
+    """
+    Generate distinct lower case words to be used as alien numerals.
+
+    :param n: the number of words
+    :param rng: the random number generator
+    :return: the words
+    """
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+def generate_log(n: int, seed: int = 0, query_ratio: float = 0.9, minerals: int = 20) -> [str]:
+    """
+    Generate a command log that starts by defining the numerals and mixes updates and queries afterwards.
+
+    :param n: the number of lines
+    :param seed: the random seed
+    :param query_ratio: the share of queries among the lines after the numeral definitions
+    :param minerals: the number of distinct minerals
+    :return: the lines, without line breaks
+    """
+    rng = random.Random(seed)
+    numerals = dict(zip(alien_words(len(ROMAN_NUMERALS), rng), ROMAN_NUMERALS))
+    by_roman = {roman: alien for alien, roman in numerals.items()}
+    mineral_names = [w.capitalize() for w in alien_words(minerals, rng)]
+    # a few alien numbers that are valid and a few that are not
+    numbers = [" ".join(by_roman[c] for c in roman) for roman in ["I", "IV", "XLII", "MCMXCIX", "CCCXXXIII", "IIII"]]
+
+    lines = [f"{alien} is {roman}" for alien, roman in numerals.items()]
+    lines += [f"{by_roman['I']} {mineral} is {rng.randint(1, 10000)} Credits" for mineral in mineral_names]
+    while len(lines) < n:
+        r = rng.random()
+        if r >= query_ratio:
+            lines.append(f"{rng.choice(numbers)} {rng.choice(mineral_names)} is {rng.randint(1, 10000)} Credits")
+        elif r < query_ratio / 2:
+            lines.append(f"how much is {rng.choice(numbers)} ?")
+        else:
+            lines.append(f"how many Credits is {rng.choice(numbers)} {rng.choice(mineral_names)} ?")
+    return lines[:n]
+
+
+def zipf_log(n: int, distinct: int, s: float = 1.1, seed: int = 0, minerals: int = 20) -> [str]:
+    """
+    Generate a query log whose lines are drawn from a fixed set of distinct queries with Zipf-distributed frequencies.
+
+    The log starts by defining the numerals and the prices of all minerals.
+
+    :param n: the number of query lines
+    :param distinct: the number of distinct queries
+    :param s: the exponent of the Zipf distribution; the k-th most frequent query is drawn with weight 1 / k ** s
+    :param seed: the random seed
+    :param minerals: the number of distinct minerals
+    :return: the lines, without line breaks
+    :raise ValueError: if there are fewer than `distinct` possible queries
+    """
+    from itertools import accumulate
+    from merchantsguide.roman2int import int2roman
+
+    if distinct > 3999 * (minerals + 1):
+        raise ValueError(f"There are only {3999 * (minerals + 1)} distinct queries")
+    rng = random.Random(seed)
+    numerals = dict(zip(alien_words(len(ROMAN_NUMERALS), rng), ROMAN_NUMERALS))
+    by_roman = {roman: alien for alien, roman in numerals.items()}
+    mineral_names = [w.capitalize() for w in alien_words(minerals, rng)]
+
+    queries = set()
+    while len(queries) < distinct:
+        number = " ".join(by_roman[c] for c in int2roman(rng.randrange(1, 4000)))
+        if rng.random() < 0.5:
+            queries.add(f"how much is {number} ?")
+        else:
+            queries.add(f"how many Credits is {number} {rng.choice(mineral_names)} ?")
+    queries = sorted(queries)
+    rng.shuffle(queries)
+
+    lines = [f"{alien} is {roman}" for alien, roman in numerals.items()]
+    lines += [f"{by_roman['I']} {mineral} is {rng.randint(1, 10000)} Credits" for mineral in mineral_names]
+    weights = list(accumulate(1 / k ** s for k in range(1, distinct + 1)))
+    return lines + rng.choices(queries, cum_weights=weights, k=n)
+
+
+def numbers_of_length(length: int) -> [int]:
+    """
+    List the integers whose Roman representation has a given number of numerals.
+
+    :param length: the number of numerals, 1 <= length <= 15
+    :return: the integers
+    :raise ValueError: if no integer has that many numerals
+    """
+    from merchantsguide.roman2int import int2roman
+
+    numbers = [n for n in range(1, 4000) if len(int2roman(n)) == length]
+    if not numbers:
+        raise ValueError(f"No Roman number has {length} numerals")
+    return numbers
+
+
+def scaled_log(n: int, numerals: int = 7, minerals: int = 20, length: int = 4, update_ratio: float = 0.1,
+               seed: int = 0) -> [str]:
+    """
+    Generate a command log with a configurable number of numerals and minerals, length of numbers and mix of commands.
+
+    The log starts by defining the numerals and the prices of all minerals. Afterwards, queries are mixed with updates,
+    which redefine the price of a mineral or, occasionally, an alien numeral as its current Roman numeral.
+
+    :param n: the number of lines after the definitions
+    :param numerals: the number of alien numerals, at least 7; they are distributed evenly over the Roman numerals
+    :param minerals: the number of distinct minerals
+    :param length: the number of numerals of the alien numbers, 1 <= length <= 15
+    :param update_ratio: the share of updates
+    :param seed: the random seed
+    :return: the lines, without line breaks
+    :raise ValueError: if there are fewer alien numerals than Roman numerals
+    """
+    from merchantsguide.roman2int import int2roman
+
+    if numerals < len(ROMAN_NUMERALS):
+        raise ValueError(f"At least {len(ROMAN_NUMERALS)} alien numerals are needed")
+    rng = random.Random(seed)
+    words = alien_words(numerals, rng)
+    rng.shuffle(words)
+    by_roman = {roman: words[i::len(ROMAN_NUMERALS)] for i, roman in enumerate(ROMAN_NUMERALS)}
+    mineral_names = [w.capitalize() for w in alien_words(minerals, rng)]
+    values = numbers_of_length(length)
+
+    def number():
+        return " ".join(rng.choice(by_roman[c]) for c in int2roman(rng.choice(values)))
+
+    lines = [f"{alien} is {roman}" for roman, aliens in by_roman.items() for alien in aliens]
+    lines += [f"{by_roman['I'][0]} {mineral} is {rng.randint(1, 10000)} Credits" for mineral in mineral_names]
+    for _ in range(n):
+        r = rng.random()
+        if r < update_ratio / 10:
+            roman = rng.choice(ROMAN_NUMERALS)
+            lines.append(f"{rng.choice(by_roman[roman])} is {roman}")
+        elif r < update_ratio:
+            lines.append(f"{number()} {rng.choice(mineral_names)} is {rng.randint(1, 10000)} Credits")
+        elif r < (1 + update_ratio) / 2:
+            lines.append(f"how much is {number()} ?")
+        else:
+            lines.append(f"how many Credits is {number()} {rng.choice(mineral_names)} ?")
+    return lines
+
+
+def hostile_numbers(n: int, aliens: dict) -> dict:
+    """
+    Generate long malformed alien numbers, i.e. ones that are not valid Roman numbers or contain an unknown numeral.
+
+    :param n: the number of numerals of each
+    :param aliens: an alien numeral for each Roman numeral
+    :return: the numbers by description
+    """
+    ones = [aliens["I"]] * n
+    return {
+        "invalid early": ones,
+        "invalid late": [aliens["M"]] * 3 + [aliens["X"], aliens["L"]] + ones[5:],
+        "unknown first": ["flub"] + [aliens["M"]] * (n - 1),
+        "unknown last": ones[1:] + ["flub"],
+        "too long": [aliens["M"], aliens["D"], aliens["C"]] * (n // 3)
+    }
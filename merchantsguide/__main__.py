@@ -3,8 +3,95 @@ Package Main Script
 ===================
 
 Executes a REPL that runs until an EOF is received.
+If the input is not interactive, e.g. piped from a file, it is executed in buffered chunks instead.
+Alternatively, serves clients on a socket, cf. merchantsguide.server.
+Optionally, keeps separate registries for several tenants, cf. merchantsguide.tenants.
+Command logs can be compiled to a binary format and replayed, cf. merchantsguide.opcodes.
+Non-interactive input can also be executed as a whole, skipping dead updates, cf. merchantsguide.planner.
 """
+from argparse import ArgumentParser
+from sys import stdin, stdout
 
 from merchantsguide.merchant import Merchant
 
-Merchant().repl()
+parser = ArgumentParser(prog="python -m merchantsguide", description="A galactic mineral trading utility.")
+parser.add_argument("--workers", type=int, metavar="N",
+                    help="evaluate queries in N worker processes (non-interactive input only)")
+parser.add_argument("--store", metavar="DIR",
+                    help="load the numerals and prices from DIR on startup and persist all updates there")
+parser.add_argument("--serve", metavar="[HOST:]PORT",
+                    help="serve clients on a TCP port instead of reading from stdin")
+parser.add_argument("--unix", metavar="PATH",
+                    help="serve clients on a Unix domain socket instead of reading from stdin")
+parser.add_argument("--parse-cache", type=int, metavar="N",
+                    help="cache the commands parsed from the N most recently used input lines (default: 4096)")
+parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                    help="profile the stages of the command pipeline and write the latencies as JSON to FILE "
+                         "(default: stderr) on exit and on SIGUSR1")
+parser.add_argument("--tenants", action="store_true",
+                    help="keep separate numerals and prices per tenant, selected by the prefix '@NAME' of a command "
+                         "or, for the following commands, by a line '@NAME'")
+parser.add_argument("--compile", metavar="FILE",
+                    help="compile the commands read from stdin to the binary format in FILE instead of executing them")
+parser.add_argument("--replay", metavar="FILE",
+                    help="execute the commands compiled to FILE instead of reading from stdin")
+parser.add_argument("--batch", action="store_true",
+                    help="read all of stdin first and skip the updates whose effect is never observed; the price "
+                         "history then only holds the prices that were read or final")
+args = parser.parse_args()
+if args.tenants and (args.store or args.workers):
+    parser.error("--tenants cannot be combined with --store or --workers")
+if args.tenants and (args.compile or args.replay):
+    parser.error("--tenants cannot be combined with --compile or --replay")
+if args.batch and (args.store or args.workers or args.tenants):
+    parser.error("--batch cannot be combined with --store, --workers or --tenants")
+
+if args.profile:
+    import atexit
+    import signal
+    from merchantsguide.profiling import Profiler
+    profiler = Profiler()
+    profiler.enable()
+    atexit.register(profiler.dump, args.profile)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.dump(args.profile))
+
+if args.parse_cache is not None:
+    from merchantsguide.parse_input import set_cache_size
+    set_cache_size(args.parse_cache)
+
+store = registry = tenants = None
+if args.store:
+    from merchantsguide.store import RegistryStore
+    store = RegistryStore(args.store)
+    registry = store.load()
+
+if args.tenants:
+    from merchantsguide.tenants import TenantMerchant, Tenants
+    tenants = Tenants()
+
+try:
+    if args.compile:
+        from merchantsguide.opcodes import compile_log
+        compile_log(stdin, args.compile)
+    elif args.replay:
+        from merchantsguide.opcodes import replay
+        replay(args.replay, stdout, registry)
+    elif args.serve or args.unix:
+        from merchantsguide.server import serve
+        host, _, port = (args.serve or "").rpartition(":")
+        serve(host or None, int(port) if port else None, args.unix, registry, tenants)
+    elif args.workers and not stdin.isatty():
+        from merchantsguide.parallel import run_parallel
+        run_parallel(stdin, stdout, args.workers, registry)
+    else:
+        merchant = Merchant(registry) if tenants is None else TenantMerchant(tenants)
+        if stdin.isatty():
+            merchant.repl()
+        elif args.batch:
+            merchant.run_batch(stdin, stdout)
+        else:
+            merchant.run_stream(stdin, stdout)
+finally:
+    if store:
+        store.close(registry)
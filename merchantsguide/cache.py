@@ -0,0 +1,155 @@
+"""
+Cache
+=====
+
+Bounded least-recently-used caches that count hits, misses and evictions.
+"""
+from collections import OrderedDict, namedtuple
+
+# Statistics of a cache, cf. LRUCache.info.
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry when it is full.
+    """
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize an empty cache.
+
+        :param maxsize: the maximum number of entries; a cache of size 0 stores nothing
+        """
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Retrieve the value cached for a key and mark it as recently used.
+
+        :param key: the key
+        :param default: the value to return on a miss
+        :return: the cached value, or default
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Cache a value, evicting the least recently used entries if the cache is full.
+
+        :param key: the key
+        :param value: the value
+        :return: None
+        """
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._forget(evicted)
+
+    def pop(self, key):
+        """
+        Remove a key from the cache, if present. Doesn't count as an eviction.
+
+        :param key: the key
+        :return: None
+        """
+        if self._entries.pop(key, self) is not self:
+            self._forget(key)
+
+    def clear(self):
+        """
+        Remove all entries and reset the statistics.
+
+        :return: None
+        """
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        """
+        Report the cache statistics.
+
+        :return: the statistics
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def _forget(self, key):
+        """
+        Hook that is called whenever a key is evicted or removed.
+
+        :param key: the key
+        :return: None
+        """
+
+
+class AlienNumberCache(LRUCache):
+    """
+    Caches the values of alien numbers, keyed by tuples of alien numerals.
+
+    Keeps track of the numerals used by each key, so that all entries that use a numeral can be invalidated when the
+    numeral is updated.
+    """
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize an empty cache.
+
+        :param maxsize: the maximum number of entries
+        """
+        super().__init__(maxsize)
+        self._keys_by_numeral = {}
+
+    def put(self, key: tuple, value: int):
+        """
+        Cache the value of an alien number.
+
+        :param key: the alien number as a tuple of alien numerals
+        :param value: its value
+        :return: None
+        """
+        known = key in self._entries
+        super().put(key, value)
+        if not known and key in self._entries:
+            for numeral in set(key):
+                self._keys_by_numeral.setdefault(numeral, set()).add(key)
+
+    def invalidate(self, numeral: str):
+        """
+        Remove all entries whose key uses an alien numeral.
+
+        :param numeral: the alien numeral
+        :return: None
+        """
+        for key in self._keys_by_numeral.pop(numeral, ()):
+            self.pop(key)
+
+    def clear(self):
+        super().clear()
+        self._keys_by_numeral.clear()
+
+    def _forget(self, key: tuple):
+        for numeral in set(key):
+            keys = self._keys_by_numeral.get(numeral)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_numeral[numeral]
@@ -5,34 +5,81 @@ Commands
 These commands update the mineral and numeral repository and answer queries.
 """
 from abc import ABC, abstractmethod
+from fractions import Fraction
 
-from merchantsguide.roman2int import roman2int
+from merchantsguide.roman2int import fold_roman, roman2int, MAX_LENGTH
 from merchantsguide.registry import Registry
 
 
-def _alien2roman(alien: [str]):
+def _alien2int(alien: (str, ...), registry: Registry) -> int:
     """
-    Auxiliary function that translates alien to Roman numerals.
+    Auxiliary function that calculates the value of an alien number.
 
-    :param alien: a list of alien numerals
-    :return: the corresponding string of Roman numerals
+    The Roman numerals are folded into the value one by one, without joining them into a string, which stops at the
+    first unknown numeral or the first numeral that breaks the rules of Roman numbers. Values are cached by the registry
+    until one of their numerals is updated.
+
+    The errors are those of translating all numerals first and parsing the result: an unknown numeral is reported
+    before an invalid Roman number, which is reported with the whole translation.
+
+    :param alien: a tuple of alien numerals
+    :param registry: the registry that defines the numerals
+    :return: the value of the alien number
+    :raise ValueError: if a numeral is unknown or the numerals don't form a valid Roman number
     """
-    return "".join(map(Registry().get_numeral, alien))
+    # Longer numbers are invalid unless some numerals stand for nothing, so don't hash them only to miss the cache.
+    cached = len(alien) <= MAX_LENGTH
+    cache = registry.number_cache
+    value = cache.get(alien) if cached else None
+    if value is None:
+        numerals = registry.alien_numerals
+        value = fold_roman(alien, numerals)
+        if value is None:
+            try:
+                roman = "".join(map(numerals.__getitem__, alien))
+            except KeyError as e:
+                # the first unknown numeral
+                roman = registry.get_numeral(e.args[0])
+            # roman2int stops at the first invalid numeral, too
+            value = roman2int(roman)
+        if cached:
+            cache.put(alien, value)
+    return value
+
+
+def _price(units: int, numerator: int, denominator: int) -> int:
+    """
+    Auxiliary function that calculates the price of a number of units, rounded to the nearest integer.
+
+    :param units: the number of units
+    :param numerator: the numerator of the unit price
+    :param denominator: the (positive) denominator of the unit price
+    :return: round(units * numerator / denominator) in integer arithmetic, i.e. with ties to even
+    """
+    price, remainder = divmod(units * numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and price & 1):
+        price += 1
+    return price
 
 
 class BaseCommand(ABC):  # pragma: no cover
     """
     Abstract command that either updates the registry or answers a query.
+
+    Commands are compact: they don't have an instance dictionary, and alien numbers are kept as tuples of numerals.
+    They are not modified once constructed, so that they can be shared, cf. parse_input.
     """
+    __slots__ = ()
 
     def __repr__(self):
         return f"{type(self).__name__}"
 
     @abstractmethod
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Execute a command and return its output, if any.
 
+        :param registry: the registry to update or query, defaults to the shared default registry
         :raise NotImplementedError
         """
         raise NotImplementedError()
@@ -42,6 +89,7 @@ class NumeralUpdateCommand(BaseCommand):
     """
     Updates the Roman numeral value of an alien numeral in the registry.
     """
+    __slots__ = ("alien_numeral", "roman_numeral")
 
     def __init__(self, alien_numeral: str, roman_numeral: str):
         """
@@ -58,19 +106,23 @@ class NumeralUpdateCommand(BaseCommand):
     def __repr__(self):
         return f"{super().__repr__()}: set {self.alien_numeral} to {self.roman_numeral}"
 
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Update the repository with the key-value pair provided on init.
 
+        :param registry: the registry to update, defaults to the shared default registry
         :return: None
         """
-        Registry().update_numeral(self.alien_numeral, self.roman_numeral)
+        if registry is None:
+            registry = Registry.default()
+        registry.update_numeral(self.alien_numeral, self.roman_numeral)
 
 
 class MineralUpdateCommand(BaseCommand):
     """
     Updates the price of a mineral in the registry.
     """
+    __slots__ = ("mineral", "units", "price")
 
     def __init__(self, mineral: str, units: [str], price: int):
         """
@@ -79,58 +131,104 @@ class MineralUpdateCommand(BaseCommand):
         On execution, the per-unit price is calculated and the registry is updated with it.
 
         :param mineral: The name of a mineral
-        :param units: An alien number representation as a list of numerals
+        :param units: An alien number representation as a sequence of numerals
         :param price: The price of the given number of units of the given mineral
         """
         self.mineral = mineral
-        self.units = units
+        self.units = tuple(units)
         self.price = price
 
     def __repr__(self):
         return f"{super().__repr__()}: set the price of {' '.join(self.units)} {self.mineral} to {self.price}"
 
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Update the repository with the calculated price per unit.
 
-        Price per unit is calculated by dividing the price by the number of units.
+        Price per unit is calculated by dividing the price by the number of units, and kept as an exact fraction.
 
+        :param registry: the registry to update, defaults to the shared default registry
         :return: None
         """
+        if registry is None:
+            registry = Registry.default()
         try:
-            roman = _alien2roman(self.units)
-            num_units = roman2int(roman)
+            num_units = _alien2int(self.units, registry)
         except ValueError as e:
             return str(e)
 
-        Registry().update_mineral(self.mineral, self.price/num_units)
+        registry.update_mineral(self.mineral, Fraction(self.price, num_units))
+
+
+class RatioUpdateCommand(BaseCommand):
+    """
+    Updates the price of a mineral relative to another mineral in the registry.
+    """
+    __slots__ = ("mineral", "units", "other", "other_units")
+
+    def __init__(self, mineral: str, units: [str], other: str, other_units: [str]):
+        """
+        Initialize a RatioUpdateCommand with the number of units of a mineral that are worth some units of another.
+
+        :param mineral: The name of a mineral
+        :param units: An alien number representation as a sequence of numerals
+        :param other: The name of the other mineral
+        :param other_units: The number of units of the other mineral, as a sequence of numerals
+        """
+        self.mineral = mineral
+        self.units = tuple(units)
+        self.other = other
+        self.other_units = tuple(other_units)
+
+    def __repr__(self):
+        return (f"{super().__repr__()}: set the value of {' '.join(self.units)} {self.mineral} to "
+                f"{' '.join(self.other_units)} {self.other}")
+
+    def execute(self, registry: Registry = None):
+        """
+        Update the repository with the ratio of the unit prices of the minerals.
+
+        :param registry: the registry to update, defaults to the shared default registry
+        :return: None, or an error message if a number is invalid or the ratio contradicts earlier ratios
+        """
+        if registry is None:
+            registry = Registry.default()
+        try:
+            num_units = _alien2int(self.units, registry)
+            num_other_units = _alien2int(self.other_units, registry)
+            registry.update_ratio(self.mineral, self.other, Fraction(num_other_units, num_units))
+        except ValueError as e:
+            return str(e)
 
 
 class NumberQueryCommand(BaseCommand):
     """
     Translates alien numbers into decimal.
     """
+    __slots__ = ("alien_number",)
 
     def __init__(self, alien_number: [str]):
         """
         Initializes the NumberQueryCommand with a number given in alien number format.
 
-        :param alien_number: An alien number representation as a list of numerals
+        :param alien_number: An alien number representation as a sequence of numerals
         """
-        self.alien_number = alien_number
+        self.alien_number = tuple(alien_number)
 
     def __repr__(self):
         return f"{super().__repr__()}: calculates the decimal value of {' '.join(self.alien_number)}"
 
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Calculate the decimal value of the alien number.
 
+        :param registry: the registry to query, defaults to the shared default registry
         :return: The query answer string
         """
+        if registry is None:
+            registry = Registry.default()
         try:
-            roman = _alien2roman(self.alien_number)
-            value = roman2int(roman)
+            value = _alien2int(self.alien_number, registry)
         except ValueError as e:
             return str(e)
 
@@ -141,48 +239,212 @@ class MineralQueryCommand(BaseCommand):
     """
     Calculates the price of k units of a mineral, where k is an alien number.
     """
+    __slots__ = ("alien_number", "mineral")
 
     def __init__(self, alien_number: [str], mineral: str):
         """
         Initialize the MineralQueryCommand with an alien number and a mineral name.
 
-        :param alien_number: An alien number representation as a list of numerals
+        :param alien_number: An alien number representation as a sequence of numerals
         :param mineral: The name of the mineral in question
         """
-        self.alien_number = alien_number
+        self.alien_number = tuple(alien_number)
         self.mineral = mineral
 
     def __repr__(self):
         return f"{super().__repr__()}: calculates the price of {' '.join(self.alien_number)} units of {self.mineral}"
 
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Calculate the price of the given number of units of the given mineral.
 
+        :param registry: the registry to query, defaults to the shared default registry
+        :return: The query answer string
+        """
+        if registry is None:
+            registry = Registry.default()
+        try:
+            units = _alien2int(self.alien_number, registry)
+            numerator, denominator = registry.get_unit_price(self.mineral)
+        except ValueError as e:
+            return str(e)
+
+        return f"{' '.join(self.alien_number)} {self.mineral} is {_price(units, numerator, denominator)} Credits"
+
+
+class PriceAtQueryCommand(BaseCommand):
+    """
+    Calculates the price of k units of a mineral at an earlier update, where k is an alien number.
+    """
+    __slots__ = ("alien_number", "mineral", "update")
+
+    def __init__(self, alien_number: [str], mineral: str, update: int):
+        """
+        Initialize the PriceAtQueryCommand with an alien number, a mineral name and the number of an update.
+
+        :param alien_number: An alien number representation as a sequence of numerals
+        :param mineral: The name of the mineral in question
+        :param update: The number of the price update, cf. Registry.price_updates
+        """
+        self.alien_number = tuple(alien_number)
+        self.mineral = mineral
+        self.update = update
+
+    def __repr__(self):
+        return (f"{super().__repr__()}: calculates the price of {' '.join(self.alien_number)} units of {self.mineral} "
+                f"at update {self.update}")
+
+    def execute(self, registry: Registry = None):
+        """
+        Calculate the price of the given number of units of the given mineral at the given update.
+
+        :param registry: the registry to query, defaults to the shared default registry
         :return: The query answer string
         """
+        if registry is None:
+            registry = Registry.default()
         try:
-            roman = _alien2roman(self.alien_number)
-            units = roman2int(roman)
-            per_unit = Registry().get_mineral(self.mineral)
+            units = _alien2int(self.alien_number, registry)
+            numerator, denominator = registry.get_unit_price_at(self.mineral, self.update)
         except ValueError as e:
             return str(e)
-        price = round(units * per_unit)
 
-        return f"{' '.join(self.alien_number)} {self.mineral} is {price} Credits"
+        return (f"{' '.join(self.alien_number)} {self.mineral} was {_price(units, numerator, denominator)} Credits "
+                f"at update {self.update}")
+
+
+class PriceRangeQueryCommand(BaseCommand):
+    """
+    Calculates the lowest and highest price of k units of a mineral during a range of updates, where k is an alien
+    number.
+    """
+    __slots__ = ("alien_number", "mineral", "start", "end")
+
+    def __init__(self, alien_number: [str], mineral: str, start: int, end: int):
+        """
+        Initialize the PriceRangeQueryCommand with an alien number, a mineral name and a range of updates.
+
+        :param alien_number: An alien number representation as a sequence of numerals
+        :param mineral: The name of the mineral in question
+        :param start: The number of the first price update of the range, cf. Registry.price_updates
+        :param end: The number of the last price update of the range
+        """
+        self.alien_number = tuple(alien_number)
+        self.mineral = mineral
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return (f"{super().__repr__()}: calculates the price range of {' '.join(self.alien_number)} units of "
+                f"{self.mineral} between update {self.start} and {self.end}")
+
+    def execute(self, registry: Registry = None):
+        """
+        Calculate the lowest and highest price of the given number of units of the given mineral during the given range
+        of updates.
+
+        :param registry: the registry to query, defaults to the shared default registry
+        :return: The query answer string
+        """
+        if registry is None:
+            registry = Registry.default()
+        try:
+            units = _alien2int(self.alien_number, registry)
+            low, high = registry.get_unit_price_range(self.mineral, self.start, self.end)
+        except ValueError as e:
+            return str(e)
+
+        low, high = _price(units, *low), _price(units, *high)
+        price = f"{low} to {high}" if low != high else f"{low}"
+        return (f"{' '.join(self.alien_number)} {self.mineral} was {price} Credits "
+                f"between update {self.start} and {self.end}")
+
+
+class ValuableMineralsQueryCommand(BaseCommand):
+    """
+    Finds the k most or least valuable minerals, i.e. those with the highest or lowest unit prices.
+    """
+    __slots__ = ("count", "most")
+
+    def __init__(self, count: int, most: bool = True):
+        """
+        Initialize the ValuableMineralsQueryCommand with a number of minerals.
+
+        :param count: The number of minerals to find
+        :param most: Whether to find the most valuable minerals, or else the least valuable ones
+        """
+        self.count = count
+        self.most = most
+
+    def __repr__(self):
+        return f"{super().__repr__()}: finds the {self.count} {'most' if self.most else 'least'} valuable minerals"
+
+    def execute(self, registry: Registry = None):
+        """
+        Find the given number of minerals with the highest or lowest unit prices.
+
+        :param registry: the registry to query, defaults to the shared default registry
+        :return: The query answer string
+        """
+        if registry is None:
+            registry = Registry.default()
+        if self.most:
+            minerals = registry.get_most_valuable(self.count)
+        else:
+            minerals = registry.get_least_valuable(self.count)
+        if not minerals:
+            return "There are no such minerals"
+        return f"The {'most' if self.most else 'least'} valuable minerals are {', '.join(minerals)}"
+
+
+class MineralsBetweenQueryCommand(BaseCommand):
+    """
+    Finds the minerals whose unit prices are in a range.
+    """
+    __slots__ = ("low", "high")
+
+    def __init__(self, low: int, high: int):
+        """
+        Initialize the MineralsBetweenQueryCommand with a range of unit prices.
+
+        :param low: The lowest unit price
+        :param high: The highest unit price
+        """
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return f"{super().__repr__()}: finds the minerals that cost between {self.low} and {self.high} Credits"
+
+    def execute(self, registry: Registry = None):
+        """
+        Find the minerals whose unit prices are in the given range, including its bounds.
+
+        :param registry: the registry to query, defaults to the shared default registry
+        :return: The query answer string
+        """
+        if registry is None:
+            registry = Registry.default()
+        minerals = registry.get_minerals_between(self.low, self.high)
+        if not minerals:
+            return f"No minerals cost between {self.low} and {self.high} Credits"
+        return f"{', '.join(minerals)} cost between {self.low} and {self.high} Credits"
 
 
 class UnknownCommand(BaseCommand):
     """
     Displays a generic error message, i.e. in case of a parsing error.
     """
+    __slots__ = ()
+
     def __repr__(self):
         return f"{super().__repr__()}: displays a generic error message"
 
-    def execute(self):
+    def execute(self, registry: Registry = None):
         """
         Does nothing and returns an error string.
 
+        :param registry: ignored
         :return: the error string
         """
         return "I have no idea what you are talking about"
@@ -0,0 +1,201 @@
+"""
+Grammars
+========
+
+The parsimonious grammars of Roman numbers and of commands, and the visitors that evaluate their parse trees.
+
+They are used by the reference implementations roman2int_grammar and parse_input_grammar only, which import this module
+on first use. Thus, the cost of importing parsimonious and compiling the grammars is only paid if they are used.
+"""
+from parsimonious import Grammar, NodeVisitor
+
+from merchantsguide.commands import MineralQueryCommand, MineralUpdateCommand, NumeralUpdateCommand, NumberQueryCommand
+from merchantsguide.commands import PriceAtQueryCommand, PriceRangeQueryCommand, ValuableMineralsQueryCommand
+from merchantsguide.commands import MineralsBetweenQueryCommand, RatioUpdateCommand
+from merchantsguide.roman2int import VALUES
+
+# The grammar used to parse Roman numbers.
+ROMAN_GRAMMAR = Grammar(
+    r"""
+    number = thousands? hundreds? tens? ones?
+    
+    ones = sub_ones / ("V"? single_ones?)
+    sub_ones = "IX" / "IV"
+    single_ones = "I" "I"? "I"?
+    
+    tens = sub_tens / ("L"? single_tens?)
+    sub_tens = "XC" / "XL"
+    single_tens = "X" "X"? "X"?
+    
+    hundreds = sub_hundreds / ("D"? single_hundreds?)
+    sub_hundreds = "CM" / "CD"
+    single_hundreds = "C" "C"? "C"?
+    
+    thousands = "M" "M"? "M"?
+    """
+)
+
+
+class RomanVisitor(NodeVisitor):
+    """
+    Traverses the parse tree and calculates the integer value.
+
+    Methods with the signature
+        visit_*node_type*(self, node, visited_children)
+    are called dynamically from the base class.
+    """
+    @staticmethod
+    def _sub(text: str) -> int:
+        """
+        Auxiliary function that calculates the value of *subtractive pairs* of Roman numerals, i.e. 'IV' or 'XC'.
+
+        :param text:
+        :return:
+        """
+        return VALUES[text[1]] - VALUES[text[0]]
+
+    def visit_sub_ones(self, node, visited_children):
+        return self._sub(node.text)
+
+    def visit_sub_tens(self, node, visited_children):
+        return self._sub(node.text)
+
+    def visit_sub_hundreds(self, node, visited_children):
+        return self._sub(node.text)
+
+    def generic_visit(self, node, visited_children) -> int:
+        """
+        Recursively defines the value of each node that isn't a *subtractive pair*.
+
+        :param node: the node in question
+        :param visited_children: the node's children *after* visiting (i.e. after recursion returns)
+        :return: the aggregated value of the node
+        """
+        # Empty (non-matched) node, i.e. a missing decimal place.
+        # Has a value of 0.
+        if node.text == "":
+            return 0
+        # Single numeral.
+        # Has the value assigned by VALUES.
+        if len(node.text) == 1:
+            return VALUES[node.text]
+        # Multiple numerals or subtractive pairs.
+        # Has a value equal to the sum of all child nodes.
+        return sum(visited_children)
+
+
+ROMAN_VISITOR = RomanVisitor()
+
+# The grammar of commands; cf. README.md for an informal description.
+COMMAND_GRAMMAR = Grammar(
+    r"""
+    input_string = command newline?
+    command = (query ws "?") / (update !"?")
+    
+    update = numeral_update / mineral_update / ratio_update
+    numeral_update = alien_numeral ws is ws roman_numeral
+    mineral_update = alien_number ws mineral ws is ws decimal ws credits
+    ratio_update = alien_number ws !(credits !~"[a-z]") mineral ws is ws alien_number ws !(credits !~"[a-z]") mineral
+    
+    query = number_query / mineral_query / price_at_query / price_range_query / valuable_query / minerals_between_query
+    number_query = "how much" ws is ws alien_number
+    mineral_query = "how many" ws credits ws is ws alien_number ws mineral
+    price_at_query = "how many" ws credits ws was ws alien_number ws mineral ws "at" ws "update" ws decimal
+    price_range_query = "how many" ws credits ws was ws alien_number ws mineral ws "between" ws "update" ws decimal ws
+                        "and" ws decimal
+    valuable_query = "which are the" ws decimal ws most ws "valuable minerals"
+    minerals_between_query = "which minerals cost between" ws decimal ws "and" ws decimal ws credits
+    
+    alien_number = alien_numeral (ws alien_numeral)*
+    mineral = ~"[A-Z][a-z]+"
+    
+    alien_numeral = ~"[a-z]+"
+    roman_numeral = ~"[IVXLCDM]"
+    
+    ws = ~"\s*"
+    is = "is"
+    was = "was"
+    credits = "Credits" / "credits"
+    most = "most" / "least"
+    decimal = ~"\d+"
+    newline = ws ~"\n"
+    """
+)
+
+
+class CommandVisitor(NodeVisitor):
+    """
+    Traverses the parse tree and constructs an appropriate command object.
+
+    Methods with the signature
+        visit_*node_type*(self, node, visited_children)
+    are called dynamically from the base class.
+    """
+
+    def visit_input_string(self, node, visited_children):
+        return visited_children[0]
+
+    def visit_command(self, node, visited_children):
+        return visited_children[0][0]
+
+    def visit_query(self, node, visited_children):
+        return visited_children[0]
+
+    def visit_update(self, node, visited_children):
+        return visited_children[0]
+
+    def visit_numeral_update(self, node, visited_children):
+        alien, _, _, _, roman = visited_children
+        return NumeralUpdateCommand(alien, roman)
+
+    def visit_mineral_update(self, node, visited_children):
+        units, _, mineral, _, _, _, price, *_ = visited_children
+        return MineralUpdateCommand(mineral, units, int(price))
+
+    def visit_ratio_update(self, node, visited_children):
+        units, _, _, mineral, _, _, _, other_units, _, _, other = visited_children
+        return RatioUpdateCommand(mineral, units, other, other_units)
+
+    def visit_number_query(self, node, visited_children):
+        number = visited_children[4]
+        return NumberQueryCommand(number)
+
+    def visit_mineral_query(self, node, visited_children):
+        number, mineral = visited_children[6], visited_children[8]
+        return MineralQueryCommand(number, mineral)
+
+    def visit_price_at_query(self, node, visited_children):
+        number, mineral, update = visited_children[6], visited_children[8], visited_children[14]
+        return PriceAtQueryCommand(number, mineral, int(update))
+
+    def visit_price_range_query(self, node, visited_children):
+        number, mineral = visited_children[6], visited_children[8]
+        start, end = visited_children[14], visited_children[18]
+        return PriceRangeQueryCommand(number, mineral, int(start), int(end))
+
+    def visit_valuable_query(self, node, visited_children):
+        count, most = visited_children[2], visited_children[4]
+        return ValuableMineralsQueryCommand(int(count), most == "most")
+
+    def visit_minerals_between_query(self, node, visited_children):
+        low, high = visited_children[2], visited_children[6]
+        return MineralsBetweenQueryCommand(int(low), int(high))
+
+    def visit_alien_number(self, node, visited_children):
+        return node.text.split(" ")
+
+    def visit_most(self, node, visited_children):
+        return node.text
+
+    def generic_visit(self, node, visited_children):
+        """
+        Visit a node not covered explicitly by other methods.
+
+        :param node: the visited node
+        :param visited_children: the node's children (after visiting them)
+        :return: the visited children, if any, else the text matched by the node
+        """
+        return visited_children or node.text
+
+
+COMMAND_VISITOR = CommandVisitor()
@@ -0,0 +1,191 @@
+"""
+History
+=======
+
+Keeps the history of a mineral's unit prices as an append-only time series.
+
+The time of a price is the number of price updates that the registry had received when the price was set, i.e. the
+first price update of a registry happens at update 1. A price is in effect from its update until the next price update
+of the same mineral.
+
+Histories are shared like the arrays behind Go's slices: a registry only owns the first n prices of a history, where
+it keeps n itself. It appends to the history in place if no other registry has appended to it yet, and copies its
+prices first otherwise, cf. Registry.update_mineral. Thus the snapshots of a registry share its histories, but neither
+sees the prices appended by the other.
+
+Times, numerators and denominators are stored in arrays of 64 bit integers, which are replaced by lists if a numerator
+or denominator doesn't fit. The price in effect at a given time is found by binary search. The lowest and highest price
+in effect during a range of updates are found with an index of the lowest and highest price of each aligned block of
+2, 4, 8, ... prices, which is updated on demand, so appending a price takes constant time.
+"""
+from array import array
+from bisect import bisect_right
+
+
+class PriceHistory:
+    """
+    The unit prices of a mineral by the time of their update.
+    """
+    __slots__ = ("times", "numerators", "denominators", "_lows", "_highs", "_indexed")
+
+    def __init__(self, times=(), numerators=(), denominators=()):
+        """
+        Initialize a history, empty by default.
+
+        :param times: the times of the prices, in ascending order
+        :param numerators: the numerators of the prices
+        :param denominators: the (positive) denominators of the prices
+        """
+        self.times = array("q", times)
+        self.numerators = _int_array(numerators)
+        self.denominators = _int_array(denominators)
+        # The levels of the index: the positions of the lowest and highest price of each block of 2 ** (level + 1)
+        # prices, indexed up to the position _indexed, cf. _index.
+        self._lows = []
+        self._highs = []
+        self._indexed = 0
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __reduce__(self):
+        # The times are appended last and thus determine the length of a history that is being appended to.
+        n = len(self.times)
+        return PriceHistory, (self.times[:n], self.numerators[:n], self.denominators[:n])
+
+    def append(self, time: int, numerator: int, denominator: int):
+        """
+        Append a price.
+
+        :param time: the time of the update, later than that of the last price
+        :param numerator: the numerator of the price
+        :param denominator: the (positive) denominator of the price
+        :return: None
+        :raise ValueError: if the time is not later than that of the last price
+        """
+        if self.times and time <= self.times[-1]:
+            raise ValueError(f"Update {time} is not later than update {self.times[-1]}")
+        try:
+            self.numerators.append(numerator)
+        except OverflowError:
+            self.numerators = list(self.numerators)
+            self.numerators.append(numerator)
+        try:
+            self.denominators.append(denominator)
+        except OverflowError:
+            self.denominators = list(self.denominators)
+            self.denominators.append(denominator)
+        self.times.append(time)
+
+    def copy(self, n: int = None) -> "PriceHistory":
+        """
+        Copy the first prices.
+
+        :param n: the number of prices to copy, defaults to all
+        :return: the copy
+        """
+        return PriceHistory(self.times[:n], self.numerators[:n], self.denominators[:n])
+
+    def at(self, time: int, n: int = None) -> (int, int):
+        """
+        Find the price in effect at a time.
+
+        :param time: the time
+        :param n: the number of prices to consider, defaults to all
+        :return: the numerator and denominator of the price, or None if there was no price yet
+        """
+        i = bisect_right(self.times, time, 0, len(self.times) if n is None else n) - 1
+        if i < 0:
+            return None
+        return self.numerators[i], self.denominators[i]
+
+    def range(self, start: int, end: int, n: int = None) -> ((int, int), (int, int)):
+        """
+        Find the lowest and the highest price in effect during a range of times.
+
+        :param start: the first time of the range
+        :param end: the last time of the range
+        :param n: the number of prices to consider, defaults to all
+        :return: the lowest and the highest price as pairs of numerator and denominator, or None if there was no price
+                 during the range
+        """
+        n = len(self.times) if n is None else n
+        lo = max(bisect_right(self.times, start, 0, n) - 1, 0)
+        hi = bisect_right(self.times, end, 0, n)
+        if lo >= hi:
+            return None
+        self._index()
+        # The largest aligned blocks that make up the range, i.e. at most two blocks per level.
+        blocks = []
+        level = 0
+        while lo < hi:
+            if lo & 1:
+                blocks.append((level, lo))
+            if hi & 1:
+                blocks.append((level, hi - 1))
+            lo = (lo + 1) >> 1
+            hi >>= 1
+            level += 1
+        low = self._best([self._lows[level - 1][i] if level else i for level, i in blocks], -1)
+        high = self._best([self._highs[level - 1][i] if level else i for level, i in blocks], 1)
+        nums, dens = self.numerators, self.denominators
+        return (nums[low], dens[low]), (nums[high], dens[high])
+
+    def _best(self, positions: [int], sign: int) -> int:
+        """
+        Auxiliary function that finds the lowest or highest of some prices.
+
+        :param positions: the positions of the prices
+        :param sign: -1 to find the lowest price, 1 to find the highest
+        :return: the position of the price
+        """
+        nums, dens = self.numerators, self.denominators
+        best = positions[0]
+        for i in positions[1:]:
+            if sign * (nums[i] * dens[best] - nums[best] * dens[i]) > 0:
+                best = i
+        return best
+
+    def _index(self):
+        """
+        Auxiliary function that brings the index up to date with the appended prices.
+
+        Only the blocks that contain appended prices are updated, so the index costs constant time per price.
+
+        :return: None
+        """
+        n, start = len(self.times), self._indexed
+        if start == n:
+            return
+        nums, dens = self.numerators, self.denominators
+        for levels, sign in ((self._lows, -1), (self._highs, 1)):
+            level = 1
+            lower = None
+            while 1 << level <= n:
+                if len(levels) < level:
+                    levels.append(array("q"))
+                blocks = levels[level - 1]
+                first = start >> level
+                del blocks[first:]
+                # the positions of the prices chosen for the two halves of each block, from the level below
+                halves = range(2 * first, n) if lower is None else lower[2 * first:]
+                blocks.extend([right if sign * (nums[right] * dens[left] - nums[left] * dens[right]) > 0 else left
+                               for left, right in zip(halves[::2], halves[1::2])])
+                if len(halves) & 1:
+                    blocks.append(halves[-1])
+                lower = blocks
+                level += 1
+        self._indexed = n
+
+
+def _int_array(values) -> array:
+    """
+    Auxiliary function that stores integers in an array of 64 bit integers, or in a list if they don't fit.
+
+    :param values: the integers
+    :return: the array or list
+    """
+    try:
+        return array("q", values)
+    except OverflowError:
+        return list(values)
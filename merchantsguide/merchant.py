@@ -4,9 +4,35 @@ Merchant
 
 Reads and executes commands and provides a REPL.
 """
+from functools import update_wrapper
+from io import TextIOBase
 from sys import stdin
+from types import MethodType
 
 from merchantsguide.parse_input import parse_input
+from merchantsguide.registry import Registry
+
+# The Merchant of the shared default registry, created on demand, cf. _DefaultMerchantMethod.
+_default_merchant = None
+
+
+class _DefaultMerchantMethod:
+    """
+    A method of Merchant that can also be called on the class, e.g. Merchant.single_command(s), as when Merchant's
+    methods were static. It is then called on a Merchant of the shared default registry.
+    """
+
+    def __init__(self, func):
+        self.__func__ = func
+        update_wrapper(self, func)
+
+    def __get__(self, instance, owner=None):
+        global _default_merchant
+        if instance is None:
+            if _default_merchant is None:
+                _default_merchant = Merchant()
+            instance = _default_merchant
+        return MethodType(self.__func__, instance)
 
 
 class Merchant:
@@ -15,8 +41,16 @@ class Merchant:
 
     Reads and executes commands and provides a REPL.
     """
-    @staticmethod
-    def single_command(s):
+    def __init__(self, registry: Registry = None):
+        """
+        Initialize a Merchant that executes commands against a registry.
+
+        :param registry: the registry, defaults to the shared default registry
+        """
+        self.registry = Registry.default() if registry is None else registry
+
+    @_DefaultMerchantMethod
+    def single_command(self, s):
         """
         Read and execute a single command.
 
@@ -24,10 +58,10 @@ class Merchant:
         :return: the command's return value (either a string or None)
         """
         cmd = parse_input(s)
-        return cmd.execute()
+        return cmd.execute(self.registry)
 
-    @staticmethod
-    def repl():  # pragma: no cover
+    @_DefaultMerchantMethod
+    def repl(self):  # pragma: no cover
         """
         Initiate a read-execute-print loop (REPL).
 
@@ -36,6 +70,43 @@ class Merchant:
         :return: None
         """
         for line in stdin:
-            res = Merchant.single_command(line.strip())
+            res = self.single_command(line.strip())
             if res:
                 print(res)
+
+    @_DefaultMerchantMethod
+    def run_stream(self, input_stream: TextIOBase, output_stream: TextIOBase, chunk_size: int = 1 << 16):
+        """
+        Execute all commands read from a stream and write the responses to another stream.
+
+        Reads and writes many lines at a time, but produces exactly the same output as the REPL.
+
+        :param input_stream: the stream to read newline-separated commands from
+        :param output_stream: the stream to write responses to
+        :param chunk_size: the approximate number of characters to read at a time
+        :return: None
+        """
+        single_command = self.single_command
+        while True:
+            lines = input_stream.readlines(chunk_size)
+            if not lines:
+                break
+            responses = [single_command(line.strip()) for line in lines]
+            output_stream.write("".join([f"{res}\n" for res in responses if res]))
+        output_stream.flush()
+
+    def run_batch(self, input_stream: TextIOBase, output_stream: TextIOBase):
+        """
+        Read all commands from a stream, execute them as a whole and write the responses to another stream.
+
+        Produces the same output as run_stream, but skips the updates whose effect is never observed, cf.
+        merchantsguide.planner.
+
+        :param input_stream: the stream to read newline-separated commands from
+        :param output_stream: the stream to write responses to
+        :return: None
+        """
+        from merchantsguide.planner import execute_script
+        responses = execute_script([parse_input(line.strip()) for line in input_stream], self.registry)
+        output_stream.write("".join([f"{res}\n" for res in responses]))
+        output_stream.flush()
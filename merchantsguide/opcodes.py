@@ -0,0 +1,220 @@
+"""
+Opcodes
+=======
+
+Compiles command logs to a compact binary format, which can be replayed without parsing any text.
+
+A compiled log consists of a header, one fixed-width record per input line and the tables of interned values:
+
+* The header holds the magic bytes b"MGOP", the format version, the number of records and the offset of the tables.
+* Each record holds an opcode, i.e. the type of the command, and up to four unsigned 32 bit operands, cf. RECORD.
+* The tables are JSON and hold the interned strings, i.e. alien numerals, Roman numerals and minerals, the interned
+  alien numbers as lists of string IDs, and the integers that don't fit into an operand.
+
+Operands are IDs in the tables, except for integers, i.e. prices, updates and counts, which are stored in the operand
+itself if they are below 2 ** 31, and as 2 ** 31 + their ID in the table of integers otherwise.
+
+Replaying maps the file into memory, loads the tables and executes the commands of the records one by one, reusing
+the command of an identical earlier record. The responses are the same as those of Merchant.run_stream for the
+original log.
+"""
+import json
+import mmap
+import struct
+from io import TextIOBase
+
+from merchantsguide.commands import MineralQueryCommand, MineralsBetweenQueryCommand, MineralUpdateCommand
+from merchantsguide.commands import NumberQueryCommand, NumeralUpdateCommand, PriceAtQueryCommand
+from merchantsguide.commands import PriceRangeQueryCommand, RatioUpdateCommand, UnknownCommand
+from merchantsguide.commands import ValuableMineralsQueryCommand
+from merchantsguide.parse_input import parse_input
+from merchantsguide.registry import Registry
+
+MAGIC = b"MGOP"
+VERSION = 1
+
+# magic, version, number of records, offset of the tables
+HEADER = struct.Struct("<4sHxxQQ")
+# opcode and four operands
+RECORD = struct.Struct("<B3xIIII")
+
+# The opcodes, i.e. the index of each command type.
+OPCODES = (UnknownCommand, NumeralUpdateCommand, MineralUpdateCommand, NumberQueryCommand, MineralQueryCommand,
+           PriceAtQueryCommand, PriceRangeQueryCommand, ValuableMineralsQueryCommand, MineralsBetweenQueryCommand,
+           RatioUpdateCommand)
+
+# Integer operands at or above this are IDs in the table of integers.
+LARGE = 1 << 31
+
+# The number of distinct records whose commands are kept for reuse.
+COMMAND_CACHE_SIZE = 4096
+
+# The number of records whose responses are written at a time.
+CHUNK_SIZE = 4096
+
+
+class _Tables:
+    """
+    The interned values of a log being compiled.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.numbers = {}
+        self.ints = {}
+
+    def string(self, s: str) -> int:
+        return self.strings.setdefault(s, len(self.strings))
+
+    def number(self, alien_number: tuple) -> int:
+        try:
+            return self.numbers[alien_number][0]
+        except KeyError:
+            ids = tuple(map(self.string, alien_number))
+            return self.numbers.setdefault(alien_number, (len(self.numbers), ids))[0]
+
+    def int(self, n: int) -> int:
+        if 0 <= n < LARGE:
+            return n
+        return LARGE + self.ints.setdefault(n, len(self.ints))
+
+    def operands(self, cmd) -> (int, int, int, int):
+        """
+        Intern the fields of a command.
+
+        :param cmd: the command
+        :return: the operands of its record, padded with zeros
+        """
+        if isinstance(cmd, NumeralUpdateCommand):
+            operands = self.string(cmd.alien_numeral), self.string(cmd.roman_numeral)
+        elif isinstance(cmd, MineralUpdateCommand):
+            operands = self.string(cmd.mineral), self.number(cmd.units), self.int(cmd.price)
+        elif isinstance(cmd, NumberQueryCommand):
+            operands = self.number(cmd.alien_number),
+        elif isinstance(cmd, MineralQueryCommand):
+            operands = self.number(cmd.alien_number), self.string(cmd.mineral)
+        elif isinstance(cmd, PriceAtQueryCommand):
+            operands = self.number(cmd.alien_number), self.string(cmd.mineral), self.int(cmd.update)
+        elif isinstance(cmd, PriceRangeQueryCommand):
+            operands = (self.number(cmd.alien_number), self.string(cmd.mineral), self.int(cmd.start),
+                        self.int(cmd.end))
+        elif isinstance(cmd, ValuableMineralsQueryCommand):
+            operands = self.int(cmd.count), int(cmd.most)
+        elif isinstance(cmd, MineralsBetweenQueryCommand):
+            operands = self.int(cmd.low), self.int(cmd.high)
+        elif isinstance(cmd, RatioUpdateCommand):
+            operands = (self.string(cmd.mineral), self.number(cmd.units), self.string(cmd.other),
+                        self.number(cmd.other_units))
+        else:
+            operands = ()
+        return operands + (0,) * (4 - len(operands))
+
+    def dump(self) -> bytes:
+        return json.dumps({
+            "strings": list(self.strings),
+            "numbers": [ids for _, ids in self.numbers.values()],
+            "ints": list(self.ints)
+        }).encode()
+
+
+def compile_log(input_stream: TextIOBase, path: str, chunk_size: int = 1 << 16) -> int:
+    """
+    Compile the commands read from a stream to a file.
+
+    :param input_stream: the stream to read newline-separated commands from
+    :param path: the path of the compiled log, which is overwritten
+    :param chunk_size: the approximate number of characters to read at a time
+    :return: the number of records, i.e. of input lines
+    """
+    tables = _Tables()
+    opcodes = {cmd: opcode for opcode, cmd in enumerate(OPCODES)}
+    count = 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        while True:
+            lines = input_stream.readlines(chunk_size)
+            if not lines:
+                break
+            records = []
+            for line in lines:
+                cmd = parse_input(line.strip())
+                records.append(RECORD.pack(opcodes[type(cmd)], *tables.operands(cmd)))
+            f.write(b"".join(records))
+            count += len(lines)
+        offset = f.tell()
+        f.write(tables.dump())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, count, offset))
+    return count
+
+
+def replay(path: str, output_stream: TextIOBase, registry: Registry = None):
+    """
+    Execute the commands of a compiled log and write the responses to a stream.
+
+    :param path: the path of the compiled log
+    :param output_stream: the stream to write responses to
+    :param registry: the registry, defaults to the shared default registry
+    :return: None
+    :raise ValueError: if the file is not a compiled log of this version
+    """
+    if registry is None:
+        registry = Registry.default()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        magic, version, count, offset = HEADER.unpack_from(m) if len(m) >= HEADER.size else (None, None, 0, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a compiled command log of version {VERSION}")
+        tables = json.loads(m[offset:])
+        _execute(m, count, tables, output_stream, registry)
+    output_stream.flush()
+
+
+def _execute(buffer: mmap.mmap, count: int, tables: dict, output_stream: TextIOBase, registry: Registry):
+    """
+    Auxiliary function that executes the commands of the records of a compiled log.
+
+    :param buffer: the compiled log
+    :param count: the number of records
+    :param tables: the tables of interned values
+    :param output_stream: the stream to write responses to
+    :param registry: the registry
+    :return: None
+    :raise ValueError: if a record has an unknown opcode
+    """
+    strings, ints = tables["strings"], tables["ints"]
+    numbers = [tuple(strings[i] for i in ids) for ids in tables["numbers"]]
+
+    def integer(operand: int) -> int:
+        return operand if operand < LARGE else ints[operand - LARGE]
+
+    decoders = (
+        lambda a, b, c, d: UnknownCommand(),
+        lambda a, b, c, d: NumeralUpdateCommand(strings[a], strings[b]),
+        lambda a, b, c, d: MineralUpdateCommand(strings[a], numbers[b], integer(c)),
+        lambda a, b, c, d: NumberQueryCommand(numbers[a]),
+        lambda a, b, c, d: MineralQueryCommand(numbers[a], strings[b]),
+        lambda a, b, c, d: PriceAtQueryCommand(numbers[a], strings[b], integer(c)),
+        lambda a, b, c, d: PriceRangeQueryCommand(numbers[a], strings[b], integer(c), integer(d)),
+        lambda a, b, c, d: ValuableMineralsQueryCommand(integer(a), bool(b)),
+        lambda a, b, c, d: MineralsBetweenQueryCommand(integer(a), integer(b)),
+        lambda a, b, c, d: RatioUpdateCommand(strings[a], numbers[b], strings[c], numbers[d])
+    )
+    # Commands are immutable, so identical records share a command. The commands are forgotten when there are too many,
+    # which is cheaper than tracking the least recently used ones.
+    commands = {}
+    unpack, size = RECORD.unpack_from, RECORD.size
+    end = HEADER.size + count * size
+    for start in range(HEADER.size, end, CHUNK_SIZE * size):
+        responses = []
+        for offset in range(start, min(start + CHUNK_SIZE * size, end), size):
+            record = unpack(buffer, offset)
+            cmd = commands.get(record)
+            if cmd is None:
+                opcode, *operands = record
+                if opcode >= len(decoders):
+                    raise ValueError(f"Unknown opcode {opcode}")
+                if len(commands) >= COMMAND_CACHE_SIZE:
+                    commands.clear()
+                cmd = commands[record] = decoders[opcode](*operands)
+            responses.append(cmd.execute(registry))
+        output_stream.write("".join([f"{res}\n" for res in responses if res]))
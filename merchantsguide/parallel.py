@@ -0,0 +1,178 @@
+"""
+Parallel
+========
+
+Executes command streams with the queries between two updates evaluated in worker processes.
+
+Updates are order-sensitive and are executed one after the other. The queries between two updates only read the
+registry, so they are split into batches and evaluated by a pool of worker processes against a snapshot of the
+registry, cf. Registry.snapshot. The responses are written in input order, i.e. the output is the same as in serial
+execution.
+
+Each snapshot is pickled only once and published as a file in a temporary directory. The batches only carry the path
+of the file, and each worker loads a snapshot when it receives the first batch that needs it. The file is removed once
+all of its batches have been answered.
+
+Updates never contain a question mark, so lines that do are passed to the workers without being parsed first.
+"""
+import os
+import pickle
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+from typing import TextIO
+
+from merchantsguide.commands import MineralUpdateCommand, NumeralUpdateCommand, RatioUpdateCommand
+from merchantsguide.parse_input import parse_input
+from merchantsguide.registry import Registry
+
+# Commands that modify the registry and thus end a segment of queries.
+UPDATES = (NumeralUpdateCommand, MineralUpdateCommand, RatioUpdateCommand)
+
+# Segments with fewer queries than this are cheaper to evaluate in the main process.
+MIN_PARALLEL = 32
+
+# The path and the registry snapshot last used by a worker process.
+_snapshot = (None, None)
+
+
+def _execute_queries(path: str, lines: [str]) -> list:
+    """
+    Auxiliary function that evaluates a batch of queries in a worker process.
+
+    Keeps using the snapshot of the previous batch if it was published under the same path, so that it is loaded only
+    once and its number cache stays warm.
+
+    :param path: the path of the pickled registry snapshot
+    :param lines: the queries
+    :return: the queries' responses
+    """
+    global _snapshot
+    if path != _snapshot[0]:
+        with open(path, "rb") as f:
+            _snapshot = path, pickle.load(f)
+    registry = _snapshot[1]
+    return [parse_input(line).execute(registry) for line in lines]
+
+
+def _completed(responses: list) -> Future:
+    """
+    Auxiliary function that wraps responses computed in the main process in a completed future.
+
+    :param responses: the responses
+    :return: the future
+    """
+    future = Future()
+    future.set_result(responses)
+    return future
+
+
+class _Pipeline:
+    """
+    Auxiliary class that executes the updates of a stream in the main process and sends its segments of queries to
+    worker processes, keeping the futures of all responses in input order.
+    """
+
+    def __init__(self, registry: Registry, executor: ProcessPoolExecutor, directory: str, batch_size: int):
+        """
+        Initialize an empty pipeline.
+
+        :param registry: the registry
+        :param executor: the pool of worker processes
+        :param directory: the directory in which the snapshots of the registry are published
+        :param batch_size: the maximum number of queries sent to a worker at a time
+        """
+        self.registry = registry
+        self.executor = executor
+        self.directory = directory
+        self.batch_size = batch_size
+        # Futures of the responses in input order, each with the path of a snapshot to remove once it is written
+        self.pending = deque()
+        self.segment = []
+        self.version = 0
+
+    def execute(self, lines: [str]):
+        """
+        Execute the updates among some lines and queue the queries, in order.
+
+        :param lines: the lines
+        :return: None
+        """
+        for line in lines:
+            line = line.strip()
+            cmd = None if "?" in line else parse_input(line)
+            if isinstance(cmd, UPDATES):
+                self.flush()
+                self.pending.append((_completed([cmd.execute(self.registry)]), None))
+                self.version += 1
+            else:
+                self.segment.append(line)
+
+    def flush(self):
+        """
+        Evaluate the queued queries, in the worker processes unless they are few.
+
+        :return: None
+        """
+        segment = self.segment
+        if not segment:
+            return
+        if len(segment) < MIN_PARALLEL:
+            self.pending.append((_completed([parse_input(line).execute(self.registry) for line in segment]), None))
+        else:
+            path = os.path.join(self.directory, f"{self.version}.pickle")
+            with open(path, "wb") as f:
+                f.write(self.registry.dumps())
+            for i in range(0, len(segment), self.batch_size):
+                batch = segment[i:i + self.batch_size]
+                last = i + self.batch_size >= len(segment)
+                self.pending.append((self.executor.submit(_execute_queries, path, batch), path if last else None))
+        self.segment = []
+
+    def responses(self, block: bool) -> str:
+        """
+        Collect the responses that are ready, in order.
+
+        :param block: whether to wait for all responses
+        :return: the non-empty responses, each followed by a newline
+        """
+        responses = []
+        pending = self.pending
+        while pending and (block or pending[0][0].done()):
+            future, path = pending.popleft()
+            responses += future.result()
+            if path is not None:
+                os.remove(path)
+        return "".join([f"{res}\n" for res in responses if res])
+
+
+def run_parallel(input_stream: TextIO, output_stream: TextIO, workers: int = None, registry: Registry = None,
+                 batch_size: int = 1000, chunk_size: int = 1 << 16):
+    """
+    Execute all commands read from a stream and write the responses to another stream, evaluating queries in parallel.
+
+    Produces exactly the same output as the REPL.
+
+    :param input_stream: the stream to read newline-separated commands from
+    :param output_stream: the stream to write responses to
+    :param workers: the number of worker processes, defaults to the number of processors
+    :param registry: the registry, defaults to the shared default registry
+    :param batch_size: the maximum number of queries sent to a worker at a time
+    :param chunk_size: the approximate number of characters to read at a time
+    :return: None
+    """
+    workers = workers or os.cpu_count()
+    if registry is None:
+        registry = Registry.default()
+    with TemporaryDirectory() as directory, ProcessPoolExecutor(workers) as executor:
+        pipeline = _Pipeline(registry, executor, directory, batch_size)
+        while True:
+            lines = input_stream.readlines(chunk_size)
+            if not lines:
+                break
+            pipeline.execute(lines)
+            # Don't let too much work pile up if the workers can't keep up.
+            output_stream.write(pipeline.responses(block=len(pipeline.pending) > 64 * workers))
+        pipeline.flush()
+        output_stream.write(pipeline.responses(block=True))
+    output_stream.flush()
@@ -3,108 +3,209 @@ Parse Input
 ===========
 
 Parses (update/query) command strings and constructs appropriate commands.
+
+There are two parser backends, selectable at runtime via set_backend:
+- "regex" (default) matches precompiled regular expressions that mirror the grammar, and
+- "grammar" parses the input with the grammar and visits the resulting tree.
+
+Input logs tend to repeat the same lines, so parse_input caches the commands parsed from the most recently used lines,
+cf. set_cache_size and cache_info. Cached commands are shared by all lines with the same text and must not be modified.
+Long lines are not cached, so that the memory held by the cache stays small, cf. MAX_CACHED_LINE.
 """
-from parsimonious import Grammar, ParseError, NodeVisitor
+import re
 
 from merchantsguide.commands import MineralQueryCommand, MineralUpdateCommand, NumeralUpdateCommand, NumberQueryCommand
-from merchantsguide.commands import UnknownCommand, BaseCommand
-
-# The grammar of commands; cf. README.md for an informal description.
-GRAMMAR = Grammar(
-    r"""
-    input_string = command newline?
-    command = (query ws "?") / (update !"?")
-    
-    update = numeral_update / mineral_update
-    numeral_update = alien_numeral ws is ws roman_numeral
-    mineral_update = alien_number ws mineral ws is ws decimal ws credits
-    
-    query = number_query / mineral_query
-    number_query = "how much" ws is ws alien_number
-    mineral_query = "how many" ws credits ws is ws alien_number ws mineral
-    
-    alien_number = alien_numeral (ws alien_numeral)*
-    mineral = ~"[A-Z][a-z]+"
-    
-    alien_numeral = ~"[a-z]+"
-    roman_numeral = ~"[IVXLCDM]"
-    
-    ws = ~"\s*"
-    is = "is"
-    credits = "Credits" / "credits"
-    decimal = ~"\d+"
-    newline = ws ~"\n"
+from merchantsguide.cache import CacheInfo, LRUCache
+from merchantsguide.commands import PriceAtQueryCommand, PriceRangeQueryCommand, UnknownCommand, BaseCommand
+from merchantsguide.commands import MineralsBetweenQueryCommand, RatioUpdateCommand, ValuableMineralsQueryCommand
+
+# The names that moved to merchantsguide.grammars, which is imported on first access, cf. __getattr__.
+_GRAMMAR_NAMES = {"GRAMMAR": "COMMAND_GRAMMAR", "VISITOR": "COMMAND_VISITOR", "CommandVisitor": "CommandVisitor"}
+
+
+def __getattr__(name: str):
+    """
+    Provide the grammar of commands and its visitor under their former names, compiling the grammar if necessary.
+
+    :param name: the name of the module attribute
+    :return: the attribute
+    :raise AttributeError: if there is no such attribute
+    """
+    if name in _GRAMMAR_NAMES:
+        from merchantsguide import grammars
+        return getattr(grammars, _GRAMMAR_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Regular expressions mirroring the rules of the grammar.
+# Unlike the grammar, the regex engine backtracks. The lookaheads rule out matches that the grammar would not find
+# because its greedy rules never give back what they matched, e.g. 'Goldis' is a mineral and not 'Gold' + 'is'.
+ALIEN_NUMERAL = r"[a-z]+(?![a-z])"
+ALIEN_NUMBER = rf"({ALIEN_NUMERAL}(?:\s*{ALIEN_NUMERAL})*)"
+MINERAL = r"([A-Z][a-z]+)(?![a-z])"
+CREDITS = r"(?:Credits|credits)"
+# Rules out Credits as either mineral of a ratio update.
+NOT_CREDITS = rf"(?!{CREDITS}(?![a-z]))"
+
+NUMERAL_UPDATE = re.compile(rf"({ALIEN_NUMERAL})\s*is\s*([IVXLCDM])")
+MINERAL_UPDATE = re.compile(rf"{ALIEN_NUMBER}\s*{MINERAL}\s*is\s*(\d+)\s*{CREDITS}")
+RATIO_UPDATE = re.compile(rf"{ALIEN_NUMBER}\s*{NOT_CREDITS}{MINERAL}\s*is\s*{ALIEN_NUMBER}\s*{NOT_CREDITS}{MINERAL}")
+NUMBER_QUERY = re.compile(rf"how much\s*is\s*{ALIEN_NUMBER}\s*\?")
+MINERAL_QUERY = re.compile(rf"how many\s*{CREDITS}\s*is\s*{ALIEN_NUMBER}\s*{MINERAL}\s*\?")
+PRICE_AT_QUERY = re.compile(rf"how many\s*{CREDITS}\s*was\s*{ALIEN_NUMBER}\s*{MINERAL}\s*at\s*update\s*(\d+)\s*\?")
+PRICE_RANGE_QUERY = re.compile(
+    rf"how many\s*{CREDITS}\s*was\s*{ALIEN_NUMBER}\s*{MINERAL}\s*between\s*update\s*(\d+)\s*and\s*(\d+)\s*\?")
+VALUABLE_QUERY = re.compile(r"which are the\s*(\d+)\s*(most|least)\s*valuable minerals\s*\?")
+MINERALS_BETWEEN_QUERY = re.compile(rf"which minerals cost between\s*(\d+)\s*and\s*(\d+)\s*{CREDITS}\s*\?")
+
+
+def parse_input_grammar(s: str) -> BaseCommand:
+    """
+    Parse an input string with the grammar and return an appropriate command object.
+
+    If parsing fails, an UnknownCommand is returned. The grammar is compiled on first use, cf. merchantsguide.grammars.
+
+    :param s: the input string
+    :return: the constructed command
     """
-)
+    from parsimonious import ParseError
+    from merchantsguide.grammars import COMMAND_GRAMMAR, COMMAND_VISITOR
+
+    try:
+        tree = COMMAND_GRAMMAR.parse(s)
+    except ParseError:
+        return UnknownCommand()
+
+    cmd = COMMAND_VISITOR.visit(tree)
+    return cmd
 
 
-class CommandVisitor(NodeVisitor):
+def parse_input_regex(s: str) -> BaseCommand:  # noqa: C901
     """
-    Traverses the parse tree and constructs an appropriate command object.
+    Match an input string against the regular expressions and return an appropriate command object.
+
+    Returns the same commands as parse_input_grammar. Like the grammar, this tries queries before updates, numeral
+    updates before mineral updates and mineral updates before ratio updates, and fails as soon as the first alternative
+    that matches a prefix of the input cannot be completed.
+
+    The alternatives are spelled out one after the other rather than looked up in a table of rules: this is the parser
+    of every line that misses the cache, and a loop over the rules that constructs the commands in lambdas parses
+    about 8% slower.
 
-    Methods with the signature
-        visit_*node_type*(self, node, visited_children)
-    are called dynamically from the base class.
+    :param s: the input string
+    :return: the constructed command
     """
+    m = NUMBER_QUERY.match(s)
+    if m:
+        return NumberQueryCommand(m[1].split(" ")) if m.end() == len(s) else UnknownCommand()
 
-    def visit_input_string(self, node, visited_children):
-        return visited_children[0]
+    m = MINERAL_QUERY.match(s)
+    if m:
+        return MineralQueryCommand(m[1].split(" "), m[2]) if m.end() == len(s) else UnknownCommand()
 
-    def visit_command(self, node, visited_children):
-        return visited_children[0][0]
+    m = PRICE_AT_QUERY.match(s)
+    if m:
+        return PriceAtQueryCommand(m[1].split(" "), m[2], int(m[3])) if m.end() == len(s) else UnknownCommand()
 
-    def visit_query(self, node, visited_children):
-        return visited_children[0]
+    m = PRICE_RANGE_QUERY.match(s)
+    if m:
+        if m.end() != len(s):
+            return UnknownCommand()
+        return PriceRangeQueryCommand(m[1].split(" "), m[2], int(m[3]), int(m[4]))
 
-    def visit_update(self, node, visited_children):
-        return visited_children[0]
+    m = VALUABLE_QUERY.match(s)
+    if m:
+        return ValuableMineralsQueryCommand(int(m[1]), m[2] == "most") if m.end() == len(s) else UnknownCommand()
 
-    def visit_numeral_update(self, node, visited_children):
-        alien, _, _, _, roman = visited_children
-        return NumeralUpdateCommand(alien, roman)
+    m = MINERALS_BETWEEN_QUERY.match(s)
+    if m:
+        return MineralsBetweenQueryCommand(int(m[1]), int(m[2])) if m.end() == len(s) else UnknownCommand()
 
-    def visit_mineral_update(self, node, visited_children):
-        units, _, mineral, _, _, _, price, *_ = visited_children
-        return MineralUpdateCommand(mineral, units, int(price))
+    m = NUMERAL_UPDATE.match(s)
+    if m:
+        return NumeralUpdateCommand(m[1], m[2]) if m.end() == len(s) else UnknownCommand()
 
-    def visit_number_query(self, node, visited_children):
-        number = visited_children[4]
-        return NumberQueryCommand(number)
+    m = MINERAL_UPDATE.fullmatch(s)
+    if m:
+        return MineralUpdateCommand(m[2], m[1].split(" "), int(m[3]))
 
-    def visit_mineral_query(self, node, visited_children):
-        number, mineral = visited_children[6], visited_children[8]
-        return MineralQueryCommand(number, mineral)
+    m = RATIO_UPDATE.fullmatch(s)
+    if m:
+        return RatioUpdateCommand(m[2], m[1].split(" "), m[4], m[3].split(" "))
 
-    def visit_alien_number(self, node, visited_children):
-        return node.text.split(" ")
+    return UnknownCommand()
 
-    def generic_visit(self, node, visited_children):
-        """
-        Visit a node not covered explicitly by other methods.
 
-        :param node: the visited node
-        :param visited_children: the node's children (after visiting them)
-        :return: the visited children, if any, else the text matched by the node
-        """
-        return visited_children or node.text
+# The available parser backends.
+BACKENDS = {
+    "grammar": parse_input_grammar,
+    "regex": parse_input_regex
+}
+DEFAULT_BACKEND = "regex"
 
+_backend = BACKENDS[DEFAULT_BACKEND]
 
-VISITOR = CommandVisitor()
+
+def set_backend(name: str):
+    """
+    Select the parser backend used by parse_input.
+
+    :param name: the name of the backend, cf. BACKENDS
+    :return: None
+    :raise ValueError: if there is no backend of that name
+    """
+    global _backend
+    try:
+        _backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend '{name}'")
+    _cache.clear()
+
+
+# The default number of parsed commands cached by parse_input.
+PARSE_CACHE_SIZE = 4096
+
+# The length of the longest input string whose command is cached. Valid commands are much shorter, while each cached
+# line of the maximum length accepted by the server, i.e. 64 KiB, would hold hundreds of KiB.
+MAX_CACHED_LINE = 256
+
+_cache = LRUCache(PARSE_CACHE_SIZE)
+
+
+def set_cache_size(maxsize: int):
+    """
+    Replace the cache of parsed commands by an empty cache of the given size.
+
+    :param maxsize: the maximum number of cached commands; 0 disables caching
+    :return: None
+    """
+    global _cache
+    _cache = LRUCache(maxsize)
+
+
+def cache_info() -> CacheInfo:
+    """
+    Report the statistics of the cache of parsed commands.
+
+    :return: the statistics
+    """
+    return _cache.info()
 
 
 def parse_input(s: str) -> BaseCommand:
     """
-    Parse an input string and return an appropriate command object.
+    Parse an input string and return an appropriate command object, using the selected backend.
 
-    If parsing fails, an UnknownCommand is returned.
+    If parsing fails, an UnknownCommand is returned. Commands are cached by input string, i.e. parsing the same
+    string again returns the same command object, unless the string is longer than MAX_CACHED_LINE.
 
-    :param s: the input string
+    :param s: the input string, stripped of surrounding whitespace
     :return: the constructed command
     """
-    try:
-        tree = GRAMMAR.parse(s)
-    except ParseError:
-        return UnknownCommand()
-
-    cmd = VISITOR.visit(tree)
+    if len(s) > MAX_CACHED_LINE:
+        return _backend(s)
+    cmd = _cache.get(s)
+    if cmd is None:
+        cmd = _backend(s)
+        _cache.put(s, cmd)
     return cmd
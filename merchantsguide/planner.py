@@ -0,0 +1,140 @@
+"""
+Planner
+=======
+
+Executes a whole script of commands at once, skipping the updates whose effect is never observed.
+
+Line-by-line execution pays for every update, even if it is overwritten before any command reads it. Knowing the
+whole script, the planner avoids that work, while producing exactly the same responses:
+
+* A numeral update is dead if the same alien numeral is updated again before any command evaluates an alien number
+  that contains it. Dead numeral updates are removed from the script up front, cf. plan.
+* The unit price of a mineral update is computed only once a command reads the mineral's price, i.e. a mineral query
+  or a ranking query, or at the end of the script. Until then, the update is kept pending, and a later update of the
+  same mineral replaces it, cf. execute_script. The number of units is evaluated right away, though, because it
+  depends on the numerals at the time of the update, and an invalid number must be reported in order.
+
+Skipped mineral updates don't advance the registry's count of price updates, nor are they recorded in the price
+histories. Hence, prices are not deferred at all in scripts that contain price history queries. Neither are they
+deferred if minerals are priced relative to each other, because relative prices depend on the order of the price
+updates, cf. merchantsguide.ratios. After the script, the
+registry holds the same numerals and prices as after line-by-line execution, but the price histories only hold the
+prices that were read or final.
+"""
+from fractions import Fraction
+
+from merchantsguide.commands import _alien2int, BaseCommand, MineralQueryCommand, MineralsBetweenQueryCommand
+from merchantsguide.commands import MineralUpdateCommand, NumberQueryCommand, NumeralUpdateCommand
+from merchantsguide.commands import PriceAtQueryCommand, PriceRangeQueryCommand, RatioUpdateCommand
+from merchantsguide.commands import ValuableMineralsQueryCommand
+from merchantsguide.registry import Registry
+
+# The commands that evaluate an alien number, i.e. read the numerals it consists of.
+NUMBER_READERS = frozenset([NumberQueryCommand, MineralQueryCommand, PriceAtQueryCommand, PriceRangeQueryCommand])
+
+# The commands that read the prices of all minerals.
+RANKING_QUERIES = frozenset([ValuableMineralsQueryCommand, MineralsBetweenQueryCommand])
+
+# The commands that read the count of price updates, or the price histories.
+HISTORY_QUERIES = frozenset([PriceAtQueryCommand, PriceRangeQueryCommand])
+
+
+def plan(commands: [BaseCommand]) -> [BaseCommand]:
+    """
+    Remove the numeral updates that are overwritten before they are read.
+
+    :param commands: the script
+    :return: the script without dead numeral updates
+    """
+    # the alien numerals that are updated later on, before any command reads them
+    overwritten = set()
+    live = []
+    for cmd in reversed(commands):
+        kind = type(cmd)
+        if kind is NumeralUpdateCommand:
+            if cmd.alien_numeral in overwritten:
+                continue
+            overwritten.add(cmd.alien_numeral)
+        elif overwritten:
+            if kind is MineralUpdateCommand:
+                overwritten.difference_update(cmd.units)
+            elif kind in NUMBER_READERS:
+                overwritten.difference_update(cmd.alien_number)
+            elif kind is RatioUpdateCommand:
+                overwritten.difference_update(cmd.units)
+                overwritten.difference_update(cmd.other_units)
+        live.append(cmd)
+    live.reverse()
+    return live
+
+
+def execute_script(commands: [BaseCommand], registry: Registry = None) -> list:
+    """
+    Execute a script, skipping dead updates, cf. the module docstring.
+
+    :param commands: the script
+    :param registry: the registry, defaults to the shared default registry
+    :return: the non-empty responses, i.e. the same as those of line-by-line execution
+    """
+    if registry is None:
+        registry = Registry.default()
+    commands = plan(commands)
+    kinds = set(map(type, commands))
+    if HISTORY_QUERIES.isdisjoint(kinds) and RatioUpdateCommand not in kinds and not registry.price_ratios:
+        return _execute_deferred(commands, registry)
+    responses = (cmd.execute(registry) for cmd in commands)
+    return [res for res in responses if res]
+
+
+def _execute_deferred(commands: [BaseCommand], registry: Registry) -> list:
+    """
+    Auxiliary function that executes a script, applying each mineral update only once the mineral's price is read.
+
+    :param commands: the script
+    :param registry: the registry
+    :return: the non-empty responses
+    """
+    # the price and number of units of the last update of each mineral that hasn't been applied yet, in the order of
+    # these updates
+    pending = {}
+
+    def apply(mineral: str):
+        price, units = pending.pop(mineral)
+        registry.update_mineral(mineral, Fraction(price, units))
+
+    responses = []
+    for cmd in commands:
+        kind = type(cmd)
+        if kind is MineralUpdateCommand:
+            res = _defer(cmd, registry, pending)
+        else:
+            if kind is MineralQueryCommand and cmd.mineral in pending:
+                apply(cmd.mineral)
+            elif kind in RANKING_QUERIES:
+                for mineral in list(pending):
+                    apply(mineral)
+            res = cmd.execute(registry)
+        if res:
+            responses.append(res)
+    for mineral in list(pending):
+        apply(mineral)
+    return responses
+
+
+def _defer(cmd: MineralUpdateCommand, registry: Registry, pending: dict) -> str:
+    """
+    Auxiliary function that evaluates the number of units of a mineral update and keeps the update pending, in place of
+    the mineral's earlier pending update, if any.
+
+    :param cmd: the mineral update
+    :param registry: the registry
+    :param pending: the pending updates, cf. _execute_deferred
+    :return: the error message if the number of units is invalid, else None
+    """
+    try:
+        units = _alien2int(cmd.units, registry)
+    except ValueError as e:
+        return str(e)
+    pending.pop(cmd.mineral, None)
+    pending[cmd.mineral] = cmd.price, units
+    return None
@@ -0,0 +1,153 @@
+"""
+Price Index
+===========
+
+Keeps minerals sorted by their unit price, so that the most or least valuable minerals and the minerals in a range of
+prices can be found without sorting all minerals.
+
+The minerals are kept in a sorted list of sorted buckets of limited size, with the last key of each bucket in a
+separate list. Thus updates take a binary search and an insertion into a short bucket, and queries take a binary search
+and a walk over the minerals they return.
+
+Minerals are ordered by unit price and then by name. To compare keys quickly, a key starts with the price as a float,
+which is ordered like the exact price, but not strictly; the exact price breaks ties.
+"""
+from bisect import bisect_left, insort
+from fractions import Fraction
+from itertools import islice
+from math import inf
+from numbers import Number
+
+# Buckets that grow beyond twice this size are split in half.
+BUCKET_SIZE = 512
+
+
+def _key(mineral: str, price: Number) -> (float, Fraction, str):
+    """
+    Auxiliary function that computes the key of a mineral in the index.
+
+    :param mineral: the mineral's name, or "" for the lowest key of a price
+    :param price: the unit price
+    :return: the key
+    """
+    try:
+        approximation = float(price)
+    except OverflowError:
+        approximation = inf if price > 0 else -inf
+    return approximation, price, mineral
+
+
+class PriceIndex:
+    """
+    Minerals sorted by unit price.
+    """
+
+    def __init__(self, prices: dict = None):
+        """
+        Initialize an index of minerals.
+
+        :param prices: the unit price of each mineral as a pair of numerator and denominator, cf.
+                       Registry.mineral_prices
+        """
+        self._keys = {mineral: _key(mineral, Fraction(*price)) for mineral, price in (prices or {}).items()}
+        keys = sorted(self._keys.values())
+        self._buckets = [keys[i:i + BUCKET_SIZE] for i in range(0, len(keys), BUCKET_SIZE)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def copy(self) -> "PriceIndex":
+        """
+        Copy the index.
+
+        :return: the copy
+        """
+        index = PriceIndex()
+        index._keys = dict(self._keys)
+        index._buckets = [list(bucket) for bucket in self._buckets]
+        index._maxes = list(self._maxes)
+        return index
+
+    def update(self, mineral: str, price: Fraction):
+        """
+        Set the unit price of a mineral.
+
+        :param mineral: the mineral's name
+        :param price: the unit price
+        :return: None
+        """
+        old = self._keys.get(mineral)
+        if old is not None:
+            self._remove(old)
+        key = self._keys[mineral] = _key(mineral, price)
+        buckets, maxes = self._buckets, self._maxes
+        if not buckets:
+            buckets.append([key])
+            maxes.append(key)
+            return
+        i = min(bisect_left(maxes, key), len(maxes) - 1)
+        bucket = buckets[i]
+        insort(bucket, key)
+        maxes[i] = bucket[-1]
+        if len(bucket) > 2 * BUCKET_SIZE:
+            buckets[i:i + 1] = bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]
+            maxes[i:i + 1] = bucket[BUCKET_SIZE - 1], bucket[-1]
+
+    def _remove(self, key: tuple):
+        """
+        Auxiliary function that removes a key.
+
+        :param key: the key
+        :return: None
+        """
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def lowest(self, k: int) -> [str]:
+        """
+        Find the minerals with the lowest unit prices.
+
+        :param k: the number of minerals
+        :return: the names of at most k minerals, from the lowest price
+        """
+        keys = (key for bucket in self._buckets for key in bucket)
+        return [mineral for _, _, mineral in islice(keys, k)]
+
+    def highest(self, k: int) -> [str]:
+        """
+        Find the minerals with the highest unit prices.
+
+        :param k: the number of minerals
+        :return: the names of at most k minerals, from the highest price
+        """
+        keys = (key for bucket in reversed(self._buckets) for key in reversed(bucket))
+        return [mineral for _, _, mineral in islice(keys, k)]
+
+    def between(self, low: Number, high: Number) -> [str]:
+        """
+        Find the minerals with unit prices in a range.
+
+        :param low: the lowest unit price
+        :param high: the highest unit price
+        :return: the names of the minerals whose prices are in the range, including its bounds, from the lowest price
+        """
+        start = _key("", low)
+        i = bisect_left(self._maxes, start)
+        if i == len(self._maxes):
+            return []
+        j = bisect_left(self._buckets[i], start)
+        minerals = []
+        for bucket in islice(self._buckets, i, None):
+            for _, price, mineral in islice(bucket, j, None):
+                if price > high:
+                    return minerals
+                minerals.append(mineral)
+            j = 0
+        return minerals
@@ -0,0 +1,285 @@
+"""
+Profiling
+=========
+
+Opt-in instrumentation that measures where the time goes when commands are executed.
+
+Enabling a profiler wraps the functions of each stage of the command pipeline in timers:
+- "single_command": Merchant.single_command, i.e. parsing and executing a command, also per line of a stream and for
+  tenants, cf. merchantsguide.tenants,
+- "parse_input": looking up or parsing a command, by a merchant,
+- "parse": the parser backend, which is only called for lines missing from the cache of parsed commands,
+- "grammar.parse" and "grammar.visit": parsing with the grammar and visiting the tree, if the grammar backend is used,
+- "execute.<command type>": the execution of each type of command, including the formatting of its response,
+- "alien2int": the evaluation of alien numbers, including the lookup in the number cache,
+- "roman2int": the conversion of Roman numbers, and
+- "registry.<method>": the registry's lookups and updates.
+
+Stages are nested, e.g. "execute.NumberQueryCommand" includes "alien2int". Each stage records a histogram of its
+inclusive latencies and the total time spent in the stage itself, i.e. outside of the nested stages. For example, the
+self time of an execute stage is mostly spent formatting the response.
+
+Disabling the profiler restores the original functions, so there is no overhead unless a profiler is enabled.
+Profilers are not thread-safe, and commands evaluated by worker processes are not profiled.
+"""
+import json
+import os
+import sys
+from functools import partial
+from time import perf_counter_ns
+from types import MethodType
+
+from merchantsguide import commands, merchant, parse_input, tenants
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+
+# The command types whose execution is profiled.
+COMMANDS = (commands.NumeralUpdateCommand, commands.MineralUpdateCommand, commands.RatioUpdateCommand,
+            commands.NumberQueryCommand, commands.MineralQueryCommand, commands.PriceAtQueryCommand,
+            commands.PriceRangeQueryCommand, commands.ValuableMineralsQueryCommand,
+            commands.MineralsBetweenQueryCommand, commands.UnknownCommand)
+
+# The registry methods that are profiled.
+REGISTRY_METHODS = ("get_numeral", "get_unit_price", "get_unit_price_at", "get_unit_price_range", "get_most_valuable",
+                    "get_least_valuable", "get_minerals_between", "update_numeral", "update_mineral", "update_ratio")
+
+
+class Histogram:
+    """
+    Counts latencies in buckets of powers of two nanoseconds.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty histogram.
+        """
+        self.count = 0
+        self.total = 0
+        self.self_total = 0
+        self.min = None
+        self.max = 0
+        # buckets[i] counts the latencies between 2 ** (i - 1) and 2 ** i - 1 nanoseconds
+        self.buckets = [0] * 64
+        # Whether a call of the stage is in progress, cf. Profiler._patch.
+        self.active = False
+
+    def record(self, elapsed: int, self_time: int):
+        """
+        Record a latency.
+
+        :param elapsed: the latency in nanoseconds
+        :param self_time: the part of the latency spent outside of nested stages
+        :return: None
+        """
+        self.count += 1
+        self.total += elapsed
+        self.self_total += self_time
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[min(elapsed.bit_length(), 63)] += 1
+
+    def percentile(self, p: float) -> int:
+        """
+        Estimate a percentile of the latencies by the upper bound of its bucket.
+
+        :param p: the percentile, 0 < p <= 100
+        :return: the estimated latency in nanoseconds, or 0 if nothing has been recorded
+        """
+        rank = p / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min((1 << i) - 1, self.max)
+        return 0
+
+    def to_dict(self) -> dict:
+        """
+        Summarize the histogram.
+
+        :return: the summary, ready to be dumped as JSON
+        """
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "self_ns": self.self_total,
+            "mean_ns": self.total // self.count if self.count else 0,
+            "min_ns": self.min or 0,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+            "max_ns": self.max,
+            "buckets": [[(1 << i) - 1, count] for i, count in enumerate(self.buckets) if count]
+        }
+
+
+class Profiler:
+    """
+    Records the latencies of the stages of the command pipeline while it is enabled.
+    """
+
+    def __init__(self):
+        """
+        Initialize a disabled profiler.
+        """
+        self.stages = {}
+        # The time spent in the nested stages of each call in progress.
+        self._nested = []
+        self._patches = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._patches)
+
+    def enable(self):
+        """
+        Start profiling, i.e. wrap the functions of all stages in timers.
+
+        :return: None
+        :raise ValueError: if the profiler is already enabled
+        """
+        if self.enabled:
+            raise ValueError("The profiler is already enabled")
+        self._patch(Merchant, "single_command", "single_command")
+        self._patch(tenants.TenantMerchant, "single_command", "single_command")
+        self._patch(merchant, "parse_input", "parse_input")
+        self._patch(tenants, "parse_input", "parse_input")
+        # The grammar is compiled on first use, cf. merchantsguide.parse_input.parse_input_grammar, so it is only
+        # patched right away if it is already used.
+        if parse_input._backend is parse_input.BACKENDS["grammar"] or "merchantsguide.grammars" in sys.modules:
+            self._patch_grammar()
+        else:
+            self._patch_on_first_call(parse_input.BACKENDS, "grammar", self._patch_grammar)
+        for name in list(parse_input.BACKENDS):
+            self._patch(parse_input.BACKENDS, name, "parse")
+        self._patch(parse_input, "_backend", "parse")
+        for command in COMMANDS:
+            self._patch(command, "execute", f"execute.{command.__name__}")
+        self._patch(commands, "_alien2int", "alien2int")
+        self._patch(commands, "roman2int", "roman2int")
+        self._patch(commands, "fold_roman", "roman2int")
+        for method in REGISTRY_METHODS:
+            self._patch(Registry, method, f"registry.{method}")
+
+    def disable(self):
+        """
+        Stop profiling, i.e. restore the original functions. The recorded latencies are kept.
+
+        :return: None
+        """
+        while self._patches:
+            self._patches.pop()()
+
+    def reset(self):
+        """
+        Discard all recorded latencies.
+
+        :return: None
+        """
+        for histogram in self.stages.values():
+            histogram.__init__()
+
+    def report(self) -> dict:
+        """
+        Summarize the recorded latencies and the statistics of the cache of parsed commands.
+
+        :return: the summary, ready to be dumped as JSON
+        """
+        return {
+            "stages": {stage: histogram.to_dict() for stage, histogram in sorted(self.stages.items())},
+            "parse_cache": parse_input.cache_info()._asdict()
+        }
+
+    def dump(self, path: str = "-"):
+        """
+        Write the summary as JSON to a file, replacing it atomically, or to stderr.
+
+        :param path: the path of the file, or "-" for stderr
+        :return: None
+        """
+        text = json.dumps(self.report(), indent=2) + "\n"
+        if path == "-":
+            sys.stderr.write(text)
+            sys.stderr.flush()
+            return
+        with open(path + ".tmp", "w") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+    def _patch(self, target, name: str, stage: str, recursive: bool = False):
+        """
+        Auxiliary function that replaces a function by a timed wrapper until the profiler is disabled.
+
+        :param target: the module, class, object or dict that holds the function
+        :param name: the attribute or key of the function
+        :param stage: the stage that the function is counted towards
+        :param recursive: whether the function calls itself, in which case only the outermost call is timed
+        :return: None
+        """
+        if type(target) is dict:
+            original = target[name]
+        else:
+            # Methods that are wrapped in a descriptor, e.g. staticmethod, are looked up through it, but replaced by a
+            # wrapper of the same kind.
+            raw = vars(target).get(name)
+            descriptor = type(raw) if hasattr(raw, "__func__") and not isinstance(raw, MethodType) else None
+            original = raw.__func__ if descriptor else getattr(target, name)
+        histogram = self.stages.setdefault(stage, Histogram())
+        nested = self._nested
+
+        def timed(*args, **kwargs):
+            if recursive and histogram.active:
+                return original(*args, **kwargs)
+            histogram.active = True
+            nested.append(0)
+            start = perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                inner = nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+                histogram.active = False
+                histogram.record(elapsed, elapsed - inner)
+
+        if type(target) is dict:
+            target[name] = timed
+            self._patches.append(partial(target.__setitem__, name, original))
+        else:
+            own = name in vars(target)
+            setattr(target, name, descriptor(timed) if descriptor else timed)
+            restored = raw if descriptor else original
+            self._patches.append(partial(setattr, target, name, restored) if own else partial(delattr, target, name))
+
+    def _patch_grammar(self):
+        """
+        Auxiliary function that times parsing with the grammar and visiting the tree, loading the grammar if needed.
+
+        :return: None
+        """
+        from merchantsguide import grammars
+        self._patch(grammars.COMMAND_GRAMMAR, "parse", "grammar.parse")
+        self._patch(grammars.COMMAND_VISITOR, "visit", "grammar.visit", recursive=True)
+
+    def _patch_on_first_call(self, target: dict, name: str, patch):
+        """
+        Auxiliary function that defers patching until a function is first called, until the profiler is disabled.
+
+        :param target: the dict that holds the function
+        :param name: the key of the function
+        :param patch: the function that patches, called without arguments before the first call is delegated
+        :return: None
+        """
+        original = target[name]
+        pending = [patch]
+
+        def first_call(*args, **kwargs):
+            while pending:
+                pending.pop()()
+            return original(*args, **kwargs)
+
+        target[name] = first_call
+        self._patches.append(partial(target.__setitem__, name, original))
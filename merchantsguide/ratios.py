@@ -0,0 +1,183 @@
+"""
+Ratios
+======
+
+Keeps the exchange ratios between minerals, e.g. '3 Gold is 7 Silver', so that minerals without a price in Credits can
+be valued through minerals that have one.
+
+The minerals connected by ratios form disjoint sets, which are kept in a weighted union-find structure: each mineral
+has a parent in its set and the ratio of its value to the value of its parent. Following the parents leads to the root
+of the set, and multiplying the ratios on the way yields the ratio of a mineral's value to the root's value. Paths are
+compressed on the way, and smaller sets are attached to the roots of larger ones, so finding the root takes nearly
+constant amortized time.
+
+A ratio between minerals of the same set must agree with the ratio implied by the set; otherwise it is rejected.
+
+Each set has an anchor: the mineral of the set whose price in Credits was updated last. The value of the other
+minerals of the set follows from the anchor's price, cf. Registry.get_unit_price.
+"""
+from fractions import Fraction
+
+
+class PriceRatios:
+    """
+    The exchange ratios between minerals, as disjoint sets of minerals with known ratios between their values.
+    """
+
+    def __init__(self):
+        """
+        Initialize without any ratios.
+        """
+        # the parent of each mineral, and the ratio of its value to that of its parent; roots are their own parents
+        self._parents = {}
+        self._weights = {}
+        # the number of minerals in the set of each root
+        self._sizes = {}
+        # the time of the last price update in Credits of a mineral of each root's set, and that mineral
+        self._anchors = {}
+
+    def __contains__(self, mineral: str) -> bool:
+        return mineral in self._parents
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def copy(self) -> "PriceRatios":
+        """
+        Copy the ratios.
+
+        :return: the copy
+        """
+        ratios = PriceRatios()
+        ratios._parents = dict(self._parents)
+        ratios._weights = dict(self._weights)
+        ratios._sizes = dict(self._sizes)
+        ratios._anchors = dict(self._anchors)
+        return ratios
+
+    def find(self, mineral: str) -> (str, Fraction):
+        """
+        Find the root of a mineral's set, compressing the path to it.
+
+        :param mineral: a mineral, which must have ratios
+        :return: the root and the ratio of the mineral's value to the root's value
+        """
+        parents, weights = self._parents, self._weights
+        path = []
+        root = mineral
+        while parents[root] != root:
+            path.append(root)
+            root = parents[root]
+        # Point every mineral on the path directly to the root, starting with the one closest to the root.
+        weight = 1
+        for node in reversed(path):
+            weight = weights[node] = weights[node] * weight
+            parents[node] = root
+        # the weight of a root is 1
+        return root, weights[mineral]
+
+    def ratio(self, mineral: str, other: str) -> Fraction:
+        """
+        Find the ratio of the values of two minerals.
+
+        :param mineral: a mineral
+        :param other: another mineral
+        :return: the value of the mineral divided by the value of the other mineral, or None if it is unknown
+        """
+        if mineral not in self._parents or other not in self._parents:
+            return None
+        root, weight = self.find(mineral)
+        other_root, other_weight = self.find(other)
+        return weight / other_weight if root == other_root else None
+
+    def union(self, mineral: str, other: str, ratio: Fraction):
+        """
+        Add a ratio between the values of two minerals, merging their sets.
+
+        :param mineral: a mineral
+        :param other: another mineral
+        :param ratio: the value of the mineral divided by the value of the other mineral
+        :return: None
+        :raise ValueError: if the minerals' sets imply another ratio
+        """
+        for m in (mineral, other):
+            if m not in self._parents:
+                self._parents[m], self._weights[m], self._sizes[m] = m, Fraction(1), 1
+        root, weight = self.find(mineral)
+        other_root, other_weight = self.find(other)
+        if root == other_root:
+            if weight / other_weight != ratio:
+                raise ValueError(f"{mineral} is worth {weight / other_weight} {other}, not {ratio}")
+            return
+        # the value of the root divided by the value of the other root
+        root_ratio = ratio * other_weight / weight
+        if self._sizes[root] < self._sizes[other_root]:
+            root, other_root, root_ratio = other_root, root, 1 / root_ratio
+        self._parents[other_root] = root
+        self._weights[other_root] = 1 / root_ratio
+        self._sizes[root] += self._sizes.pop(other_root)
+        anchor = self._anchors.pop(other_root, None)
+        # The merged set is anchored by the mineral whose price was updated last.
+        if anchor is not None and (root not in self._anchors or anchor[0] > self._anchors[root][0]):
+            self._anchors[root] = anchor
+
+    def anchor(self, mineral: str, time: int):
+        """
+        Make a mineral the anchor of its set if its price in Credits was updated later than that of the anchor.
+
+        :param mineral: a mineral that has ratios
+        :param time: the time of the price update, cf. Registry.price_updates
+        :return: None
+        """
+        root, _ = self.find(mineral)
+        current = self._anchors.get(root)
+        if current is None or time > current[0]:
+            self._anchors[root] = time, mineral
+
+    def get_anchor(self, mineral: str) -> (str, Fraction):
+        """
+        Find the anchor of a mineral's set.
+
+        :param mineral: a mineral
+        :return: the anchor and the ratio of the mineral's value to the anchor's value, or None if the mineral has no
+                 ratios or its set has no anchor
+        """
+        if mineral not in self._parents:
+            return None
+        root, weight = self.find(mineral)
+        anchor = self._anchors.get(root)
+        if anchor is None:
+            return None
+        _, anchor = anchor
+        return anchor, weight / self.find(anchor)[1]
+
+    def dump(self) -> dict:
+        """
+        Represent the ratios as JSON-compatible data.
+
+        :return: the parent, the numerator and the denominator of the ratio to the parent of each mineral, and the
+                 time and mineral of the anchor of each root
+        """
+        return {
+            "parents": {m: [parent, self._weights[m].numerator, self._weights[m].denominator]
+                        for m, parent in self._parents.items()},
+            "anchors": {root: list(anchor) for root, anchor in self._anchors.items()}
+        }
+
+    @classmethod
+    def load(cls, data: dict) -> "PriceRatios":
+        """
+        Restore ratios represented by dump.
+
+        :param data: the data
+        :return: the ratios
+        """
+        ratios = cls()
+        for m, (parent, numerator, denominator) in data["parents"].items():
+            ratios._parents[m] = parent
+            ratios._weights[m] = Fraction(numerator, denominator)
+        for m in ratios._parents:
+            root, _ = ratios.find(m)
+            ratios._sizes[root] = ratios._sizes.get(root, 0) + 1
+        ratios._anchors = {root: tuple(anchor) for root, anchor in data["anchors"].items()}
+        return ratios
@@ -3,19 +3,86 @@ Registry
 ========
 
 Keeps information on alien-Roman numeral mapping and mineral unit prices.
+
+The registry also maps Roman numerals back to alien numerals, so that integers can be encoded as alien numbers, cf.
+Registry.int2alien. If several alien numerals stand for the same Roman numeral, the alphabetically first is used.
+
+Unit prices are exact fractions. They are stored as pairs of integers (numerator, denominator), so that they can be
+used in integer arithmetic without any conversion.
+
+Minerals can be ranked by unit price, or looked up by a range of unit prices, with an index that is built on the first
+such query and then kept up to date by update_mineral, cf. merchantsguide.price_index.
+
+The registry also keeps the history of each mineral's unit prices, so that it can tell the price in effect at any
+earlier update, or the lowest and highest price during a range of updates, cf. merchantsguide.history. Updates are
+counted by the registry: its first price update is update 1.
+
+Minerals can also be priced relative to each other, e.g. '3 Gold is 7 Silver', cf. merchantsguide.ratios. A mineral
+without a price in Credits is then valued through the mineral of its set whose price in Credits was updated last. A
+ratio is rejected if it contradicts the ratios so far, or the prices of both minerals. Relative prices are neither
+ranked nor kept in the price histories.
 """
+import pickle
+from fractions import Fraction
 from numbers import Number
 
-from singleton_decorator import singleton
+from merchantsguide.cache import AlienNumberCache
+from merchantsguide.history import PriceHistory
+from merchantsguide.price_index import PriceIndex
+from merchantsguide.ratios import PriceRatios
+from merchantsguide.roman2int import PLACES, _place_digits, int2roman
+
+# The default number of alien number values cached by the registry.
+NUMBER_CACHE_SIZE = 4096
+
+
+class _DefaultRegistry(type):
+    """
+    Makes Registry() return the shared default registry, as when Registry was a singleton. Subclasses of Registry are
+    instantiated as usual.
+    """
 
+    def __call__(cls, *args, **kwargs):
+        if cls is not Registry:
+            return super().__call__(*args, **kwargs)
+        if args or kwargs:
+            raise TypeError("Registry() returns the shared default registry, use Registry.new to create another one")
+        return cls.default()
 
-@singleton
-class Registry:
+
+class Registry(metaclass=_DefaultRegistry):
     """
     Keeps information on alien-Roman numeral mapping and mineral unit prices.
 
-    Implemented as a singleton.
+    Also caches the values of alien numbers, cf. number_cache. Entries are invalidated when one of their numerals is
+    updated through update_numeral.
+
+    Registry() returns the shared default registry, which is also used by commands that are not given a registry, cf.
+    Registry.default. Registries created by Registry.new are independent of it and of each other.
     """
+    _default = None
+
+    @staticmethod
+    def default() -> "Registry":
+        """
+        Retrieve the shared default registry, creating it if necessary.
+
+        :return: the default registry
+        """
+        if Registry._default is None:
+            Registry._default = Registry.new()
+        return Registry._default
+
+    @classmethod
+    def new(cls, number_cache_size: int = NUMBER_CACHE_SIZE) -> "Registry":
+        """
+        Create an empty registry that is independent of the default registry.
+
+        :param number_cache_size: the number of alien number values to cache
+        :return: the registry
+        """
+        return type.__call__(cls, number_cache_size)
+
     def reset(self):
         """
         Resets the entire registry.
@@ -23,14 +90,96 @@ class Registry:
         :return: None
         """
         self.alien_numerals = {}
+        self.roman_numerals = {}
+        self._aliens_by_roman = {}
+        self._encoder = None
         self.mineral_prices = {}
+        self._price_index = None
+        self.price_history = {}
+        self.price_updates = 0
+        self.price_ratios = PriceRatios()
+        self._shared_numerals = self._shared_prices = False
+        self.number_cache.clear()
 
-    def __init__(self):
+    def __init__(self, number_cache_size: int = NUMBER_CACHE_SIZE):
         """
         Default constructor.
+
+        :param number_cache_size: the number of alien number values to cache
         """
         self.alien_numerals = {}
+        # The alien numeral used to encode each Roman numeral, and all alien numerals for each Roman numeral.
+        self.roman_numerals = {}
+        self._aliens_by_roman = {}
+        # The alien representations of all integers that can be encoded, built on demand, cf. int2alien.
+        self._encoder = None
         self.mineral_prices = {}
+        # The minerals sorted by unit price, built on demand, cf. get_most_valuable.
+        self._price_index = None
+        # The price history of each mineral and the number of its prices that belong to this registry, cf.
+        # merchantsguide.history, and the number of price updates so far.
+        self.price_history = {}
+        self.price_updates = 0
+        # The exchange ratios between minerals, cf. update_ratio.
+        self.price_ratios = PriceRatios()
+        # Whether the tables are shared with a snapshot and must be copied before they are written to.
+        self._shared_numerals = self._shared_prices = False
+        self.number_cache = AlienNumberCache(number_cache_size)
+
+    def snapshot(self) -> "Registry":
+        """
+        Create a copy of the registry.
+
+        Copying is cheap: the copies share their tables until either of them is updated, which copies the updated table.
+        Thus a snapshot can be read while the original is updated, and vice versa.
+
+        :return: the snapshot
+        """
+        snapshot = Registry.new(self.number_cache.maxsize)
+        snapshot.alien_numerals = self.alien_numerals
+        snapshot.roman_numerals = self.roman_numerals
+        snapshot._aliens_by_roman = self._aliens_by_roman
+        snapshot._encoder = self._encoder
+        snapshot.mineral_prices = self.mineral_prices
+        snapshot._price_index = self._price_index
+        snapshot.price_history = self.price_history
+        snapshot.price_updates = self.price_updates
+        snapshot.price_ratios = self.price_ratios
+        snapshot._shared_numerals = snapshot._shared_prices = True
+        self._shared_numerals = self._shared_prices = True
+        return snapshot
+
+    def dumps(self) -> bytes:
+        """
+        Pickle a snapshot of the registry, e.g. to send it to another process.
+
+        Unlike pickling a snapshot that is kept, this doesn't leave the tables shared, so the next update of the
+        registry doesn't copy them.
+
+        :return: the pickled snapshot
+        """
+        shared = self._shared_numerals, self._shared_prices
+        data = pickle.dumps(self.snapshot())
+        self._shared_numerals, self._shared_prices = shared
+        return data
+
+    def share_numerals(self, other: "Registry"):
+        """
+        Share the numeral tables of another registry that defines the same alien numerals, to save memory.
+
+        Like the tables of a snapshot, shared tables are copied before either registry updates them.
+
+        :param other: the other registry
+        :return: None
+        :raise ValueError: if the registries define different numerals
+        """
+        if other.alien_numerals != self.alien_numerals:
+            raise ValueError("Cannot share the numerals of a registry that defines different numerals")
+        self.alien_numerals = other.alien_numerals
+        self.roman_numerals = other.roman_numerals
+        self._aliens_by_roman = other._aliens_by_roman
+        self._encoder = other._encoder
+        self._shared_numerals = other._shared_numerals = True
 
     def update_numeral(self, alien: str, roman: str):
         """
@@ -40,17 +189,140 @@ class Registry:
         :param roman: a Roman numeral
         :return: None
         """
+        if self._shared_numerals:
+            self.alien_numerals = dict(self.alien_numerals)
+            self.roman_numerals = dict(self.roman_numerals)
+            self._aliens_by_roman = {r: set(aliens) for r, aliens in self._aliens_by_roman.items()}
+            self._shared_numerals = False
+        previous = self.alien_numerals.get(alien)
         self.alien_numerals[alien] = roman
+        self.number_cache.invalidate(alien)
+        if previous != roman:
+            if previous is not None:
+                self._unlink(alien, previous)
+            self._link(alien, roman)
+
+    def _link(self, alien: str, roman: str):
+        """
+        Auxiliary function that adds an alien numeral to the reverse mapping of a Roman numeral.
+
+        :param alien: an alien numeral
+        :param roman: the Roman numeral it stands for
+        :return: None
+        """
+        self._aliens_by_roman.setdefault(roman, set()).add(alien)
+        current = self.roman_numerals.get(roman)
+        if current is None or alien < current:
+            self.roman_numerals[roman] = alien
+            self._encoder = None
+
+    def _unlink(self, alien: str, roman: str):
+        """
+        Auxiliary function that removes an alien numeral from the reverse mapping of a Roman numeral.
+
+        :param alien: an alien numeral
+        :param roman: the Roman numeral it used to stand for
+        :return: None
+        """
+        aliens = self._aliens_by_roman[roman]
+        aliens.discard(alien)
+        if self.roman_numerals[roman] == alien:
+            if aliens:
+                self.roman_numerals[roman] = min(aliens)
+            else:
+                del self.roman_numerals[roman]
+                del self._aliens_by_roman[roman]
+            self._encoder = None
 
     def update_mineral(self, mineral: str, price: Number):
         """
         Update the mineral registry with the unit price of a mineral.
 
+        Prices are kept as exact fractions, i.e. other numbers are converted. The price is appended to the mineral's
+        price history.
+
         :param mineral: a mineral name
         :param price: the unit price
         :return: None
         """
-        self.mineral_prices[mineral] = price
+        if not isinstance(price, Fraction):
+            price = Fraction(price)
+        if self._shared_prices:
+            self._unshare_prices()
+        numerator, denominator = self.mineral_prices[mineral] = price.as_integer_ratio()
+        if self._price_index is not None:
+            self._price_index.update(mineral, price)
+        self.price_updates += 1
+        history, n = self.price_history.get(mineral, (None, 0))
+        if history is None:
+            history = PriceHistory()
+        elif len(history) != n:
+            # another registry has appended to the shared history
+            history = history.copy(n)
+        history.append(self.price_updates, numerator, denominator)
+        self.price_history[mineral] = history, n + 1
+        if mineral in self.price_ratios:
+            self.price_ratios.anchor(mineral, self.price_updates)
+
+    def update_ratio(self, mineral: str, other: str, ratio: Number):
+        """
+        Update the mineral registry with the ratio of the unit prices of two minerals.
+
+        A mineral that has a price in Credits when it gets its first ratio becomes the anchor of its set if it was
+        updated later than the set's anchor, cf. merchantsguide.ratios.
+
+        :param mineral: a mineral name
+        :param other: another mineral name
+        :param ratio: the unit price of the mineral divided by the unit price of the other mineral
+        :return: None
+        :raise ValueError: if the ratio contradicts the ratios so far
+        """
+        if not isinstance(ratio, Fraction):
+            ratio = Fraction(ratio)
+        self.check_ratio(mineral, other, ratio)
+        if self._shared_prices:
+            self._unshare_prices()
+        ratios = self.price_ratios
+        new = [m for m in (mineral, other) if m not in ratios and m in self.price_history]
+        ratios.union(mineral, other, ratio)
+        for m in new:
+            history, n = self.price_history[m]
+            ratios.anchor(m, history.times[n - 1])
+
+    def check_ratio(self, mineral: str, other: str, ratio: Fraction):
+        """
+        Check that the ratio of the unit prices of two minerals agrees with the ratios and prices so far.
+
+        The ratio of minerals of the same set must agree with the set. Otherwise, if both minerals have a unit price,
+        whether their own or through their ratios, the ratio must agree with these prices.
+
+        :param mineral: a mineral name
+        :param other: another mineral name
+        :param ratio: the unit price of the mineral divided by the unit price of the other mineral
+        :return: None
+        :raise ValueError: if the ratios or prices so far imply another ratio
+        """
+        known = self.price_ratios.ratio(mineral, other)
+        if known is None:
+            try:
+                known = self.get_mineral(mineral) / self.get_mineral(other)
+            except ValueError:
+                pass
+        if known is not None and known != ratio:
+            raise ValueError(f"{mineral} is worth {known} {other}, not {ratio}")
+
+    def _unshare_prices(self):
+        """
+        Auxiliary function that copies the price tables shared with a snapshot.
+
+        :return: None
+        """
+        self.mineral_prices = dict(self.mineral_prices)
+        self.price_history = dict(self.price_history)
+        if self._price_index is not None:
+            self._price_index = self._price_index.copy()
+        self.price_ratios = self.price_ratios.copy()
+        self._shared_prices = False
 
     def get_numeral(self, numeral: str):
         """
@@ -65,7 +337,63 @@ class Registry:
         except KeyError:
             raise ValueError(f"Unknown alien numeral '{numeral}'")
 
-    def get_mineral(self, mineral: str) -> Number:
+    def int2alien(self, n: int) -> str:
+        """
+        Encode an integer as an alien number.
+
+        :param n: an integer 0 <= n < 4000
+        :return: the space-separated alien numerals representing n, where 0 is represented by the empty string
+        :raise ValueError: if n is out of range or one of its Roman numerals has no alien numeral
+        """
+        encoder = self._encoder or self._build_encoder()
+        if not 0 <= n < len(encoder):
+            raise ValueError(f"Cannot represent {n} as Roman numerals")
+        alien = encoder[n]
+        if alien is None:
+            roman = next(r for r in int2roman(n) if r not in self.roman_numerals)
+            raise ValueError(f"No alien numeral for Roman numeral '{roman}'")
+        return alien
+
+    def int2alien_many(self, numbers) -> [str]:
+        """
+        Encode many integers as alien numbers.
+
+        :param numbers: a sequence of integers 0 <= n < 4000, e.g. a list or a NumPy array
+        :return: the alien numbers, cf. int2alien
+        :raise ValueError: if an integer cannot be encoded
+        """
+        encoder = self._encoder or self._build_encoder()
+        if len(numbers) and not (0 <= min(numbers) and max(numbers) < len(encoder)):
+            for n in numbers:
+                self.int2alien(n)
+        aliens = [encoder[n] for n in numbers]
+        if None in aliens:
+            self.int2alien(numbers[aliens.index(None)])
+        return aliens
+
+    def _build_encoder(self) -> [str]:
+        """
+        Auxiliary function that encodes all integers that can be represented as Roman numerals.
+
+        :return: the alien number of each integer, or None if one of its Roman numerals has no alien numeral
+        """
+        digits = self.roman_numerals
+        # Like the index of Roman numerals, the encoder is built one decimal place at a time.
+        encoder = [""]
+        for one, five, ten, _ in PLACES:
+            place = []
+            for roman in _place_digits(one, five, ten):
+                try:
+                    place.append(" ".join([digits[r] for r in roman]))
+                except KeyError:
+                    place.append(None)
+            encoder = [(f"{prefix} {digit}" if prefix and digit else prefix or digit)
+                       if prefix is not None and digit is not None else None
+                       for prefix in encoder for digit in place]
+        self._encoder = encoder
+        return encoder
+
+    def get_mineral(self, mineral: str) -> Fraction:
         """
         Given the name of a mineral, retrieve its unit price.
 
@@ -73,7 +401,111 @@ class Registry:
         :return: the unit price
         :raise ValueError: if the mineral's price is unknown
         """
+        return Fraction(*self.get_unit_price(mineral))
+
+    def get_unit_price(self, mineral: str) -> (int, int):
+        """
+        Given the name of a mineral, retrieve its unit price as a pair of integers.
+
+        A mineral's own price in Credits takes precedence over the price that follows from its ratios.
+
+        :param mineral: a mineral name
+        :return: the numerator and the (positive) denominator of the unit price, in lowest terms
+        :raise ValueError: if the mineral's price is unknown
+        """
         try:
             return self.mineral_prices[mineral]
+        except KeyError:
+            pass
+        anchor = self.price_ratios.get_anchor(mineral)
+        if anchor is None:
+            raise ValueError(f"Unknown mineral '{mineral}'")
+        anchor, ratio = anchor
+        numerator, denominator = self.mineral_prices[anchor]
+        return Fraction(numerator * ratio.numerator, denominator * ratio.denominator).as_integer_ratio()
+
+    def get_most_valuable(self, k: int) -> [str]:
+        """
+        Retrieve the minerals with the highest unit prices.
+
+        :param k: the number of minerals
+        :return: the names of at most k minerals, from the highest unit price; minerals of the same price in reverse
+                 alphabetical order
+        """
+        return self._get_price_index().highest(k)
+
+    def get_least_valuable(self, k: int) -> [str]:
+        """
+        Retrieve the minerals with the lowest unit prices.
+
+        :param k: the number of minerals
+        :return: the names of at most k minerals, from the lowest unit price; minerals of the same price in
+                 alphabetical order
+        """
+        return self._get_price_index().lowest(k)
+
+    def get_minerals_between(self, low: Number, high: Number) -> [str]:
+        """
+        Retrieve the minerals whose unit prices are in a range.
+
+        :param low: the lowest unit price
+        :param high: the highest unit price
+        :return: the names of the minerals, from the lowest unit price
+        """
+        return self._get_price_index().between(low, high)
+
+    def _get_price_index(self) -> PriceIndex:
+        """
+        Auxiliary function that retrieves the index of minerals by unit price, building it if necessary.
+
+        :return: the index
+        """
+        if self._price_index is None:
+            self._price_index = PriceIndex(self.mineral_prices)
+        return self._price_index
+
+    def get_unit_price_at(self, mineral: str, update: int) -> (int, int):
+        """
+        Given the name of a mineral, retrieve the unit price in effect at an update as a pair of integers.
+
+        :param mineral: a mineral name
+        :param update: the number of the update, cf. price_updates
+        :return: the numerator and the (positive) denominator of the unit price, in lowest terms
+        :raise ValueError: if the mineral's price is unknown or was not set yet at that update
+        """
+        history, n = self._get_price_history(mineral)
+        price = history.at(update, n)
+        if price is None:
+            raise ValueError(f"No price of mineral '{mineral}' at update {update}")
+        return price
+
+    def get_unit_price_range(self, mineral: str, start: int, end: int) -> ((int, int), (int, int)):
+        """
+        Given the name of a mineral, retrieve the lowest and the highest unit price in effect during a range of updates.
+
+        :param mineral: a mineral name
+        :param start: the number of the first update of the range, cf. price_updates
+        :param end: the number of the last update of the range
+        :return: the lowest and the highest unit price, each as a pair of integers, cf. get_unit_price
+        :raise ValueError: if the range is empty, or the mineral's price is unknown or was not set yet at its end
+        """
+        if start > end:
+            raise ValueError(f"Update {start} is later than update {end}")
+        history, n = self._get_price_history(mineral)
+        prices = history.range(start, end, n)
+        if prices is None:
+            raise ValueError(f"No price of mineral '{mineral}' between update {start} and {end}")
+        return prices
+
+    def _get_price_history(self, mineral: str) -> (PriceHistory, int):
+        """
+        Auxiliary function that retrieves the price history of a mineral.
+
+        :param mineral: a mineral name
+        :return: the history and the number of its prices that belong to this registry
+        :raise ValueError: if the mineral's price is unknown
+        """
+        try:
+            return self.price_history[mineral]
         except KeyError:
             raise ValueError(f"Unknown mineral '{mineral}'")
@@ -3,29 +3,33 @@ Roman2Int
 =========
 
 Converts Roman numbers < 4000 into integers.
+
+Conversion is done by a table-driven state machine that validates and sums a numeral in a single pass, which can also
+fold in the translations of alien numerals one by one, cf. roman2int_folded and fold_roman, stopping at the first
+numeral that is unknown or invalid.
+The original parsimonious grammar is kept as a reference implementation, cf. roman2int_grammar; it is compiled on
+first use.
+Optionally, all valid Roman numerals can be looked up in a precomputed index, cf. roman2int_indexed and int2roman,
+or int2roman_many to encode many integers at once.
+Many numbers can be converted at once with NumPy, if it is installed, cf. roman2int_many and alien2int_many.
 """
-from parsimonious import Grammar, NodeVisitor, ParseError
-
-# The grammar used to parse Roman numbers.
-GRAMMAR = Grammar(
-    r"""
-    number = thousands? hundreds? tens? ones?
-    
-    ones = sub_ones / ("V"? single_ones?)
-    sub_ones = "IX" / "IV"
-    single_ones = "I" "I"? "I"?
-    
-    tens = sub_tens / ("L"? single_tens?)
-    sub_tens = "XC" / "XL"
-    single_tens = "X" "X"? "X"?
-    
-    hundreds = sub_hundreds / ("D"? single_hundreds?)
-    sub_hundreds = "CM" / "CD"
-    single_hundreds = "C" "C"? "C"?
-    
-    thousands = "M" "M"? "M"?
+# The names that moved to merchantsguide.grammars, which is imported on first access, cf. __getattr__.
+_GRAMMAR_NAMES = {"GRAMMAR": "ROMAN_GRAMMAR", "VISITOR": "ROMAN_VISITOR", "RomanVisitor": "RomanVisitor"}
+
+
+def __getattr__(name: str):
     """
-)
+    Provide the grammar of Roman numbers and its visitor under their former names, compiling the grammar if necessary.
+
+    :param name: the name of the module attribute
+    :return: the attribute
+    :raise AttributeError: if there is no such attribute
+    """
+    if name in _GRAMMAR_NAMES:
+        from merchantsguide import grammars
+        return getattr(grammars, _GRAMMAR_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # The value of each individual numeral.
 VALUES = {
@@ -39,70 +43,294 @@ VALUES = {
 }
 
 
-class RomanVisitor(NodeVisitor):
+# The numerals of each decimal place, from the highest to the lowest, as (one, five, ten, value of one).
+PLACES = (
+    ("M", None, None, 1000),
+    ("C", "D", "M", 100),
+    ("X", "L", "C", 10),
+    ("I", "V", "X", 1)
+)
+
+
+def _build_transitions() -> dict:
     """
-    Traverses the parse tree and calculates the integer value.
+    Auxiliary function that builds the transition table of the state machine used by roman2int.
+
+    A state is encoded as 10 * place + progress, where place indexes PLACES and progress is the value of the numerals
+    read in that place so far; a progress of 9 marks a place closed by a *subtractive pair*, i.e. 'IV' or 'XC'.
+    Each state maps the numerals it accepts to the next state and the value to add. This mirrors the grammar: the
+    decimal places are optional and occur in descending order.
 
-    Methods with the signature
-        visit_*node_type*(self, node, visited_children)
-    are called dynamically from the base class.
+    :return: the transition table
     """
-    @staticmethod
-    def _sub(text: str) -> int:
-        """
-        Auxiliary function that calculates the value of *subtractive pairs* of Roman numerals, i.e. 'IV' or 'XC'.
+    transitions = {}
+    for place, (one, five, ten, unit) in enumerate(PLACES):
+        for progress in ((0, 1, 2, 3, 5, 6, 7, 8, 9) if five else (0, 1, 2, 3)):
+            table = {}
+            # Numerals that open one of the lower places.
+            for lower, (lower_one, lower_five, _, lower_unit) in enumerate(PLACES[place + 1:], place + 1):
+                table[lower_one] = (10 * lower + 1, lower_unit)
+                table[lower_five] = (10 * lower + 5, 5 * lower_unit)
+            # Numerals that continue the current place.
+            if progress in (0, 1, 2, 5, 6, 7):
+                table[one] = (10 * place + progress + 1, unit)
+            if progress == 0 and five:
+                table[five] = (10 * place + 5, 5 * unit)
+            if progress == 1 and five:
+                table[five] = (10 * place + 9, 3 * unit)
+                table[ten] = (10 * place + 9, 8 * unit)
+            transitions[10 * place + progress] = table
+    return transitions
 
-        :param text:
-        :return:
-        """
-        return VALUES[text[1]] - VALUES[text[0]]
 
-    def visit_sub_ones(self, node, visited_children):
-        return self._sub(node.text)
+# The transition table of the state machine used by roman2int; 0 is the initial state.
+TRANSITIONS = _build_transitions()
 
-    def visit_sub_tens(self, node, visited_children):
-        return self._sub(node.text)
+# The number of numerals of the longest Roman number < 4000, i.e. 'MMMDCCCLXXXVIII'.
+MAX_LENGTH = 15
 
-    def visit_sub_hundreds(self, node, visited_children):
-        return self._sub(node.text)
 
-    def generic_visit(self, node, visited_children) -> int:
-        """
-        Recursively defines the value of each node that isn't a *subtractive pair*.
+def roman2int(s: str) -> int:
+    """
+    Parse a string of roman numerals representing a number < 4000 and, if successful, calculate its integer value.
 
-        :param node: the node in question
-        :param visited_children: the node's children *after* visiting (i.e. after recursion returns)
-        :return: the aggregated value of the node
-        """
-        # Empty (non-matched) node, i.e. a missing decimal place.
-        # Has a value of 0.
-        if node.text == "":
-            return 0
-        # Single numeral.
-        # Has the value assigned by VALUES.
-        if len(node.text) == 1:
-            return VALUES[node.text]
-        # Multiple numerals or subtractive pairs.
-        # Has a value equal to the sum of all child nodes.
-        return sum(visited_children)
+    As a quirk, the empty string is interpreted as 0, which is fair enough.
 
+    :param s: a string of roman numerals
+    :return: the integer value
+    :raise ValueError: if parsing fails
+    """
+    transitions = TRANSITIONS
+    state = value = 0
+    try:
+        for c in s:
+            state, increment = transitions[state][c]
+            value += increment
+    except KeyError:
+        raise ValueError(f"Could not parse input '{s}' as Roman numerals")
 
-VISITOR = RomanVisitor()
+    return value
 
 
-def roman2int(s: str) -> int:
+def fold_roman(symbols, numerals: dict) -> int:
     """
-    Parse a string of roman numerals representing a number < 4000 and, if successful, calculate its integer value.
+    Fold the Roman numerals that a sequence of symbols stands for into a value one by one, e.g. alien numerals.
 
-    As a quirk, the empty string is interpreted as 0, which is fair enough.
+    Stops at the first symbol that is unknown or whose Roman numerals break the rules of Roman numbers, so that long
+    invalid inputs are rejected early.
+
+    :param symbols: the symbols, e.g. a tuple of alien numerals
+    :param numerals: the Roman numeral of each symbol, e.g. Registry.alien_numerals
+    :return: the integer value, or None if a symbol is unknown or the Roman numerals don't form a valid Roman number
+    """
+    transitions = TRANSITIONS
+    state = value = 0
+    try:
+        for symbol in symbols:
+            for c in numerals[symbol]:
+                state, increment = transitions[state][c]
+                value += increment
+    except KeyError:
+        return None
+
+    return value
+
+
+def roman2int_folded(symbols, numerals: dict) -> int:
+    """
+    Calculate the value of a sequence of symbols that stand for Roman numerals, e.g. alien numerals.
+
+    Like roman2int, but folds the Roman numerals into the value one by one instead of joining them into a string first,
+    cf. fold_roman.
+
+    :param symbols: the symbols, e.g. a tuple of alien numerals
+    :param numerals: the Roman numeral of each symbol, e.g. Registry.alien_numerals
+    :return: the integer value
+    :raise ValueError: if a symbol is unknown or the Roman numerals don't form a valid Roman number
+    """
+    value = fold_roman(symbols, numerals)
+    if value is None:
+        raise ValueError(f"Could not parse input '{' '.join(symbols)}' as Roman numerals")
+
+    return value
+
+
+def roman2int_grammar(s: str) -> int:
+    """
+    Reference implementation of roman2int that parses the input with the grammar and visits the resulting tree.
+
+    Much slower than roman2int, but a useful oracle when testing it. The grammar is compiled on first use, cf.
+    merchantsguide.grammars.
 
     :param s: a string of roman numerals
     :return: the integer value
     :raise ValueError: if parsing fails
     """
+    from parsimonious import ParseError
+    from merchantsguide.grammars import ROMAN_GRAMMAR, ROMAN_VISITOR
+
     try:
-        tree = GRAMMAR.parse(s)
+        tree = ROMAN_GRAMMAR.parse(s)
     except ParseError:
         raise ValueError(f"Could not parse input '{s}' as Roman numerals")
 
-    return VISITOR.visit(tree)
+    return ROMAN_VISITOR.visit(tree)
+
+
+# Lazily built indices of all valid Roman numerals, cf. build_index.
+ROMAN_INDEX = {}
+INT_INDEX = []
+
+
+def _place_digits(one: str, five: str, ten: str) -> [str]:
+    """
+    Auxiliary function that lists the Roman representations of the digits of a decimal place.
+
+    :param one: the numeral worth one unit of the place, e.g. 'X'
+    :param five: the numeral worth five units of the place, if any, e.g. 'L'
+    :param ten: the numeral worth ten units of the place, if any, e.g. 'C'
+    :return: the representations of the digits 0-9, or only 0-3 if the place has no five
+    """
+    digits = ["", one, 2 * one, 3 * one]
+    if five:
+        digits += [one + five, five, five + one, five + 2 * one, five + 3 * one, one + ten]
+    return digits
+
+
+def build_index():
+    """
+    Build the indices of all valid Roman numerals, unless they have already been built.
+
+    ROMAN_INDEX maps each valid Roman numeral to its value; INT_INDEX lists the Roman numeral of each value < 4000.
+
+    :return: None
+    """
+    if INT_INDEX:
+        return
+    numerals = [""]
+    for one, five, ten, _ in PLACES:
+        digits = _place_digits(one, five, ten)
+        numerals = [numeral + digit for numeral in numerals for digit in digits]
+    INT_INDEX.extend(numerals)
+    ROMAN_INDEX.update((numeral, value) for value, numeral in enumerate(numerals))
+
+
+def roman2int_indexed(s: str) -> int:
+    """
+    Look up the value of a string of Roman numerals in the index; an alternative to roman2int.
+
+    The index is built on first use. Strings that are not in the index fall through to roman2int for the error.
+
+    :param s: a string of roman numerals
+    :return: the integer value
+    :raise ValueError: if s is not a valid Roman number
+    """
+    try:
+        return ROMAN_INDEX[s]
+    except KeyError:
+        build_index()
+    if s in ROMAN_INDEX:
+        return ROMAN_INDEX[s]
+    return roman2int(s)
+
+
+def int2roman(n: int) -> str:
+    """
+    Look up the Roman representation of an integer in the index.
+
+    The index is built on first use.
+
+    :param n: an integer 0 <= n < 4000
+    :return: the Roman numerals representing n, where 0 is represented by the empty string
+    :raise ValueError: if n is out of range
+    """
+    build_index()
+    if not 0 <= n < len(INT_INDEX):
+        raise ValueError(f"Cannot represent {n} as Roman numerals")
+    return INT_INDEX[n]
+
+
+def int2roman_many(numbers) -> [str]:
+    """
+    Look up the Roman representations of many integers in the index.
+
+    :param numbers: a sequence of integers 0 <= n < 4000, e.g. a list or a NumPy array
+    :return: the Roman numerals representing each integer
+    :raise ValueError: if an integer is out of range
+    """
+    build_index()
+    if len(numbers) and not (0 <= min(numbers) and max(numbers) < len(INT_INDEX)):
+        for n in numbers:
+            int2roman(n)
+    return [INT_INDEX[n] for n in numbers]
+
+
+# The canonical Roman numerals of all values < 4000 as a NumPy array, cf. roman2int_many.
+_CANONICAL = None
+
+
+def roman2int_many(numbers) -> tuple:
+    """
+    Convert many strings of Roman numerals at once. Requires NumPy.
+
+    Values are calculated by vectorized summation of the VALUES of the numerals, where numerals followed by a numeral
+    of greater value count negatively. A string is valid iff it is the canonical representation of its sum. Instead of
+    raising on the first invalid string, all strings are converted and the indices of the invalid ones are reported.
+
+    :param numbers: a sequence or a NumPy array of strings of Roman numerals
+    :return: an int64 array of the values, with -1 for invalid strings, and an array of the indices of invalid strings
+    """
+    import numpy as np
+
+    global _CANONICAL
+    if _CANONICAL is None:
+        build_index()
+        _CANONICAL = np.array(INT_INDEX)
+
+    strings = np.ascontiguousarray(numbers, dtype=str)
+    codes = strings.view(np.uint32).reshape(len(strings), strings.dtype.itemsize // 4)
+    table = np.zeros(128, dtype=np.int64)
+    for numeral, value in VALUES.items():
+        table[ord(numeral)] = value
+    # Unknown characters count as 0, which makes the string differ from the canonical representation of its sum.
+    values = table[np.minimum(codes, 127)]
+    following = np.zeros_like(values)
+    following[:, :-1] = values[:, 1:]
+    sums = np.where(values < following, -values, values).sum(axis=1)
+
+    in_range = (sums >= 0) & (sums < len(_CANONICAL))
+    valid = in_range & (_CANONICAL[np.where(in_range, sums, 0)] == strings)
+    return np.where(valid, sums, -1), np.flatnonzero(~valid)
+
+
+def alien2int_many(numbers, numerals: dict) -> tuple:
+    """
+    Convert many alien numbers at once. Requires NumPy.
+
+    Like roman2int_many, all alien numbers are converted and the indices of the invalid ones are reported, i.e. those
+    with unknown numerals or whose numerals don't form a valid Roman number.
+
+    :param numbers: a sequence or a NumPy array of alien numbers, given as lists of numerals or space-separated strings
+    :param numerals: the Roman numeral of each alien numeral, e.g. Registry.alien_numerals
+    :return: an int64 array of the values, with -1 for invalid numbers, and an array of the indices of invalid numbers
+    """
+    import numpy as np
+
+    # Each distinct alien number is translated and converted only once.
+    slots = {}
+    romans = []
+    indices = []
+    for number in numbers:
+        key = number if isinstance(number, str) else tuple(number)
+        slot = slots.get(key)
+        if slot is None:
+            try:
+                roman = "".join([numerals[numeral] for numeral in (key.split(" ") if isinstance(key, str) else key)])
+            except KeyError:
+                roman = "?"
+            slot = slots[key] = len(romans)
+            romans.append(roman)
+        indices.append(slot)
+    values, _ = roman2int_many(romans)
+    values = values[np.array(indices, dtype=np.intp)]
+    return values, np.flatnonzero(values < 0)
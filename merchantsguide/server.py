@@ -0,0 +1,114 @@
+"""
+Server
+======
+
+Serves the Merchant's Guide to many concurrent clients over TCP or Unix domain sockets.
+
+Clients send newline-separated commands and receive exactly one line per command, in order; the response to a
+successful update is an empty line. Clients may pipeline commands, i.e. send many without waiting for the responses.
+
+All connections share one registry, or the registries of several tenants, cf. merchantsguide.tenants, in which case
+each connection starts with the default tenant. Commands are executed on the event loop, one at a time and to
+completion, in the order in which their lines are received: a query sees exactly the updates that were received before
+it, from any connection. The commands of one connection are executed in the order in which they were sent.
+"""
+import asyncio
+from functools import partial
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+from merchantsguide.tenants import TenantMerchant, Tenants
+
+# The number of bytes read from a connection at a time.
+READ_SIZE = 1 << 16
+
+# Connections that send longer lines are closed.
+MAX_LINE = 1 << 16
+
+
+async def _handle(merchant: Merchant, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Auxiliary function that serves a single connection until the client closes it.
+
+    Executes all complete lines of each chunk read and sends their responses in one write.
+
+    :param merchant: the merchant executing the commands
+    :param reader: the connection's reader
+    :param writer: the connection's writer
+    :return: None
+    """
+    buffer = b""
+    try:
+        while True:
+            data = await reader.read(READ_SIZE)
+            lines = (buffer + data).split(b"\n")
+            buffer = lines.pop()
+            if len(buffer) > MAX_LINE:
+                break
+            if not data and buffer:
+                # the last line need not end with a newline
+                lines.append(buffer)
+            if lines:
+                responses = [merchant.single_command(line.decode(errors="replace").strip()) for line in lines]
+                writer.write("".join([f"{res or ''}\n" for res in responses]).encode())
+                await writer.drain()
+            if not data:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_tenants(tenants: Tenants, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Auxiliary function that serves a single connection to the registries of several tenants, cf. _handle.
+
+    :param tenants: the tenants
+    :param reader: the connection's reader
+    :param writer: the connection's writer
+    :return: None
+    """
+    await _handle(TenantMerchant(tenants), reader, writer)
+
+
+async def start_server(host: str = None, port: int = None, path: str = None, registry: Registry = None,
+                       backlog: int = 1024, tenants: Tenants = None) -> asyncio.AbstractServer:
+    """
+    Start serving on a TCP port or a Unix domain socket.
+
+    :param host: the TCP host to bind to, defaults to all interfaces
+    :param port: the TCP port to listen on
+    :param path: the path of the Unix domain socket, if given instead of a TCP port
+    :param registry: the registry shared by all connections, defaults to the shared default registry
+    :param backlog: the maximum number of queued connections
+    :param tenants: the tenants whose registries are served instead of a single registry
+    :return: the server
+    """
+    handler = partial(_handle, Merchant(registry)) if tenants is None else partial(_handle_tenants, tenants)
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path, backlog=backlog)
+    return await asyncio.start_server(handler, host, port, backlog=backlog)
+
+
+def serve(host: str = None, port: int = None, path: str = None, registry: Registry = None,
+          tenants: Tenants = None):  # pragma: no cover
+    """
+    Serve on a TCP port or a Unix domain socket until interrupted.
+
+    :param host: the TCP host to bind to, defaults to all interfaces
+    :param port: the TCP port to listen on
+    :param path: the path of the Unix domain socket, if given instead of a TCP port
+    :param registry: the registry shared by all connections, defaults to the shared default registry
+    :param tenants: the tenants whose registries are served instead of a single registry
+    :return: None
+    """
+    async def main():
+        server = await start_server(host, port, path, registry, tenants=tenants)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,478 @@
+"""
+Shared
+======
+
+Shares the numerals and prices of a registry with other processes through shared memory, so that they can answer
+queries without receiving copies of the registry.
+
+One process owns a SharedRegistry, which publishes each of its updates to SharedTables in a block of shared memory.
+Any number of processes attach to the block by its name and answer queries with a SharedRegistryView, which reads the
+tables in place. Only the keys that a view has looked up before, i.e. the IDs of alien numerals and minerals, are kept
+by the view itself.
+
+The tables are arrays of 64 bit integers indexed by key ID. Keys, i.e. alien numerals, Roman numerals and minerals,
+are interned once: their UTF-8 bytes are appended to an arena, and an open-addressing hash index maps them to their
+ID. Keys are never removed, so IDs are stable. The tables hold the Roman numeral of each alien numeral as the ID of
+the Roman numeral, and the unit price of each mineral as numerator and denominator. Unit prices whose numerator or
+denominator don't fit into 64 bits are marked as such and cannot be read by views.
+
+Readers are synchronized with the writer by a seqlock: the writer increments a sequence number before and after each
+update, and a view executes a command again if the sequence number was odd or changed meanwhile, cf.
+SharedRegistryView.execute. Thus commands see a consistent state without any locking, and the writer never waits for
+readers. This relies on the stores of the writer becoming visible in order, as on x86.
+
+The price histories are not shared, nor is the price index: views answer ranking queries by scanning all prices.
+Minerals cannot be priced relative to each other, cf. merchantsguide.ratios, because views could not value them.
+"""
+from fractions import Fraction
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from numbers import Number
+from zlib import crc32
+
+from merchantsguide.cache import AlienNumberCache
+from merchantsguide.registry import Registry, NUMBER_CACHE_SIZE
+
+# Identifies the layout of the tables.
+MAGIC = 0x4D475348_00000001
+
+# The default capacity of the tables, i.e. the number of distinct keys, and the default size of the key arena in bytes.
+CAPACITY = 1 << 16
+ARENA_SIZE = 1 << 20
+
+# The slots of the header.
+_SEQUENCE, _NUMERALS_VERSION, _KEYS, _ARENA_USED, _CAPACITY, _ARENA_SIZE, _SLOTS, _MAGIC = range(8)
+_HEADER_SIZE = 8
+
+# Marks a denominator whose price doesn't fit into the tables.
+_TOO_LARGE = -1
+_INT64 = 1 << 63
+
+
+class SharedTables:
+    """
+    Tables of alien numerals and unit prices in a block of shared memory, updated by one process and read by many.
+    """
+
+    def __init__(self, memory: SharedMemory):
+        """
+        Initialize the tables in a block of shared memory. Use create or attach instead.
+
+        :param memory: the block, whose header is initialized
+        """
+        self.memory = memory
+        self._ints = ints = memory.buf[:memory.size - memory.size % 8].cast("q")
+        capacity, slots = ints[_CAPACITY], ints[_SLOTS]
+        # the offsets of the index and of the arrays indexed by key ID
+        self._index = _HEADER_SIZE
+        self._offsets = self._index + slots
+        self._lengths = self._offsets + capacity
+        self._romans = self._lengths + capacity
+        self._numerators = self._romans + capacity
+        self._denominators = self._numerators + capacity
+        self._arena = memory.buf[8 * (self._denominators + capacity):]
+        # the IDs of the keys looked up by this process
+        self._ids = {}
+
+    @classmethod
+    def create(cls, capacity: int = CAPACITY, arena_size: int = ARENA_SIZE) -> "SharedTables":
+        """
+        Create empty tables in a new block of shared memory.
+
+        :param capacity: the maximum number of distinct keys
+        :param arena_size: the maximum total size of the keys in bytes
+        :return: the tables
+        """
+        slots = 1 << (2 * capacity - 1).bit_length()
+        memory = SharedMemory(create=True, size=8 * (_HEADER_SIZE + slots + 5 * capacity) + arena_size)
+        header = memory.buf[:8 * _HEADER_SIZE].cast("q")
+        header[_CAPACITY], header[_ARENA_SIZE], header[_SLOTS], header[_MAGIC] = capacity, arena_size, slots, MAGIC
+        header.release()
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedTables":
+        """
+        Attach to the tables created by another process.
+
+        :param name: the name of the block of shared memory, cf. SharedTables.name
+        :return: the tables
+        :raise ValueError: if the block doesn't hold tables
+        """
+        # Only the creator may unlink the block, but before Python 3.13, attached blocks are tracked as well and would
+        # be unlinked when this process exits.
+        try:
+            memory = SharedMemory(name, track=False)
+        except TypeError:
+            memory = SharedMemory(name)
+            resource_tracker.unregister(memory._name, "shared_memory")
+        header = memory.buf[:8 * _HEADER_SIZE].cast("q") if memory.size >= 8 * _HEADER_SIZE else None
+        magic = header[_MAGIC] if header else None
+        if header:
+            header.release()
+        if magic != MAGIC:
+            memory.close()
+            raise ValueError(f"The shared memory '{name}' doesn't hold a registry")
+        return cls(memory)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @property
+    def sequence(self) -> int:
+        """
+        The sequence number of the seqlock, which is odd while an update is in progress.
+        """
+        return self._ints[_SEQUENCE]
+
+    @property
+    def numerals_version(self) -> int:
+        """
+        The number of numeral updates so far, so that readers can tell if their cached values are stale.
+        """
+        return self._ints[_NUMERALS_VERSION]
+
+    def close(self):
+        """
+        Detach from the tables.
+
+        :return: None
+        """
+        self._ints.release()
+        self._arena.release()
+        self.memory.close()
+
+    def unlink(self):
+        """
+        Free the block of shared memory, once all processes have detached from it. Only the creator should unlink it.
+
+        :return: None
+        """
+        # attach may have untracked the block, cf. attach
+        resource_tracker.register(self.memory._name, "shared_memory")
+        self.memory.unlink()
+
+    def find(self, key: str) -> int:
+        """
+        Find the ID of a key.
+
+        :param key: the key
+        :return: the ID, or -1 if the key is unknown
+        """
+        try:
+            return self._ids[key]
+        except KeyError:
+            pass
+        ints, arena = self._ints, self._arena
+        data = key.encode()
+        mask = ints[_SLOTS] - 1
+        slot = crc32(data) & mask
+        while True:
+            entry = ints[self._index + slot]
+            if not entry:
+                return -1
+            i = entry - 1
+            offset = ints[self._offsets + i]
+            if arena[offset:offset + ints[self._lengths + i]] == data:
+                self._ids[key] = i
+                return i
+            slot = (slot + 1) & mask
+
+    def _intern(self, key: str) -> int:
+        """
+        Auxiliary function that finds the ID of a key, adding the key if necessary. Writer only.
+
+        :param key: the key
+        :return: the ID
+        :raise ValueError: if the tables are full
+        """
+        i = self.find(key)
+        if i >= 0:
+            return i
+        ints = self._ints
+        data = key.encode()
+        i, offset = ints[_KEYS], ints[_ARENA_USED]
+        if i == ints[_CAPACITY] or offset + len(data) > ints[_ARENA_SIZE]:
+            raise ValueError("The shared registry is full")
+        self._arena[offset:offset + len(data)] = data
+        ints[self._offsets + i], ints[self._lengths + i] = offset, len(data)
+        ints[_ARENA_USED] = offset + len(data)
+        ints[_KEYS] = i + 1
+        # The slot is written last, so readers find complete keys only.
+        mask = ints[_SLOTS] - 1
+        slot = crc32(data) & mask
+        while ints[self._index + slot]:
+            slot = (slot + 1) & mask
+        ints[self._index + slot] = i + 1
+        self._ids[key] = i
+        return i
+
+    def _key(self, i: int) -> str:
+        """
+        Auxiliary function that retrieves a key by its ID.
+
+        :param i: the ID
+        :return: the key
+        """
+        offset = self._ints[self._offsets + i]
+        return bytes(self._arena[offset:offset + self._ints[self._lengths + i]]).decode()
+
+    def set_numeral(self, alien: str, roman: str):
+        """
+        Set the Roman numeral of an alien numeral. Writer only.
+
+        :param alien: the alien numeral
+        :param roman: the Roman numeral
+        :return: None
+        :raise ValueError: if the tables are full
+        """
+        i, roman = self._intern(alien), self._intern(roman)
+        ints = self._ints
+        ints[_SEQUENCE] += 1
+        ints[_NUMERALS_VERSION] += 1
+        ints[self._romans + i] = roman + 1
+        ints[_SEQUENCE] += 1
+
+    def set_price(self, mineral: str, numerator: int, denominator: int):
+        """
+        Set the unit price of a mineral. Writer only.
+
+        :param mineral: the mineral
+        :param numerator: the numerator of the unit price
+        :param denominator: the (positive) denominator of the unit price
+        :return: None
+        :raise ValueError: if the tables are full
+        """
+        i = self._intern(mineral)
+        if not (-_INT64 <= numerator < _INT64 and denominator < _INT64):
+            numerator, denominator = 0, _TOO_LARGE
+        ints = self._ints
+        ints[_SEQUENCE] += 1
+        ints[self._numerators + i] = numerator
+        ints[self._denominators + i] = denominator
+        ints[_SEQUENCE] += 1
+
+    def clear(self):
+        """
+        Remove all numerals and prices, but keep the keys. Writer only.
+
+        :return: None
+        """
+        ints, capacity = self._ints, self._ints[_CAPACITY]
+        ints[_SEQUENCE] += 1
+        ints[_NUMERALS_VERSION] += 1
+        for start in [self._romans, self._denominators]:
+            ints[start:start + capacity] = memoryview(bytes(8 * capacity)).cast("q")
+        ints[_SEQUENCE] += 1
+
+    def numeral(self, alien: str) -> str:
+        """
+        Retrieve the Roman numeral of an alien numeral.
+
+        :param alien: the alien numeral
+        :return: the Roman numeral, or None if the alien numeral is unknown
+        """
+        i = self.find(alien)
+        roman = self._ints[self._romans + i] if i >= 0 else 0
+        return self._key(roman - 1) if roman else None
+
+    def price(self, mineral: str) -> (int, int):
+        """
+        Retrieve the unit price of a mineral.
+
+        :param mineral: the mineral
+        :return: the numerator and denominator of the unit price, or None if the mineral has no price
+        :raise ValueError: if the price doesn't fit into the tables
+        """
+        i = self.find(mineral)
+        if i < 0 or not self._ints[self._denominators + i]:
+            return None
+        numerator, denominator = self._ints[self._numerators + i], self._ints[self._denominators + i]
+        if denominator == _TOO_LARGE:
+            raise ValueError(f"The price of mineral '{mineral}' is too large to be shared")
+        return numerator, denominator
+
+    def prices(self) -> dict:
+        """
+        Retrieve the unit prices of all minerals that have one.
+
+        :return: the numerator and denominator of the unit price of each mineral that fits into the tables
+        """
+        ints = self._ints
+        numerators, denominators = self._numerators, self._denominators
+        return {self._key(i): (ints[numerators + i], ints[denominators + i]) for i in range(ints[_KEYS])
+                if ints[denominators + i] > 0}
+
+
+class SharedRegistry(Registry):
+    """
+    A registry that publishes its numerals and prices to shared tables.
+
+    Snapshots of a shared registry are ordinary registries, i.e. their updates are not published.
+    """
+
+    def __init__(self, tables: SharedTables = None, number_cache_size: int = NUMBER_CACHE_SIZE):
+        """
+        Initialize an empty registry that publishes its updates.
+
+        :param tables: the tables to publish to, which must be empty; defaults to new tables
+        :param number_cache_size: the number of alien number values to cache
+        """
+        super().__init__(number_cache_size)
+        self.tables = SharedTables.create() if tables is None else tables
+
+    def reset(self):
+        self.tables.clear()
+        super().reset()
+
+    def update_numeral(self, alien: str, roman: str):
+        self.tables.set_numeral(alien, roman)
+        super().update_numeral(alien, roman)
+
+    def update_mineral(self, mineral: str, price: Number):
+        price = Fraction(price)
+        self.tables.set_price(mineral, price.numerator, price.denominator)
+        super().update_mineral(mineral, price)
+
+    def update_ratio(self, mineral: str, other: str, ratio: Number):
+        raise ValueError("Relative prices cannot be shared")
+
+
+class _SharedNumerals:
+    """
+    The Roman numeral of each alien numeral in shared tables, like Registry.alien_numerals.
+    """
+    __slots__ = ("_tables",)
+
+    def __init__(self, tables: SharedTables):
+        self._tables = tables
+
+    def __getitem__(self, alien: str) -> str:
+        roman = self._tables.numeral(alien)
+        if roman is None:
+            raise KeyError(alien)
+        return roman
+
+    def __contains__(self, alien: str) -> bool:
+        return self._tables.numeral(alien) is not None
+
+
+class SharedRegistryView:
+    """
+    Answers queries from shared tables, like a read-only registry.
+
+    Execute commands with SharedRegistryView.execute, so that they see a consistent state of the tables.
+    """
+
+    def __init__(self, tables: SharedTables, number_cache_size: int = NUMBER_CACHE_SIZE):
+        """
+        Initialize a view of shared tables.
+
+        :param tables: the tables, e.g. attached by SharedTables.attach
+        :param number_cache_size: the number of alien number values to cache
+        """
+        self.tables = tables
+        self.alien_numerals = _SharedNumerals(tables)
+        self.number_cache = AlienNumberCache(number_cache_size)
+        self._numerals_version = tables.numerals_version
+        # the number of commands executed again because of a concurrent update
+        self.retries = 0
+
+    def execute(self, cmd) -> str:
+        """
+        Execute a query against the current state of the tables.
+
+        :param cmd: the command
+        :return: the command's return value (either a string or None)
+        :raise ValueError: if the command is an update
+        """
+        tables = self.tables
+        while True:
+            sequence = tables.sequence
+            if sequence & 1:
+                continue
+            if tables.numerals_version != self._numerals_version:
+                self._numerals_version = tables.numerals_version
+                self.number_cache.clear()
+            try:
+                res = cmd.execute(self)
+            except Exception:
+                # a torn read may cause any error, which is only real if there was no update meanwhile
+                if tables.sequence == sequence:
+                    raise
+                res = None
+            if tables.sequence == sequence:
+                return res
+            self.retries += 1
+
+    def update_numeral(self, alien: str, roman: str):
+        raise ValueError("A view of a shared registry is read-only")
+
+    def update_mineral(self, mineral: str, price: Number):
+        raise ValueError("A view of a shared registry is read-only")
+
+    def update_ratio(self, mineral: str, other: str, ratio: Number):
+        raise ValueError("A view of a shared registry is read-only")
+
+    def get_numeral(self, numeral: str) -> str:
+        """
+        Given an alien numeral, retrieve the corresponding Roman numeral.
+
+        :param numeral: an alien numeral
+        :return: the corresponding Roman numeral
+        :raise ValueError: if the alien numeral has no corresponding Roman numeral
+        """
+        roman = self.tables.numeral(numeral)
+        if roman is None:
+            raise ValueError(f"Unknown alien numeral '{numeral}'")
+        return roman
+
+    def get_mineral(self, mineral: str) -> Fraction:
+        """
+        Given the name of a mineral, retrieve its unit price.
+
+        :param mineral: a mineral name
+        :return: the unit price
+        :raise ValueError: if the mineral's price is unknown
+        """
+        return Fraction(*self.get_unit_price(mineral))
+
+    def get_unit_price(self, mineral: str) -> (int, int):
+        """
+        Given the name of a mineral, retrieve its unit price as a pair of integers.
+
+        :param mineral: a mineral name
+        :return: the numerator and the (positive) denominator of the unit price, in lowest terms
+        :raise ValueError: if the mineral's price is unknown or too large to be shared
+        """
+        price = self.tables.price(mineral)
+        if price is None:
+            raise ValueError(f"Unknown mineral '{mineral}'")
+        return price
+
+    def get_most_valuable(self, k: int) -> [str]:
+        return self._ranked()[:-k - 1:-1] if k else []
+
+    def get_least_valuable(self, k: int) -> [str]:
+        return self._ranked()[:k]
+
+    def get_minerals_between(self, low: Number, high: Number) -> [str]:
+        prices = self.tables.prices()
+        return [mineral for mineral in self._ranked(prices) if low <= Fraction(*prices[mineral]) <= high]
+
+    def _ranked(self, prices: dict = None) -> [str]:
+        """
+        Auxiliary function that sorts the minerals by unit price and name, cf. merchantsguide.price_index.
+
+        :param prices: the unit prices, defaults to those in the tables
+        :return: the minerals, from the lowest unit price
+        """
+        prices = self.tables.prices() if prices is None else prices
+        return sorted(prices, key=lambda mineral: (Fraction(*prices[mineral]), mineral))
+
+    def get_unit_price_at(self, mineral: str, update: int) -> (int, int):
+        raise ValueError("The price history is not shared")
+
+    def get_unit_price_range(self, mineral: str, start: int, end: int) -> ((int, int), (int, int)):
+        raise ValueError("The price history is not shared")
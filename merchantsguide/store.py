@@ -0,0 +1,283 @@
+"""
+Store
+=====
+
+Persists a registry on disk, so that sessions don't have to replay their updates on startup.
+
+A store is a directory holding a snapshot of the registry and an append-only journal of the updates made since the
+snapshot was taken. Every update is written to the journal before it is applied. Once the journal has grown long
+enough, it is compacted into a new snapshot.
+
+Writes are crash-safe: journal entries are flushed and, by default, synced to disk one by one; a torn last entry is
+ignored on load. Snapshots are written to a temporary file that atomically replaces the old snapshot. Replaying the
+journal on top of a snapshot that already covers it would not be harmless, because price updates are counted and
+appended to the price histories. Hence each snapshot has a generation, which is incremented by every compaction,
+and a non-empty journal starts with the generation of the snapshot it continues. If the process dies after a new
+snapshot was written, but before the journal was truncated, the journal belongs to an earlier generation and is
+discarded on load.
+
+Both files are JSON. Prices are stored as pairs of numerator and denominator, so that they remain exact. The snapshot
+also holds the price history of each mineral, as lists of times, numerators and denominators, and the ratios between
+minerals, cf. PriceRatios.dump.
+"""
+import json
+import os
+from fractions import Fraction
+from numbers import Number
+
+from merchantsguide.history import PriceHistory
+from merchantsguide.ratios import PriceRatios
+from merchantsguide.registry import Registry
+
+SNAPSHOT = "registry.snapshot"
+JOURNAL = "registry.journal"
+
+# The journal entry holding the generation of the snapshot that the journal continues.
+GENERATION = "generation"
+
+# The default number of journal entries after which the journal is compacted into a snapshot.
+COMPACT_EVERY = 10000
+
+
+class RegistryStore:
+    """
+    A directory holding a snapshot of a registry and a journal of the updates made since.
+    """
+
+    def __init__(self, path: str, sync: bool = True, compact_every: int = COMPACT_EVERY):
+        """
+        Initialize a store in a directory, which is created if necessary.
+
+        :param path: the directory
+        :param sync: whether to sync each journal entry to disk before the update is applied
+        :param compact_every: the number of journal entries after which the journal is compacted
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.sync = sync
+        self.compact_every = compact_every
+        self._journal = None
+        self._entries = 0
+        # The generation of the snapshot, cf. the module docstring, and whether the journal starts with it yet.
+        self._generation = 0
+        self._started = False
+
+    def load(self) -> "PersistentRegistry":
+        """
+        Load the registry from the snapshot and the journal, and open the journal for appending.
+
+        :return: the registry, which journals all updates to this store
+        """
+        registry = PersistentRegistry(self)
+        self._load_snapshot(registry)
+
+        journal = os.path.join(self.path, JOURNAL)
+        try:
+            with open(journal, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        # The last entry is either empty or torn by a crash.
+        *entries, torn = data.split(b"\n")
+        entries = [json.loads(entry) for entry in entries]
+        # Journals written before generations were introduced start without one, like their snapshots.
+        start = 1 if entries and entries[0][0] == GENERATION else 0
+        self._journal = open(journal, "ab")
+        if not entries or (entries[0][1] if start else 0) != self._generation:
+            # the journal is empty, or the snapshot was taken after it and covers its entries
+            self._restart_journal()
+            return registry
+
+        for entry in entries[start:]:
+            self._apply(registry, entry)
+        self._entries = len(entries) - start
+        self._started = True
+        if torn:
+            # cut off the torn entry, so that new entries start on a line of their own
+            self._journal.truncate(len(data) - len(torn))
+        return registry
+
+    def _load_snapshot(self, registry: Registry):
+        """
+        Auxiliary function that restores a registry from the snapshot, if any, and reads the snapshot's generation.
+
+        :param registry: the empty registry
+        :return: None
+        """
+        self._generation = 0
+        try:
+            with open(os.path.join(self.path, SNAPSHOT), "rb") as f:
+                snapshot = json.loads(f.read())
+        except FileNotFoundError:
+            return
+        self._generation = snapshot.get(GENERATION, 0)
+        for alien, roman in snapshot["alien_numerals"].items():
+            Registry.update_numeral(registry, alien, roman)
+        registry.mineral_prices.update((mineral, tuple(price)) for mineral, price in snapshot["mineral_prices"].items())
+        for mineral, series in snapshot.get("price_history", {}).items():
+            history = PriceHistory(*series)
+            registry.price_history[mineral] = history, len(history)
+        registry.price_updates = snapshot.get("price_updates", 0)
+        if "price_ratios" in snapshot:
+            registry.price_ratios = PriceRatios.load(snapshot["price_ratios"])
+
+    @staticmethod
+    def _apply(registry: Registry, entry: list):
+        """
+        Auxiliary function that applies a journal entry to a registry, without journaling it again.
+
+        :param registry: the registry
+        :param entry: the journal entry
+        :return: None
+        """
+        op, *args = entry
+        if op == "numeral":
+            Registry.update_numeral(registry, *args)
+        elif op == "mineral":
+            mineral, numerator, denominator = args
+            Registry.update_mineral(registry, mineral, Fraction(numerator, denominator))
+        elif op == "ratio":
+            mineral, other, numerator, denominator = args
+            Registry.update_ratio(registry, mineral, other, Fraction(numerator, denominator))
+        elif op == "reset":
+            Registry.reset(registry)
+        else:
+            raise ValueError(f"Unknown journal entry '{op}'")
+
+    def record(self, *entry):
+        """
+        Append an entry to the journal.
+
+        :param entry: the operation and its arguments
+        :return: None
+        """
+        if not self._started:
+            self._journal.write(json.dumps([GENERATION, self._generation]).encode() + b"\n")
+            self._started = True
+        self._journal.write(json.dumps(entry).encode() + b"\n")
+        self._journal.flush()
+        if self.sync:
+            os.fsync(self._journal.fileno())
+        self._entries += 1
+
+    def compact_if_due(self, registry: Registry):
+        """
+        Compact the journal if it has grown long enough.
+
+        :param registry: the registry loaded from this store, with all journaled updates applied
+        :return: None
+        """
+        if self._entries >= self.compact_every:
+            self.compact(registry)
+
+    def compact(self, registry: Registry):
+        """
+        Write a snapshot of a registry, replacing the old snapshot atomically, and truncate the journal.
+
+        :param registry: the registry
+        :return: None
+        """
+        path = os.path.join(self.path, SNAPSHOT)
+        with open(path + ".tmp", "wb") as f:
+            f.write(json.dumps({
+                GENERATION: self._generation + 1,
+                "alien_numerals": registry.alien_numerals,
+                "mineral_prices": registry.mineral_prices,
+                "price_history": {mineral: [list(history.times[:n]), list(history.numerators[:n]),
+                                            list(history.denominators[:n])]
+                                  for mineral, (history, n) in registry.price_history.items()},
+                "price_updates": registry.price_updates,
+                "price_ratios": registry.price_ratios.dump()
+            }).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._sync_directory()
+        self._generation += 1
+        self._restart_journal()
+
+    def _restart_journal(self):
+        """
+        Auxiliary function that truncates the journal, which then continues the current snapshot.
+
+        :return: None
+        """
+        self._journal.truncate(0)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._entries = 0
+        self._started = False
+
+    def close(self, registry: Registry = None):
+        """
+        Close the journal, compacting it first if a registry is given and the journal has any entries.
+
+        Sessions that didn't update the registry thus leave the snapshot as it is.
+
+        :param registry: the registry loaded from this store, if the journal should be compacted
+        :return: None
+        """
+        if self._journal is None:
+            return
+        if registry is not None and self._entries:
+            self.compact(registry)
+        self._journal.close()
+        self._journal = None
+
+    def _sync_directory(self):
+        """
+        Sync the directory, so that a renamed file survives a crash. Not supported on every platform.
+
+        :return: None
+        """
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:  # pragma: no cover
+            return
+        try:
+            os.fsync(fd)
+        except OSError:  # pragma: no cover
+            pass
+        finally:
+            os.close(fd)
+
+
+class PersistentRegistry(Registry):
+    """
+    A registry that journals its updates to a store.
+
+    Snapshots of a persistent registry are ordinary registries, i.e. their updates are not journaled.
+    """
+
+    def __init__(self, store: RegistryStore):
+        """
+        Initialize an empty registry that journals its updates to a store. Use RegistryStore.load instead.
+
+        :param store: the store
+        """
+        super().__init__()
+        self.store = store
+
+    def reset(self):
+        self.store.record("reset")
+        super().reset()
+        self.store.compact_if_due(self)
+
+    def update_numeral(self, alien: str, roman: str):
+        self.store.record("numeral", alien, roman)
+        super().update_numeral(alien, roman)
+        self.store.compact_if_due(self)
+
+    def update_mineral(self, mineral: str, price: Number):
+        price = Fraction(price)
+        self.store.record("mineral", mineral, price.numerator, price.denominator)
+        super().update_mineral(mineral, price)
+        self.store.compact_if_due(self)
+
+    def update_ratio(self, mineral: str, other: str, ratio: Number):
+        ratio = Fraction(ratio)
+        # Only journal ratios that are applied, so that the journal can be replayed.
+        self.check_ratio(mineral, other, ratio)
+        self.store.record("ratio", mineral, other, ratio.numerator, ratio.denominator)
+        super().update_ratio(mineral, other, ratio)
+        self.store.compact_if_due(self)
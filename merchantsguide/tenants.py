@@ -0,0 +1,155 @@
+"""
+Tenants
+=======
+
+Keeps the registries of many tenants, e.g. trading desks, in one process.
+
+Each tenant has a registry of its own, which is created on first use as a snapshot of a template registry. Thus new
+tenants share the template's numerals and prices until they update them, cf. Registry.snapshot. Tenants that define
+the same numerals independently can share their numeral tables, too, cf. Tenants.share_numerals.
+
+Sessions only create a tenant with its first update. Queries of tenants that don't exist are answered by the template,
+so clients cannot create tenants, and use up memory, just by querying them.
+
+Commands select their tenant by a prefix, e.g. '@desk how much is glob ?' is executed against the registry of the
+tenant 'desk'. A line that consists of a prefix only selects the tenant of the following commands of the session,
+cf. TenantMerchant.
+"""
+
+from merchantsguide.commands import BaseCommand, MineralUpdateCommand, NumeralUpdateCommand, RatioUpdateCommand
+from merchantsguide.commands import UnknownCommand
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import parse_input
+from merchantsguide.registry import Registry
+
+# The tenant of sessions that haven't selected one.
+DEFAULT_TENANT = "default"
+
+# Commands that modify the registry and thus create the registry of their tenant, if necessary.
+UPDATES = (NumeralUpdateCommand, MineralUpdateCommand, RatioUpdateCommand)
+
+
+class Tenants:
+    """
+    The registries of many tenants by name.
+    """
+
+    def __init__(self, template: Registry = None):
+        """
+        Initialize without any tenants.
+
+        :param template: the registry that new tenants start from, defaults to an empty registry
+        """
+        self.template = Registry.new() if template is None else template
+        self._registries = {}
+
+    def __getitem__(self, name: str) -> Registry:
+        """
+        Retrieve the registry of a tenant, creating it if necessary.
+
+        :param name: the name of the tenant
+        :return: the tenant's registry
+        """
+        try:
+            return self._registries[name]
+        except KeyError:
+            registry = self._registries[name] = self.template.snapshot()
+            return registry
+
+    def get(self, name: str) -> Registry:
+        """
+        Retrieve the registry of a tenant for reading, without creating it.
+
+        :param name: the name of the tenant
+        :return: the tenant's registry, or the template if there is no such tenant
+        """
+        return self._registries.get(name, self.template)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._registries
+
+    def __iter__(self):
+        return iter(self._registries)
+
+    def __len__(self) -> int:
+        return len(self._registries)
+
+    def remove(self, name: str):
+        """
+        Remove a tenant and its registry.
+
+        :param name: the name of the tenant
+        :return: None
+        :raise ValueError: if there is no such tenant
+        """
+        try:
+            del self._registries[name]
+        except KeyError:
+            raise ValueError(f"Unknown tenant '{name}'")
+
+    def share_numerals(self) -> int:
+        """
+        Let tenants that define the same numerals share their numeral tables, to save memory.
+
+        Takes time linear in the total number of numerals, so call it occasionally, e.g. once the tenants are set up.
+
+        :return: the number of tenants whose tables were replaced by those of another tenant
+        """
+        first = {}
+        shared = 0
+        for registry in self._registries.values():
+            other = first.setdefault(frozenset(registry.alien_numerals.items()), registry)
+            if registry.alien_numerals is not other.alien_numerals:
+                registry.share_numerals(other)
+                shared += 1
+        return shared
+
+
+class TenantMerchant(Merchant):
+    """
+    Executes the commands of a session against the registries of several tenants.
+
+    Commands prefixed by '@<tenant> ' are executed against the registry of that tenant. A line '@<tenant>' selects the
+    tenant of the commands without prefix that follow.
+    """
+    def __init__(self, tenants: Tenants, tenant: str = DEFAULT_TENANT):
+        """
+        Initialize a Merchant that executes commands against the registries of tenants.
+
+        :param tenants: the tenants
+        :param tenant: the tenant selected initially
+        """
+        self.tenants = tenants
+        self.tenant = tenant
+
+    @property
+    def registry(self) -> Registry:
+        return self.tenants[self.tenant]
+
+    def single_command(self, s):
+        """
+        Read and execute a single command, or select a tenant.
+
+        :param s: the input string
+        :return: the command's return value (either a string or None)
+        """
+        if not s.startswith("@"):
+            return self._execute(parse_input(s), self.tenant)
+        name, _, s = s[1:].partition(" ")
+        if not name:
+            return UnknownCommand().execute()
+        s = s.strip()
+        if not s:
+            self.tenant = name
+            return None
+        return self._execute(parse_input(s), name)
+
+    def _execute(self, cmd: BaseCommand, name: str):
+        """
+        Auxiliary function that executes a command for a tenant, creating the tenant's registry only for updates.
+
+        :param cmd: the command
+        :param name: the name of the tenant
+        :return: the command's return value (either a string or None)
+        """
+        return cmd.execute(self.tenants[name] if isinstance(cmd, UPDATES) else self.tenants.get(name))
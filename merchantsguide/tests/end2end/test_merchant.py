@@ -1,3 +1,6 @@
+import io
+
+from merchantsguide import merchant
 from merchantsguide.merchant import Merchant
 
 
@@ -19,3 +22,21 @@ def test_trace1():
         if o:
             assert res == o
 
+
+def test_stream_matches_repl(monkeypatch, capsys):
+    """
+    Ensure the streaming mode writes exactly what the REPL prints, regardless of the chunk size
+    :return: None
+    """
+    with open('merchantsguide/tests/end2end/trace_1_in', 'r') as f:
+        trace = f.read()
+
+    monkeypatch.setattr(merchant, 'stdin', io.StringIO(trace))
+    Merchant.repl()
+    expected = capsys.readouterr().out
+    assert expected.count("\n") == 5
+
+    for chunk_size in [1, 20, 1 << 16]:
+        out = io.StringIO()
+        Merchant.run_stream(io.StringIO(trace), out, chunk_size)
+        assert out.getvalue() == expected
@@ -0,0 +1,51 @@
+import io
+import random
+
+from merchantsguide import parallel
+from merchantsguide.merchant import Merchant
+from merchantsguide.parallel import run_parallel
+from merchantsguide.registry import Registry
+
+
+def _log(n):
+    """
+    Generate a log of updates and queries, including invalid ones.
+    """
+    rng = random.Random(6)
+    numerals = ["glob", "prok", "pish", "tegj"]
+    minerals = ["Silver", "Gold", "Iron"]
+    lines = []
+    for _ in range(n):
+        number = " ".join(rng.choices(numerals, k=rng.randint(1, 4)))
+        r = rng.random()
+        if r < 0.01:
+            lines.append(f"{rng.choice(numerals)} is {rng.choice('IVXL')}")
+        elif r < 0.03:
+            lines.append(f"{number} {rng.choice(minerals)} is {rng.randint(1, 1000)} Credits")
+        elif r < 0.5:
+            lines.append(f"how much is {number} ?")
+        elif r < 0.99:
+            lines.append(f"how many Credits is {number} {rng.choice(minerals)} ?")
+        else:
+            lines.append("how much wood could a woodchuck chuck if a woodchuck could chuck wood ?")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def test_parallel_matches_serial(monkeypatch):
+    """
+    Ensure the parallel mode writes exactly what the streaming mode writes
+    :return: None
+    """
+    log = _log(5000)
+    Registry().reset()
+    expected = io.StringIO()
+    Merchant.run_stream(io.StringIO(log), expected)
+    serial_state = dict(Registry().alien_numerals), dict(Registry().mineral_prices)
+
+    # small batches and segments, so that many are sent to the workers
+    monkeypatch.setattr(parallel, "MIN_PARALLEL", 4)
+    Registry().reset()
+    actual = io.StringIO()
+    run_parallel(io.StringIO(log), actual, workers=2, batch_size=16, chunk_size=1000)
+    assert actual.getvalue() == expected.getvalue()
+    assert (Registry().alien_numerals, Registry().mineral_prices) == serial_state
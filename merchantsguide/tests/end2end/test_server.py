@@ -0,0 +1,75 @@
+import asyncio
+
+from merchantsguide.registry import Registry
+from merchantsguide.server import start_server
+from merchantsguide.tenants import Tenants
+
+
+async def _exchange(port, lines):
+    """
+    Send lines to the server, all at once, and read one response line for each.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("".join(f"{line}\n" for line in lines).encode())
+    await writer.drain()
+    responses = [(await reader.readline()).decode().rstrip("\n") for _ in lines]
+    writer.close()
+    return responses
+
+
+def test_server():
+    async def main():
+        registry = Registry.new()
+        server = await start_server("127.0.0.1", 0, registry=registry)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            # pipelined updates and queries, one response per line
+            assert await _exchange(port, ["glob is I", "prok is V", "glob prok Gold is 100 credits",
+                                          "how many credits is prok Gold ?", "how much is prok prok ?", "what?"]) == [
+                "", "", "", "prok Gold is 125 Credits", "Could not parse input 'VV' as Roman numerals",
+                "I have no idea what you are talking about"]
+
+            # many concurrent clients share the registry
+            queries = ["how much is glob prok ?"] * 10
+            results = await asyncio.gather(*(_exchange(port, queries) for _ in range(100)))
+            assert all(r == ["glob prok is 4"] * 10 for r in results)
+
+            # the last line need not end with a newline
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"how much is prok glob ?")
+            writer.write_eof()
+            assert await reader.read() == b"prok glob is 6\n"
+            writer.close()
+        assert registry.get_mineral("Gold") == 25
+
+    asyncio.run(main())
+
+
+def test_unix_server(tmp_path):
+    async def main():
+        path = str(tmp_path / "merchant.sock")
+        server = await start_server(path=path, registry=Registry.new())
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b"glob is X\nhow much is glob glob ?\n")
+            assert await reader.readline() == b"\n"
+            assert await reader.readline() == b"glob glob is 20\n"
+            writer.close()
+
+    asyncio.run(main())
+
+
+def test_tenant_server():
+    async def main():
+        tenants = Tenants()
+        server = await start_server("127.0.0.1", 0, tenants=tenants)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            assert await _exchange(port, ["glob is I", "@a glob is V", "@a", "how much is glob ?"]) == [
+                "", "", "", "glob is 5"]
+            # each connection starts with the default tenant
+            assert await _exchange(port, ["how much is glob ?", "@a how much is glob ?"]) == [
+                "glob is 1", "glob is 5"]
+        assert sorted(tenants) == ["a", "default"]
+
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+
+def _imported_modules(importtime: str) -> set:
+    return {line.split("|")[-1].strip() for line in importtime.splitlines() if line.startswith("import time:")}
+
+
+def test_grammars_are_not_imported_on_startup():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "merchantsguide"],
+                            input="glob is I\nhow much is glob glob ?\n", capture_output=True, text=True, check=True)
+    assert result.stdout == "glob glob is 2\n"
+    imported = _imported_modules(result.stderr)
+    assert "merchantsguide.parse_input" in imported
+    assert not {"parsimonious", "merchantsguide.grammars"} & imported
+
+
+def test_grammars_are_imported_on_first_use():
+    code = "\n".join([
+        "import sys",
+        "from merchantsguide.roman2int import roman2int_grammar",
+        "assert 'parsimonious' not in sys.modules",
+        "assert roman2int_grammar('XIV') == 14",
+        "assert 'merchantsguide.grammars' in sys.modules",
+    ])
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_grammars_are_not_imported_by_the_profiler():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "merchantsguide", "--profile", "-"],
+                            input="glob is I\nhow much is glob glob ?\n", capture_output=True, text=True, check=True)
+    assert result.stdout == "glob glob is 2\n"
+    assert '"grammar.parse"' not in result.stderr
+    assert not {"parsimonious", "merchantsguide.grammars"} & _imported_modules(result.stderr)
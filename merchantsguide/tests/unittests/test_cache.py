@@ -0,0 +1,64 @@
+from merchantsguide.cache import LRUCache, AlienNumberCache
+from merchantsguide.commands import NumeralUpdateCommand, NumberQueryCommand
+from merchantsguide.registry import Registry
+
+
+def test_lru_eviction_and_stats():
+    c = LRUCache(2)
+    c.put('a', 1)
+    c.put('b', 2)
+    assert c.get('a') == 1      # 'b' is now the least recently used entry
+    c.put('c', 3)
+    assert 'b' not in c
+    assert c.get('b') is None
+    assert c.get('c') == 3
+
+    info = c.info()
+    assert (info.hits, info.misses, info.evictions, info.maxsize, info.currsize) == (2, 1, 1, 2, 2)
+
+    c.clear()
+    assert c.info() == (0, 0, 0, 2, 0)
+
+
+def test_lru_size_zero():
+    c = LRUCache(0)
+    c.put('a', 1)
+    assert len(c) == 0
+    assert c.get('a') is None
+
+
+def test_invalidation_is_exact():
+    c = AlienNumberCache(10)
+    c.put(('bork',), 1)
+    c.put(('bork', 'kmar'), 4)
+    c.put(('kmar',), 5)
+    c.put(('gromp', 'gromp'), 20)
+
+    c.invalidate('bork')
+    assert ('bork',) not in c and ('bork', 'kmar') not in c
+    assert ('kmar',) in c and ('gromp', 'gromp') in c
+    assert c.info().evictions == 0
+
+    # the index forgets evicted keys
+    c = AlienNumberCache(1)
+    c.put(('bork',), 1)
+    c.put(('kmar',), 5)
+    c.invalidate('kmar')
+    assert len(c) == 0 and c.info().evictions == 1
+
+
+def test_registry_invalidates_on_numeral_update():
+    r = Registry()
+    r.reset()
+
+    NumeralUpdateCommand('bork', 'I').execute()
+    NumeralUpdateCommand('kmar', 'V').execute()
+    assert NumberQueryCommand(['bork', 'kmar']).execute() == "bork kmar is 4"
+    assert NumberQueryCommand(['bork', 'kmar']).execute() == "bork kmar is 4"
+    assert NumberQueryCommand(['kmar']).execute() == "kmar is 5"
+    assert r.number_cache.info()[:3] == (1, 2, 0)
+
+    NumeralUpdateCommand('bork', 'X').execute()
+    assert ('kmar',) in r.number_cache
+    assert NumberQueryCommand(['bork', 'kmar']).execute() == "bork kmar is 15"
+    assert NumberQueryCommand(['kmar', 'bork']).execute()[:9] == "Could not"
@@ -1,7 +1,8 @@
 import pytest
 
 from merchantsguide.commands import MineralQueryCommand, MineralUpdateCommand, NumberQueryCommand, NumeralUpdateCommand
-from merchantsguide.commands import UnknownCommand, BaseCommand
+from merchantsguide.commands import PriceAtQueryCommand, PriceRangeQueryCommand, UnknownCommand, BaseCommand
+from merchantsguide.commands import MineralsBetweenQueryCommand, RatioUpdateCommand, ValuableMineralsQueryCommand
 from merchantsguide.registry import Registry
 
 
@@ -108,3 +109,97 @@ def test_reprs_dont_fail():
         != repr(UnknownCommand())
 
 
+def test_exact_prices():
+    r = Registry.default()
+    r.reset()
+
+    NumeralUpdateCommand('bork', 'I').execute()
+    NumeralUpdateCommand('gromp', 'X').execute()
+    NumeralUpdateCommand('wump', 'C').execute()
+    NumeralUpdateCommand('zorg', 'M').execute()
+    many = ['zorg', 'zorg', 'zorg', 'wump', 'zorg', 'gromp', 'wump', 'bork', 'gromp']  # 3999
+
+    # a float unit price would be off by a few credits here
+    price = 10 ** 18 + 7
+    MineralUpdateCommand('Gold', many, price).execute()
+    assert MineralQueryCommand(many, 'Gold').execute() == f"{' '.join(many)} Gold is {price} Credits"
+
+    # ties are rounded to even
+    MineralUpdateCommand('Iron', ['bork', 'bork'], 5).execute()
+    assert MineralQueryCommand(['bork'], 'Iron').execute().endswith(" is 2 Credits")
+    assert MineralQueryCommand(['bork', 'bork', 'bork'], 'Iron').execute().endswith(" is 8 Credits")
+
+
+def test_error_precedence():
+    r = Registry.new()
+    for alien, roman in [('bork', 'I'), ('kmar', 'V')]:
+        NumeralUpdateCommand(alien, roman).execute(r)
+    # an unknown numeral is reported even if the known numerals before it are invalid already
+    assert NumberQueryCommand(['bork', 'kmar', 'kmar', 'flub']).execute(r) == "Unknown alien numeral 'flub'"
+    assert NumberQueryCommand(['bork', 'kmar', 'kmar']).execute(r) == "Could not parse input 'IVV' as Roman numerals"
+    assert NumberQueryCommand(('kmar', 'bork')).execute(r) == "kmar bork is 6"
+    # long numbers, which are not cached
+    assert NumberQueryCommand(['bork'] * 1000 + ['flub']).execute(r) == "Unknown alien numeral 'flub'"
+    assert NumberQueryCommand(['bork'] * 20).execute(r) == f"Could not parse input '{'I' * 20}' as Roman numerals"
+    NumeralUpdateCommand('nil', '').execute(r)
+    assert NumberQueryCommand(['nil'] * 20 + ['kmar']).execute(r)[-4:] == "is 5"
+    assert len(r.number_cache) == 1
+
+
+def test_commands_are_compact():
+    commands = [NumeralUpdateCommand('bork', 'I'), MineralUpdateCommand('Iron', ['bork'], 5),
+                NumberQueryCommand(['bork']), MineralQueryCommand(['bork'], 'Iron'), UnknownCommand()]
+    for cmd in commands:
+        assert not hasattr(cmd, '__dict__')
+    assert commands[1].units == commands[2].alien_number == commands[3].alien_number == ('bork',)
+
+
+def test_price_history_queries():
+    r = Registry.new()
+    for line in [('bork', 'I'), ('kmar', 'V')]:
+        NumeralUpdateCommand(*line).execute(r)
+    for price in [10, 30, 20]:
+        MineralUpdateCommand('Gold', ['bork', 'bork'], price).execute(r)
+    assert PriceAtQueryCommand(['kmar'], 'Gold', 1).execute(r) == "kmar Gold was 25 Credits at update 1"
+    assert PriceAtQueryCommand(['kmar'], 'Gold', 3).execute(r) == "kmar Gold was 50 Credits at update 3"
+    assert PriceRangeQueryCommand(['bork'], 'Gold', 1, 3).execute(r) == \
+        "bork Gold was 5 to 15 Credits between update 1 and 3"
+    assert PriceRangeQueryCommand(['bork'], 'Gold', 2, 2).execute(r) == \
+        "bork Gold was 15 Credits between update 2 and 2"
+
+    assert PriceAtQueryCommand(['kmar'], 'Gold', 0).execute(r) == "No price of mineral 'Gold' at update 0"
+    assert PriceAtQueryCommand(['kmar'], 'Iron', 1).execute(r) == "Unknown mineral 'Iron'"
+    assert PriceAtQueryCommand(['flub'], 'Gold', 1).execute(r) == "Unknown alien numeral 'flub'"
+    assert PriceRangeQueryCommand(['bork'], 'Gold', 3, 1).execute(r) == "Update 3 is later than update 1"
+
+
+def test_price_index_queries():
+    r = Registry.new()
+    assert ValuableMineralsQueryCommand(3).execute(r) == "There are no such minerals"
+    NumeralUpdateCommand('bork', 'I').execute(r)
+    for mineral, price in [('Gold', 100), ('Iron', 5), ('Silver', 50), ('Tin', 50)]:
+        MineralUpdateCommand(mineral, ['bork'], price).execute(r)
+    assert ValuableMineralsQueryCommand(2).execute(r) == "The most valuable minerals are Gold, Tin"
+    assert ValuableMineralsQueryCommand(9, most=False).execute(r) == \
+        "The least valuable minerals are Iron, Silver, Tin, Gold"
+    assert MineralsBetweenQueryCommand(5, 50).execute(r) == "Iron, Silver, Tin cost between 5 and 50 Credits"
+    assert MineralsBetweenQueryCommand(60, 70).execute(r) == "No minerals cost between 60 and 70 Credits"
+
+    # updates are reflected by the index
+    MineralUpdateCommand('Iron', ['bork'], 500).execute(r)
+    assert ValuableMineralsQueryCommand(1).execute(r) == "The most valuable minerals are Iron"
+    assert MineralsBetweenQueryCommand(5, 50).execute(r) == "Silver, Tin cost between 5 and 50 Credits"
+
+
+def test_ratio_updates():
+    r = Registry.new()
+    for line in [('bork', 'I'), ('kmar', 'V')]:
+        NumeralUpdateCommand(*line).execute(r)
+    MineralUpdateCommand('Gold', ['bork'], 100).execute(r)
+    assert RatioUpdateCommand('Silver', ['kmar'], 'Gold', ['bork']).execute(r) is None
+    assert MineralQueryCommand(['bork', 'kmar'], 'Silver').execute(r) == "bork kmar Silver is 80 Credits"
+    assert RatioUpdateCommand('Gold', ['bork', 'bork'], 'Silver', ['kmar']).execute(r) == \
+        "Gold is worth 5 Silver, not 5/2"
+    assert RatioUpdateCommand('Iron', ['flub'], 'Gold', ['bork']).execute(r) == "Unknown alien numeral 'flub'"
+    assert repr(RatioUpdateCommand('Iron', ['bork'], 'Gold', ['kmar'])).endswith(
+        "set the value of bork Iron to kmar Gold")
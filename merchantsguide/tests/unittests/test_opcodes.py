@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from merchantsguide import opcodes
+from merchantsguide.merchant import Merchant
+from merchantsguide.opcodes import compile_log, replay, HEADER, RECORD
+from merchantsguide.registry import Registry
+
+
+def _trace():
+    with open('merchantsguide/tests/end2end/trace_1_in', 'r') as f:
+        return f.read() + "\n".join([
+            "", "nonsense", "glob Iron is 5000000000 Credits", "how many Credits is pish Iron ?",
+            "how many Credits was glob Iron at update 4294967296 ?",
+            "how many Credits was glob Iron between update 1 and 9?",
+            "which are the 2 most valuable minerals ?", "which are the 9 least valuable minerals ?",
+            "which minerals cost between 1 and 99999999999 Credits ?", "glob Bronze is pish Silver",
+            "how many Credits is glob Bronze ?", "glob is V", "how much is pish tegj glob glob ?"
+        ]) + "\n"
+
+
+def test_replay_matches_stream(tmp_path, monkeypatch):
+    trace = _trace()
+    expected = io.StringIO()
+    Merchant(Registry.new()).run_stream(io.StringIO(trace), expected)
+
+    path = str(tmp_path / "trace.bin")
+    assert compile_log(io.StringIO(trace), path, chunk_size=20) == trace.count("\n")
+    # small chunks and a small cache of commands
+    monkeypatch.setattr(opcodes, 'CHUNK_SIZE', 3)
+    monkeypatch.setattr(opcodes, 'COMMAND_CACHE_SIZE', 2)
+    out = io.StringIO()
+    replay(path, out, Registry.new())
+    assert out.getvalue() == expected.getvalue()
+
+
+def test_records_are_fixed_width(tmp_path):
+    path = tmp_path / "log.bin"
+    lines = ["glob is I", "glob glob Silver is 34 Credits", "how many Credits is glob glob Silver ?"] * 100
+    compile_log(io.StringIO("\n".join(lines)), str(path))
+    _, _, count, offset = HEADER.unpack_from(path.read_bytes())
+    assert count == len(lines)
+    assert offset == HEADER.size + count * RECORD.size
+    # the strings and numbers are interned
+    assert path.stat().st_size - offset < 100
+
+
+def test_empty_log(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    assert compile_log(io.StringIO(""), path) == 0
+    out = io.StringIO()
+    replay(path, out, Registry.new())
+    assert out.getvalue() == ""
+
+
+def test_invalid_log(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("glob is I\n" * 10)
+    with pytest.raises(ValueError):
+        replay(str(path), io.StringIO(), Registry.new())
+
+    path = tmp_path / "log.bin"
+    compile_log(io.StringIO("glob is I\n"), str(path))
+    data = bytearray(path.read_bytes())
+    data[HEADER.size] = 99
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="Unknown opcode 99"):
+        replay(str(path), io.StringIO(), Registry.new())
@@ -1,9 +1,23 @@
+import random
+
 import pytest
 
-from merchantsguide.parse_input import parse_input
+from merchantsguide.parse_input import parse_input, parse_input_grammar, parse_input_regex, set_backend
+from merchantsguide.parse_input import BACKENDS, DEFAULT_BACKEND, MAX_CACHED_LINE, PARSE_CACHE_SIZE, cache_info
+from merchantsguide.parse_input import set_cache_size
 from merchantsguide.commands import *
 
 
+@pytest.fixture(autouse=True, params=sorted(BACKENDS))
+def backend(request):
+    """
+    Run each test with each parser backend.
+    """
+    set_backend(request.param)
+    yield request.param
+    set_backend(DEFAULT_BACKEND)
+
+
 def test_numeral_update_valid():
     cmd = parse_input("bork is I")
     assert isinstance(cmd, NumeralUpdateCommand)
@@ -40,7 +54,7 @@ def test_mineral_update_valid():
     cmd = parse_input("bork bork Silver is 34 credits")
     assert isinstance(cmd, MineralUpdateCommand)
     assert cmd.mineral == 'Silver'
-    assert cmd.units == ['bork', 'bork']
+    assert cmd.units == ('bork', 'bork')
     assert cmd.price == 34
 
 
@@ -62,7 +76,7 @@ def test_mineral_update_invalid_price():
 def test_number_query_valid():
     cmd = parse_input("how much is the fish?")
     assert isinstance(cmd, NumberQueryCommand)
-    assert cmd.alien_number == ['the', 'fish']
+    assert cmd.alien_number == ('the', 'fish')
 
 
 def test_number_query_invalid():
@@ -74,7 +88,7 @@ def test_mineral_query_valid():
     cmd = parse_input("how many credits is bork bork Silver?")
     assert isinstance(cmd, MineralQueryCommand)
     assert cmd.mineral == 'Silver'
-    assert cmd.alien_number == ['bork', 'bork']
+    assert cmd.alien_number == ('bork', 'bork')
 
 
 def test_mineral_query_invalid_mineral():
@@ -90,3 +104,156 @@ def test_mineral_query_invalid_alien_numeral():
 def test_mineral_query_malformed_query():
     cmd = parse_input("how much is bork Bork Silver?")
     assert isinstance(cmd, UnknownCommand)
+
+
+def test_price_at_query_valid():
+    cmd = parse_input("how many Credits was bork bork Gold at update 42 ?")
+    assert isinstance(cmd, PriceAtQueryCommand)
+    assert (cmd.alien_number, cmd.mineral, cmd.update) == (('bork', 'bork'), 'Gold', 42)
+
+
+def test_price_range_query_valid():
+    cmd = parse_input("how many credits was bork Gold between update 7 and 42?")
+    assert isinstance(cmd, PriceRangeQueryCommand)
+    assert (cmd.alien_number, cmd.mineral, cmd.start, cmd.end) == (('bork',), 'Gold', 7, 42)
+
+
+def test_valuable_query_valid():
+    cmd = parse_input("which are the 3 most valuable minerals ?")
+    assert isinstance(cmd, ValuableMineralsQueryCommand)
+    assert (cmd.count, cmd.most) == (3, True)
+    cmd = parse_input("which are the 10 least valuable minerals?")
+    assert (cmd.count, cmd.most) == (10, False)
+
+
+def test_minerals_between_query_valid():
+    cmd = parse_input("which minerals cost between 7 and 42 Credits ?")
+    assert isinstance(cmd, MineralsBetweenQueryCommand)
+    assert (cmd.low, cmd.high) == (7, 42)
+
+
+def test_price_index_query_invalid():
+    for line in ["which are the most valuable minerals ?", "which are the 3 valuable minerals ?",
+                 "which minerals cost between 7 and 42 ?", "which minerals cost between 7 Credits ?"]:
+        assert isinstance(parse_input(line), UnknownCommand)
+
+
+def test_price_history_query_invalid():
+    for line in ["how many Credits was bork Gold at update ?", "how many Credits was bork Gold at 42 ?",
+                 "how many Credits was bork Gold between update 7 ?",
+                 "how many Credits was bork Gold at update 7 and 9 ?"]:
+        assert isinstance(parse_input(line), UnknownCommand)
+
+
+def test_ratio_update_valid():
+    cmd = parse_input("glob glob Gold is pish Silver")
+    assert isinstance(cmd, RatioUpdateCommand)
+    assert cmd.mineral == "Gold" and cmd.units == ("glob", "glob")
+    assert cmd.other == "Silver" and cmd.other_units == ("pish",)
+
+
+def test_ratio_update_invalid():
+    for line in ["glob Gold is pish", "glob Gold is Silver", "glob Gold is pish Silver ?", "glob Gold is pish silver"]:
+        assert isinstance(parse_input(line), UnknownCommand)
+
+
+def test_ratio_update_credits():
+    # prices in Credits need a decimal number, Credits are not a mineral
+    for line in ["glob Iron is pish Credits", "glob Iron is pish credits", "how many Credits is glob Silver",
+                 "glob Credits is glob Gold"]:
+        assert isinstance(parse_input(line), UnknownCommand)
+    assert parse_input("glob Iron is pish Creditsium").other == "Creditsium"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        set_backend("telepathy")
+
+
+def _fuzzed_lines(rng, n):
+    """
+    Generate lines from fragments of valid commands, odd whitespace and mutations of valid commands.
+    """
+    valid = [
+        "glob is I", "glob glob Silver is 34 Credits", "how much is pish tegj glob glob ?",
+        "how many Credits is glob prok Gold ?", "how many credits is bork bork Silver?",
+        "how many Credits was glob Gold at update 3 ?", "how many Credits was glob Gold between update 1 and 34 ?",
+        "which are the 3 most valuable minerals ?", "which minerals cost between 7 and 34 Credits?",
+        "glob glob Gold is pish Silver"
+    ]
+    tokens = ["how", "much", "many", "is", "isI", "Credits", "credits", "?", "bork", "glob", "Gold", "Goldis", "Iron",
+              "I", "V", "X", "IV", "34", "007", "wood", "Bork", "was", "at", "update", "between", "and",
+              "which", "are the", "most", "least", "valuable minerals", "minerals cost"]
+    separators = ["", " ", " ", " ", "  ", "\t", "\n"]
+    for _ in range(n):
+        if rng.random() < 0.5:
+            line = rng.choice(valid)
+            for _ in range(rng.randint(1, 3)):
+                i = rng.randint(0, len(line))
+                line = rng.choice([
+                    line[:i] + line[i + 1:],
+                    line[:i] + rng.choice(separators + tokens) + line[i:],
+                    line[:i] + rng.choice(tokens) + line[i + 1:]
+                ])
+        else:
+            words = rng.choices(tokens, k=rng.randint(1, 9))
+            line = "".join(w + rng.choice(separators) for w in words)
+        yield line
+
+
+def _fields(cmd: BaseCommand) -> dict:
+    return {name: getattr(cmd, name) for name in type(cmd).__slots__}
+
+
+def test_backends_agree_on_fuzzed_lines():
+    rng = random.Random(42)
+    kinds = set()
+    # cases where a backtracking regex would disagree with the grammar
+    tricky = ["x is Iron is 5 credits", "bork Goldis 5 credits", "borkis I", "bork is I\n", "how much is bork  bork?",
+              "bork Gold is bork Iron is 5 credits", "bork Gold is bork Iron?", "bork Gold is is Iron",
+              "bork Gold is bork Credits", "bork Gold is bork Creditsx", "bork Gold is bork credits\n",
+              "how many Credits is glob Silver", "glob Credits is glob Gold"]
+    for line in tricky + list(_fuzzed_lines(rng, 5000)):
+        expected, actual = parse_input_grammar(line), parse_input_regex(line)
+        assert type(actual) is type(expected), line
+        assert _fields(actual) == _fields(expected), line
+        kinds.add(type(actual))
+
+    # make sure the corpus covers every kind of command
+    assert len(kinds) == 10
+
+
+def test_cache():
+    cmd = parse_input("how much is glob prok ?")
+    assert parse_input("how much is glob prok ?") is cmd
+    assert parse_input("how much is glob  prok ?") is not cmd
+    info = cache_info()
+    assert (info.hits, info.misses, info.currsize, info.maxsize) == (1, 2, 2, PARSE_CACHE_SIZE)
+
+    # long lines are not cached
+    line = "how much is " + " ".join(["glob"] * MAX_CACHED_LINE) + " ?"
+    assert isinstance(parse_input(line), NumberQueryCommand)
+    assert parse_input(line) is not parse_input(line)
+    assert cache_info() == info
+
+    try:
+        set_cache_size(2)
+        for line in ["glob is I", "prok is V", "glob is I", "pish is X"]:
+            parse_input(line)
+        assert cache_info() == (1, 3, 1, 2, 2)
+        assert isinstance(parse_input("glob is I"), NumeralUpdateCommand)
+
+        set_cache_size(0)
+        assert parse_input("glob is I") is not parse_input("glob is I")
+        assert cache_info().currsize == 0
+    finally:
+        set_cache_size(PARSE_CACHE_SIZE)
+
+
+def test_grammar_names():
+    from merchantsguide import grammars, parse_input as module
+
+    assert module.GRAMMAR is grammars.COMMAND_GRAMMAR
+    assert module.VISITOR is grammars.COMMAND_VISITOR
+    with pytest.raises(AttributeError):
+        module.NO_SUCH_NAME
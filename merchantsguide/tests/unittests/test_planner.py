@@ -0,0 +1,63 @@
+import io
+import random
+
+from merchantsguide.commands import NumeralUpdateCommand
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import parse_input
+from merchantsguide.planner import execute_script, plan
+from merchantsguide.registry import Registry
+
+
+def _script(rng, n, history=False, ratios=False):
+    aliens = ["glob", "prok", "pish", "tegj"]
+    minerals = ["Gold", "Iron", "Silver"]
+    lines = []
+    for _ in range(n):
+        number = " ".join(rng.choices(aliens + ["flub"], weights=[5, 5, 5, 5, 1], k=rng.randint(1, 3)))
+        mineral = rng.choice(minerals)
+        lines.append(rng.choice([
+            f"{rng.choice(aliens)} is {rng.choice('IVXL')}",
+            f"{number} {mineral} is {rng.randint(1, 100)} Credits",
+            f"{number} {mineral} is {rng.randint(1, 100)} Credits",
+            f"how much is {number} ?",
+            f"how many Credits is {number} {mineral} ?",
+            "which are the 2 most valuable minerals ?",
+            "which minerals cost between 5 and 50 Credits ?",
+            f"how many Credits was {number} {mineral} at update {rng.randint(0, n)} ?" if history else "nonsense",
+            f"{number} {mineral} is {rng.choice(aliens)} {rng.choice(minerals)}" if ratios else "nonsense"
+        ]))
+    return "\n".join(lines) + "\n"
+
+
+def test_batch_matches_stream():
+    rng = random.Random(3)
+    for i in range(200):
+        script = _script(rng, rng.randint(1, 40), history=i % 4 == 0, ratios=i % 4 == 1)
+        eager, batch = Registry.new(), Registry.new()
+        expected, out = io.StringIO(), io.StringIO()
+        Merchant(eager).run_stream(io.StringIO(script), expected)
+        Merchant(batch).run_batch(io.StringIO(script), out)
+        assert out.getvalue() == expected.getvalue(), script
+        assert batch.alien_numerals == eager.alien_numerals and batch.roman_numerals == eager.roman_numerals
+        assert batch.mineral_prices == eager.mineral_prices
+        if i % 4 == 0:
+            # nothing is deferred if the price history is queried
+            assert batch.price_updates == eager.price_updates
+
+
+def test_dead_numeral_updates():
+    script = [parse_input(line) for line in ["glob is I", "prok is V", "glob is X", "how much is glob ?",
+                                             "prok is L", "glob is C"]]
+    live = plan(script)
+    assert [cmd.roman_numeral for cmd in live if isinstance(cmd, NumeralUpdateCommand)] == ["X", "L", "C"]
+
+
+def test_dead_mineral_updates():
+    r = Registry.new()
+    lines = ["glob is I", "glob Gold is 10 Credits", "glob Gold is 20 Credits", "flub Gold is 30 Credits",
+             "how many Credits is glob Gold ?", "glob Gold is 40 Credits"]
+    assert execute_script([parse_input(line) for line in lines], r) == \
+        ["Unknown alien numeral 'flub'", "glob Gold is 20 Credits"]
+    assert r.get_mineral('Gold') == 40
+    # the overwritten price was never applied
+    assert r.price_updates == 2
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from merchantsguide import commands
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import set_backend, DEFAULT_BACKEND
+from merchantsguide.profiling import Histogram, Profiler
+from merchantsguide.registry import Registry
+from merchantsguide.tenants import TenantMerchant, Tenants
+
+LINES = ["glob is I", "prok is V", "glob glob Silver is 34 Credits", "how much is prok glob ?",
+         "how many Credits is glob prok Silver ?", "how much is prok glob ?", "foo"]
+
+
+def test_histogram():
+    h = Histogram()
+    assert h.percentile(50) == 0
+    for elapsed in [1, 2, 3, 100, 1000]:
+        h.record(elapsed, elapsed)
+    summary = h.to_dict()
+    assert (summary["count"], summary["total_ns"], summary["min_ns"], summary["max_ns"]) == (5, 1106, 1, 1000)
+    assert summary["buckets"] == [[1, 1], [3, 2], [127, 1], [1023, 1]]
+    assert (h.percentile(50), h.percentile(80), h.percentile(100)) == (3, 127, 1000)
+
+
+def test_profiler(tmp_path, capsys):
+    original = Registry.get_numeral, commands.roman2int, Merchant.single_command
+    profiler = Profiler()
+    profiler.enable()
+    try:
+        with pytest.raises(ValueError):
+            profiler.enable()
+        set_backend("grammar")
+        m = Merchant(Registry.new())
+        responses = [m.single_command(line) for line in LINES]
+    finally:
+        profiler.disable()
+        set_backend(DEFAULT_BACKEND)
+    assert (Registry.get_numeral, commands.roman2int, Merchant.single_command) == original
+    assert responses == [None, None, None, "prok glob is 6", "glob prok Silver is 68 Credits", "prok glob is 6",
+                         "I have no idea what you are talking about"]
+
+    report = profiler.report()
+    counts = {stage: summary["count"] for stage, summary in report["stages"].items()}
+    assert counts["single_command"] == 7
+    assert counts["parse"] == counts["grammar.parse"] == 6
+    # the visitor is recursive, but only the outermost call is counted
+    assert counts["grammar.visit"] == 5
+    assert counts["execute.NumeralUpdateCommand"] == 2
+    assert counts["execute.NumberQueryCommand"] == 2
+    assert counts["execute.UnknownCommand"] == 1
+    assert counts["roman2int"] == 3
+    assert counts["parse_input"] == 7
+    assert set(report["parse_cache"]) == {"hits", "misses", "evictions", "maxsize", "currsize"}
+
+    stage = report["stages"]["single_command"]
+    assert stage["total_ns"] >= report["stages"]["parse_input"]["total_ns"]
+    assert 0 <= stage["self_ns"] <= stage["total_ns"]
+
+    # nothing is recorded while the profiler is disabled
+    m.single_command("how much is glob ?")
+    stages = report["stages"]
+    report = profiler.report()
+    assert report["stages"] == stages
+
+    profiler.dump(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f) == report
+    profiler.dump()
+    assert json.loads(capsys.readouterr().err) == report
+
+    profiler.reset()
+    assert profiler.report()["stages"]["single_command"]["count"] == 0
+
+
+def test_profiler_covers_streams_and_tenants():
+    profiler = Profiler()
+    profiler.enable()
+    try:
+        Merchant(Registry.new()).run_stream(io.StringIO("".join(f"{line}\n" for line in LINES)), io.StringIO())
+        TenantMerchant(Tenants()).run_stream(io.StringIO("@desk glob is I\n@desk\nhow much is glob ?\n"), io.StringIO())
+    finally:
+        profiler.disable()
+
+    counts = {stage: summary["count"] for stage, summary in profiler.report()["stages"].items()}
+    assert counts["single_command"] == len(LINES) + 3
+    assert counts["parse_input"] == len(LINES) + 2
+    assert counts["execute.NumberQueryCommand"] == 3
@@ -0,0 +1,288 @@
+import pickle
+import random
+from fractions import Fraction
+
+import pytest
+
+from merchantsguide.commands import NumeralUpdateCommand, NumberQueryCommand
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+
+
+def test_default_is_shared():
+    assert Registry.default() is Registry.default()
+    assert Registry() is Registry.default()
+    assert Merchant().registry is Registry.default()
+    assert Registry.new() is not Registry.new()
+    with pytest.raises(TypeError):
+        Registry(16)
+
+
+def test_registries_are_independent():
+    a, b = Registry.new(), Registry.new()
+    NumeralUpdateCommand('bork', 'I').execute(a)
+    NumeralUpdateCommand('bork', 'V').execute(b)
+    assert NumberQueryCommand(['bork']).execute(a) == "bork is 1"
+    assert NumberQueryCommand(['bork']).execute(b) == "bork is 5"
+
+    m = Merchant(Registry.new())
+    m.single_command("bork is X")
+    assert m.single_command("how much is bork ?") == "bork is 10"
+    assert a.get_numeral('bork') == 'I'
+
+
+def test_snapshot_is_copy_on_write():
+    r = Registry.new()
+    r.update_numeral('bork', 'I')
+    r.update_mineral('Iron', 5)
+
+    s = r.snapshot()
+    assert s.alien_numerals is r.alien_numerals
+    assert s.mineral_prices is r.mineral_prices
+
+    # writing to the original copies the written table only
+    r.update_numeral('bork', 'V')
+    assert s.alien_numerals is not r.alien_numerals
+    assert s.mineral_prices is r.mineral_prices
+    assert s.get_numeral('bork') == 'I'
+    assert NumberQueryCommand(['bork']).execute(s) == "bork is 1"
+
+    # and vice versa
+    s.update_mineral('Iron', 7)
+    assert r.get_mineral('Iron') == 5
+    assert s.get_mineral('Iron') == 7
+
+    # snapshots of snapshots
+    t = s.snapshot()
+    s.reset()
+    assert t.get_numeral('bork') == 'I'
+
+
+def test_dumps_leaves_tables_unshared():
+    r = Registry.new()
+    r.update_numeral('bork', 'I')
+    r.update_mineral('Iron', 5)
+    prices = r.mineral_prices
+
+    copy = pickle.loads(r.dumps())
+    r.update_mineral('Iron', 7)
+    assert r.mineral_prices is prices
+    assert copy.get_mineral('Iron') == 5 and copy.get_numeral('bork') == 'I'
+
+
+def test_int2alien():
+    r = Registry.new()
+    for alien, roman in [('glob', 'I'), ('prok', 'V'), ('pish', 'X'), ('tegj', 'L')]:
+        r.update_numeral(alien, roman)
+    assert r.int2alien(42) == "pish tegj glob glob"
+    assert r.int2alien(0) == ""
+    assert r.int2alien_many([4, 42, 4]) == ["glob prok", "pish tegj glob glob", "glob prok"]
+    with pytest.raises(ValueError) as e:
+        r.int2alien(100)
+    assert str(e.value) == "No alien numeral for Roman numeral 'C'"
+    with pytest.raises(ValueError) as e:
+        r.int2alien_many([1, 100])
+    assert str(e.value) == "No alien numeral for Roman numeral 'C'"
+    with pytest.raises(ValueError) as e:
+        r.int2alien_many([1, -1])
+    assert str(e.value) == "Cannot represent -1 as Roman numerals"
+
+    # the alphabetically first of several alien numerals is used
+    r.update_numeral('blurp', 'I')
+    assert r.int2alien(2) == "blurp blurp"
+    r.update_numeral('blurp', 'C')
+    assert r.int2alien(102) == "blurp glob glob"
+    r.update_numeral('glob', 'M')
+    with pytest.raises(ValueError):
+        r.int2alien(1)
+    assert r.roman_numerals == {'V': 'prok', 'X': 'pish', 'L': 'tegj', 'C': 'blurp', 'M': 'glob'}
+
+    # encoding agrees with decoding
+    r.update_numeral('zork', 'D')
+    r.update_numeral('flim', 'I')
+    m = Merchant(r)
+    for n, alien in enumerate(r.int2alien_many(range(1, 4000)), 1):
+        assert m.single_command(f"how much is {alien} ?") == f"{alien} is {n}"
+
+    r.reset()
+    assert r.roman_numerals == {}
+    with pytest.raises(ValueError):
+        r.int2alien(1)
+
+
+def test_int2alien_snapshot():
+    r = Registry.new()
+    r.update_numeral('glob', 'I')
+    assert r.int2alien(3) == "glob glob glob"
+    s = r.snapshot()
+    r.update_numeral('blurp', 'I')
+    assert r.int2alien(3) == "blurp blurp blurp"
+    assert s.int2alien(3) == "glob glob glob"
+    s.update_numeral('glob', 'V')
+    assert s.int2alien(5) == "glob"
+    assert r.int2alien(1) == "blurp"
+
+
+def test_price_history():
+    r = Registry.new()
+    for mineral, price in [('Gold', 10), ('Iron', 1), ('Gold', Fraction(41, 2)), ('Gold', 5), ('Iron', 2)]:
+        r.update_mineral(mineral, price)
+    assert r.price_updates == 5
+    assert r.get_unit_price_at('Gold', 1) == r.get_unit_price_at('Gold', 2) == (10, 1)
+    assert r.get_unit_price_at('Gold', 3) == (41, 2)
+    assert r.get_unit_price_at('Gold', 100) == r.get_unit_price('Gold') == (5, 1)
+    assert r.get_unit_price_range('Gold', 2, 3) == ((10, 1), (41, 2))
+    assert r.get_unit_price_range('Gold', 0, 5) == ((5, 1), (41, 2))
+    assert r.get_unit_price_range('Iron', 2, 4) == ((1, 1), (1, 1))
+    for f, args in [(r.get_unit_price_at, ('Iron', 1)), (r.get_unit_price_at, ('Lead', 1)),
+                    (r.get_unit_price_range, ('Iron', 0, 1)), (r.get_unit_price_range, ('Gold', 3, 2))]:
+        with pytest.raises(ValueError):
+            f(*args)
+
+    # snapshots share the histories, but don't see each other's updates
+    s = r.snapshot()
+    r.update_mineral('Gold', 1)
+    s.update_mineral('Gold', 100)
+    assert r.get_unit_price_range('Gold', 1, 6) == ((1, 1), (41, 2))
+    assert s.get_unit_price_range('Gold', 1, 6) == ((5, 1), (100, 1))
+    assert r.price_history['Iron'][0] is s.price_history['Iron'][0]
+
+    r.reset()
+    assert r.price_updates == 0 and not r.price_history
+    assert s.get_unit_price_at('Gold', 1) == (10, 1)
+
+
+def test_price_history_range_index():
+    rng = random.Random(7)
+    r = Registry.new()
+    prices = []
+    for _ in range(1000):
+        price = Fraction(rng.randint(1, 10 ** 6), rng.randint(1, 100))
+        r.update_mineral('Gold', price)
+        prices.append(price)
+        if rng.random() < 0.05:
+            start = rng.randint(1, len(prices))
+            end = rng.randint(start, len(prices))
+            low, high = r.get_unit_price_range('Gold', start, end)
+            assert Fraction(*low) == min(prices[start - 1:end]) and Fraction(*high) == max(prices[start - 1:end])
+
+
+def test_price_index(monkeypatch):
+    # small buckets, so that buckets are split and emptied
+    monkeypatch.setattr('merchantsguide.price_index.BUCKET_SIZE', 4)
+    rng = random.Random(11)
+    r = Registry.new()
+    minerals = [f"M{i:03}" for i in range(200)]
+    snapshot = None
+    for i in range(3000):
+        r.update_mineral(rng.choice(minerals), Fraction(rng.randint(1, 50), rng.randint(1, 3)))
+        if i == 1000:
+            # the index is built from the prices set so far, and then updated
+            assert len(r.get_most_valuable(0)) == 0
+        if i == 2000:
+            snapshot = r.snapshot()
+            expected = sorted(r.mineral_prices, key=lambda m: (r.get_mineral(m), m))
+        if i >= 1000 and rng.random() < 0.05:
+            ranked = sorted(r.mineral_prices, key=lambda m: (r.get_mineral(m), m))
+            k = rng.randint(0, 20)
+            assert r.get_least_valuable(k) == ranked[:k]
+            assert r.get_most_valuable(k) == ranked[::-1][:k]
+            low, high = sorted([rng.randint(0, 60), rng.randint(0, 60)])
+            assert r.get_minerals_between(low, high) == [m for m in ranked if low <= r.get_mineral(m) <= high]
+
+    # the snapshot's index didn't see the later updates
+    assert snapshot.get_least_valuable(len(minerals)) == expected
+    assert r.get_minerals_between(60, 61) == [] and r.get_minerals_between(2, 1) == []
+
+
+def test_price_ratios():
+    r = Registry.new()
+    r.update_ratio('Silver', 'Gold', Fraction(1, 4))
+    with pytest.raises(ValueError):
+        r.get_unit_price('Silver')
+    r.update_mineral('Gold', 20)
+    r.update_ratio('Iron', 'Silver', Fraction(1, 5))
+    assert r.get_unit_price('Silver') == (5, 1) and r.get_unit_price('Iron') == (1, 1)
+    # consistent ratios are accepted, contradicting ones are rejected without any effect
+    r.update_ratio('Iron', 'Gold', Fraction(1, 20))
+    with pytest.raises(ValueError):
+        r.update_ratio('Gold', 'Iron', 19)
+    assert r.price_ratios.ratio('Gold', 'Iron') == 20
+
+    # the mineral priced last anchors its set, but a mineral's own price takes precedence
+    r.update_mineral('Iron', 2)
+    assert r.get_unit_price('Silver') == (10, 1) and r.get_unit_price('Gold') == (20, 1)
+    # a mineral joining a set anchors it if it was priced later than the anchor
+    r.update_mineral('Lead', 3)
+    r.update_ratio('Lead', 'Copper', 3)
+    # ratios between minerals of different sets must agree with their prices
+    with pytest.raises(ValueError):
+        r.update_ratio('Copper', 'Gold', Fraction(1, 30))
+    r.update_ratio('Copper', 'Gold', Fraction(1, 20))
+    assert r.get_unit_price('Silver') == (5, 1) and r.get_unit_price('Copper') == (1, 1)
+
+    s = r.snapshot()
+    r.update_ratio('Tin', 'Lead', 2)
+    s.update_mineral('Gold', 40)
+    assert r.get_unit_price('Tin') == (6, 1) and r.get_unit_price('Silver') == (5, 1)
+    assert s.get_unit_price('Silver') == (10, 1)
+    with pytest.raises(ValueError):
+        s.get_unit_price('Tin')
+    r.reset()
+    assert not r.price_ratios and s.get_unit_price('Copper') == (2, 1)
+
+
+def test_price_ratios_agree_with_prices():
+    r = Registry.new()
+    r.update_mineral('Gold', 100)
+    r.update_mineral('Silver', 50)
+    with pytest.raises(ValueError, match="Gold is worth 2 Silver, not 1"):
+        r.update_ratio('Gold', 'Silver', 1)
+    assert not r.price_ratios
+    r.update_ratio('Gold', 'Silver', 2)
+
+    # prices through ratios count as well
+    r.update_mineral('Iron', 10)
+    r.update_ratio('Tin', 'Iron', 3)
+    with pytest.raises(ValueError, match="Tin is worth 3/5 Silver, not 1"):
+        r.update_ratio('Tin', 'Silver', 1)
+    r.update_ratio('Silver', 'Tin', Fraction(5, 3))
+    assert r.get_unit_price('Tin') == (30, 1) and r.get_unit_price('Gold') == (100, 1)
+
+
+def test_price_ratios_random():
+    rng = random.Random(5)
+    r = Registry.new()
+    minerals = [f"M{i:03}" for i in range(300)]
+    # the known ratios between minerals, and their true values, which all prices and ratios agree with
+    edges = {m: [] for m in minerals}
+    values = {m: Fraction(rng.randint(1, 100), rng.randint(1, 10)) for m in minerals}
+    priced = {}
+    for i in range(3000):
+        a, b = rng.sample(minerals, 2)
+        if rng.random() < 0.1:
+            r.update_mineral(a, values[a])
+            priced[a] = i
+        else:
+            if r.price_ratios.ratio(a, b) is not None and rng.random() < 0.2:
+                with pytest.raises(ValueError):
+                    r.update_ratio(a, b, values[a] / values[b] * 2)
+                continue
+            ratio = values[a] / values[b]
+            r.update_ratio(a, b, ratio)
+            edges[a].append(b)
+            edges[b].append(a)
+        if rng.random() < 0.05:
+            m = rng.choice(minerals)
+            # search the minerals connected by ratios
+            seen, todo = {m}, [m]
+            while todo:
+                for n in edges[todo.pop()]:
+                    if n not in seen:
+                        seen.add(n)
+                        todo.append(n)
+            if m in priced or any(n in priced for n in seen):
+                assert r.get_mineral(m) == values[m]
+            else:
+                with pytest.raises(ValueError):
+                    r.get_unit_price(m)
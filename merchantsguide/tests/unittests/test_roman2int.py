@@ -1,6 +1,11 @@
+import itertools
+import random
+
 import pytest
 
-from merchantsguide.roman2int import roman2int
+from merchantsguide.roman2int import fold_roman, roman2int, roman2int_folded, roman2int_grammar, roman2int_indexed
+from merchantsguide.roman2int import int2roman, int2roman_many
+from merchantsguide.roman2int import roman2int_many, alien2int_many
 
 
 def test_invalid_inputs():
@@ -27,3 +32,138 @@ def test_valid_inputs():
     for l in lines:
         i, o = l.strip().split(" ")
         assert roman2int(i) == int(o)
+
+
+def _valid_numerals():
+    """
+    Generate all valid Roman numerals < 4000, i.e. all combinations of the decimal places.
+    """
+    thousands = ["", "M", "MM", "MMM"]
+    hundreds = ["", "C", "CC", "CCC", "CD", "D", "DC", "DCC", "DCCC", "CM"]
+    tens = ["", "X", "XX", "XXX", "XL", "L", "LX", "LXX", "LXXX", "XC"]
+    ones = ["", "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX"]
+    for t in thousands:
+        for h in hundreds:
+            for te in tens:
+                for o in ones:
+                    yield t + h + te + o
+
+
+def _assert_agree(s):
+    try:
+        expected = roman2int_grammar(s)
+    except ValueError as e:
+        with pytest.raises(ValueError) as actual:
+            roman2int(s)
+        assert str(actual.value) == str(e)
+    else:
+        assert roman2int(s) == expected
+
+
+def test_grammar_agrees_on_valid_numerals():
+    numerals = list(_valid_numerals())
+    assert max(map(len, numerals)) == 15
+    for value, s in enumerate(numerals):
+        assert roman2int(s) == roman2int_grammar(s) == value
+
+
+def test_grammar_agrees_on_short_strings():
+    # every string of at most four numerals
+    for length in range(5):
+        for chars in itertools.product("IVXLCDM", repeat=length):
+            _assert_agree("".join(chars))
+
+
+def test_grammar_agrees_on_random_strings():
+    rng = random.Random(4000)
+    numerals = list(_valid_numerals())
+
+    # random strings of up to 15 characters, mostly Roman numerals
+    for _ in range(2000):
+        length = rng.randint(0, 15)
+        _assert_agree("".join(rng.choice("IVXLCDMMCCXXI iv?") for _ in range(length)))
+
+    # valid numerals with a single character inserted, deleted or replaced
+    for _ in range(2000):
+        s = rng.choice(numerals)
+        i = rng.randint(0, len(s))
+        c = rng.choice("IVXLCDM")
+        _assert_agree((s[:i] + c + s[i:])[:15])
+        _assert_agree(s[:i] + s[i + 1:])
+        _assert_agree(s[:i] + c + s[i + 1:])
+
+
+def test_folded():
+    aliens = dict(zip("IVXLCDM", ["glob", "prok", "pish", "tegj", "blurp", "zork", "flim"]))
+    numerals = {alien: roman for roman, alien in aliens.items()}
+    for value, s in enumerate(_valid_numerals()):
+        assert roman2int_folded([aliens[c] for c in s], numerals) == value
+    # symbols may also stand for several Roman numerals
+    assert roman2int_folded(["MC", "M", "IV"], {"MC": "MC", "M": "M", "IV": "IV"}) == 1904
+
+    for symbols in [["glob", "glob", "glob", "glob"], ["glob", "flub"], ["prok", "prok"]]:
+        with pytest.raises(ValueError) as e:
+            roman2int_folded(symbols, numerals)
+        assert str(e.value) == f"Could not parse input '{' '.join(symbols)}' as Roman numerals"
+        assert fold_roman(symbols, numerals) is None
+    # folding stops at the first invalid numeral
+    assert fold_roman(iter(["glob"] * 4 + [[]]), numerals) is None
+
+
+def test_index():
+    for value, s in enumerate(_valid_numerals()):
+        assert roman2int_indexed(s) == value
+        assert int2roman(value) == s
+
+    # invalid strings fall through to the usual error
+    for s in ["IIII", "MIMI", "I I", "iv"]:
+        with pytest.raises(ValueError) as e:
+            roman2int_indexed(s)
+        assert str(e.value) == f"Could not parse input '{s}' as Roman numerals"
+
+    with pytest.raises(ValueError):
+        int2roman(4000)
+    with pytest.raises(ValueError):
+        int2roman(-1)
+
+    assert int2roman_many([1, 4, 0, 3999]) == ["I", "IV", "", "MMMCMXCIX"]
+    assert int2roman_many([]) == []
+    with pytest.raises(ValueError) as e:
+        int2roman_many([1, 4000, 2])
+    assert str(e.value) == "Cannot represent 4000 as Roman numerals"
+
+
+def test_roman2int_many():
+    np = pytest.importorskip("numpy")
+    numerals = list(_valid_numerals())
+    values, invalid = roman2int_many(numerals)
+    assert values.tolist() == list(range(4000))
+    assert len(invalid) == 0
+
+    strings = ["XLII", "IIII", "", "MIMI", "IX", "I I", "IC", "MMMM", "ix", "XIIX"]
+    values, invalid = roman2int_many(np.array(strings))
+    assert values.tolist() == [42, -1, 0, -1, 9, -1, -1, -1, -1, -1]
+    assert invalid.tolist() == [1, 3, 5, 6, 7, 8, 9]
+
+    # agrees with roman2int on random strings
+    rng = random.Random(11)
+    strings = ["".join(rng.choices("IVXLCDM", k=rng.randint(0, 6))) for _ in range(5000)]
+    values, invalid = roman2int_many(strings)
+    for s, value in zip(strings, values.tolist()):
+        try:
+            assert roman2int(s) == value
+        except ValueError:
+            assert value == -1
+    assert len(invalid) == values.tolist().count(-1)
+
+
+def test_alien2int_many():
+    pytest.importorskip("numpy")
+    numerals = {'glob': 'I', 'prok': 'V', 'pish': 'X', 'tegj': 'L'}
+    numbers = [['pish', 'tegj', 'glob', 'glob'], "glob prok", ['glob', 'blurp'], "prok prok", "pish tegj glob glob"]
+    values, invalid = alien2int_many(numbers, numerals)
+    assert values.tolist() == [42, 4, -1, -1, 42]
+    assert invalid.tolist() == [2, 3]
+
+    values, invalid = alien2int_many([], numerals)
+    assert len(values) == len(invalid) == 0
@@ -0,0 +1,102 @@
+import multiprocessing
+
+import pytest
+
+from merchantsguide.commands import BaseCommand
+from merchantsguide.merchant import Merchant
+from merchantsguide.parse_input import parse_input
+from merchantsguide.shared import SharedRegistry, SharedRegistryView, SharedTables
+
+
+@pytest.fixture
+def registry():
+    registry = SharedRegistry(SharedTables.create(capacity=64, arena_size=1024))
+    yield registry
+    registry.tables.close()
+    registry.tables.unlink()
+
+
+@pytest.fixture
+def view(registry):
+    view = SharedRegistryView(SharedTables.attach(registry.tables.name))
+    yield view
+    view.tables.close()
+
+
+def test_view_answers_like_registry(registry, view):
+    with open('merchantsguide/tests/end2end/trace_1_in', 'r') as f:
+        lines = [line.strip() for line in f]
+    m = Merchant(registry)
+    for line in lines + ["glob Iron is 7 Credits", "which are the 2 least valuable minerals ?",
+                         "which minerals cost between 10 and 20 Credits ?", "nil is ", "how much is nil glob ?"]:
+        cmd = parse_input(line)
+        if "?" in line:
+            assert view.execute(cmd) == m.single_command(line), line
+        else:
+            m.single_command(line)
+    assert view.execute(parse_input("how many Credits was glob Iron at update 1 ?")) == \
+        "The price history is not shared"
+    with pytest.raises(ValueError):
+        view.execute(parse_input("glob is V"))
+    assert m.single_command("glob Bronze is glob Gold") == "Relative prices cannot be shared"
+    assert view.execute(parse_input("glob Bronze is glob Gold")) == "A view of a shared registry is read-only"
+
+
+def test_updates_are_visible(registry, view):
+    cmd = parse_input("how many Credits is glob Gold ?")
+    assert view.execute(cmd) == "Unknown alien numeral 'glob'"
+    registry.update_numeral('glob', 'I')
+    assert view.execute(cmd) == "Unknown mineral 'Gold'"
+    registry.update_mineral('Gold', 5)
+    assert view.execute(cmd) == "glob Gold is 5 Credits"
+    # cached values of alien numbers are invalidated by numeral updates
+    registry.update_numeral('glob', 'V')
+    assert view.execute(cmd) == "glob Gold is 25 Credits"
+    registry.update_mineral('Gold', 2 ** 70)
+    assert view.execute(cmd) == "The price of mineral 'Gold' is too large to be shared"
+    registry.reset()
+    assert view.execute(cmd) == "Unknown alien numeral 'glob'"
+
+
+def test_torn_reads_are_retried(registry, view):
+    registry.update_numeral('glob', 'I')
+
+    class Racy(BaseCommand):
+        calls = 0
+
+        def execute(self, r=None):
+            # the writer updates the numeral while the command reads it
+            Racy.calls += 1
+            if Racy.calls == 1:
+                registry.update_numeral('glob', 'X')
+            return r.get_numeral('glob')
+
+    assert view.execute(Racy()) == 'X'
+    assert view.retries == 1
+
+
+def test_full(registry):
+    with pytest.raises(ValueError, match="full"):
+        for i in range(100):
+            registry.update_numeral(f'glob{i}', 'I')
+    tables = SharedTables.create(capacity=4, arena_size=4)
+    with pytest.raises(ValueError):
+        SharedRegistry(tables).update_mineral('Unobtainium', 1)
+    tables.close()
+    tables.unlink()
+
+
+def _read(name, queue):
+    view = SharedRegistryView(SharedTables.attach(name))
+    queue.put(view.execute(parse_input("how many Credits is glob glob Silver ?")))
+    view.tables.close()
+
+
+def test_other_process(registry):
+    Merchant(registry).single_command("glob is I")
+    Merchant(registry).single_command("glob glob Silver is 34 Credits")
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_read, args=(registry.tables.name, queue))
+    process.start()
+    assert queue.get(timeout=30) == "glob glob Silver is 34 Credits"
+    process.join()
@@ -0,0 +1,155 @@
+import os
+
+import pytest
+
+from merchantsguide.merchant import Merchant
+from merchantsguide.registry import Registry
+from merchantsguide.store import RegistryStore, SNAPSHOT, JOURNAL
+
+
+def _state(registry):
+    return registry.alien_numerals, registry.mineral_prices
+
+
+def test_journal_is_replayed(tmp_path):
+    store = RegistryStore(tmp_path, sync=False)
+    m = Merchant(store.load())
+    for line in ["glob is I", "prok is V", "glob glob Silver is 34 Credits", "prok is X"]:
+        m.single_command(line)
+    store.close()
+    assert not os.path.exists(tmp_path / SNAPSHOT)
+
+    registry = RegistryStore(tmp_path).load()
+    assert _state(registry) == ({'glob': 'I', 'prok': 'X'}, {'Silver': (17, 1)})
+    assert Merchant(registry).single_command("how much is prok glob ?") == "prok glob is 11"
+
+
+def test_compaction(tmp_path):
+    store = RegistryStore(tmp_path, sync=False, compact_every=3)
+    registry = store.load()
+    registry.update_numeral('glob', 'I')
+    registry.update_numeral('prok', 'V')
+    registry.update_mineral('Gold', 5.5)
+    assert os.path.getsize(tmp_path / JOURNAL) == 0
+    registry.reset()
+    registry.update_numeral('pish', 'X')
+    expected = ({'pish': 'X'}, {})
+    assert _state(registry) == expected
+    store.close(registry)
+    assert os.path.getsize(tmp_path / JOURNAL) == 0
+
+    registry = RegistryStore(tmp_path).load()
+    assert _state(registry) == expected
+    assert registry.int2alien(20) == "pish pish"
+
+
+def test_read_only_session_keeps_snapshot(tmp_path):
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    registry.update_numeral('glob', 'I')
+    store.close(registry)
+    stat = os.stat(tmp_path / SNAPSHOT)
+
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    assert Merchant(registry).single_command("how much is glob glob ?") == "glob glob is 2"
+    store.close(registry)
+    assert os.stat(tmp_path / SNAPSHOT).st_ino == stat.st_ino
+    assert os.stat(tmp_path / SNAPSHOT).st_mtime_ns == stat.st_mtime_ns
+    assert os.path.getsize(tmp_path / JOURNAL) == 0
+
+
+def test_price_history_is_persisted(tmp_path):
+    store = RegistryStore(tmp_path, sync=False, compact_every=4)
+    registry = store.load()
+    for price in [10, 2 ** 70, 30, 20, 40]:
+        registry.update_mineral('Gold', price)
+    registry.update_mineral('Iron', 1)
+    store.close()
+
+    registry = RegistryStore(tmp_path).load()
+    assert registry.price_updates == 6
+    assert registry.get_unit_price_at('Gold', 3) == (30, 1)
+    assert registry.get_unit_price_range('Gold', 1, 6) == ((10, 1), (2 ** 70, 1))
+    assert registry.get_unit_price_at('Iron', 6) == (1, 1)
+
+
+def test_price_ratios_are_persisted(tmp_path):
+    store = RegistryStore(tmp_path, sync=False, compact_every=3)
+    registry = store.load()
+    registry.update_mineral('Gold', 10)
+    registry.update_ratio('Silver', 'Gold', 0.5)
+    registry.update_ratio('Iron', 'Silver', 3)
+    registry.update_ratio('Bronze', 'Iron', 2)
+    with pytest.raises(ValueError):
+        registry.update_ratio('Bronze', 'Gold', 7)
+    store.close()
+
+    registry = RegistryStore(tmp_path).load()
+    assert registry.get_unit_price('Bronze') == (30, 1)
+    registry.update_mineral('Iron', 3)
+    assert registry.get_unit_price('Silver') == (1, 1)
+
+
+def test_snapshots_are_not_journaled(tmp_path):
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    registry.update_numeral('glob', 'I')
+    snapshot = registry.snapshot()
+    assert type(snapshot) is Registry
+    snapshot.update_numeral('glob', 'V')
+    store.close()
+    assert _state(RegistryStore(tmp_path).load()) == ({'glob': 'I'}, {})
+
+
+def test_crash_recovery(tmp_path):
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    registry.update_numeral('glob', 'I')
+    registry.update_numeral('prok', 'V')
+    registry.update_numeral('glob', 'X')
+
+    # crash after the snapshot was replaced, but before the journal was truncated
+    with open(tmp_path / JOURNAL, "rb") as f:
+        journal = f.read()
+    store.compact(registry)
+    store.close()
+    with open(tmp_path / JOURNAL, "wb") as f:
+        # ... and while the next entry was being written
+        f.write(journal + b'["numeral", "pi')
+
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    assert _state(registry) == ({'glob': 'X', 'prok': 'V'}, {})
+
+    # the torn entry is discarded
+    registry.update_numeral('tegj', 'L')
+    store.close()
+    assert _state(RegistryStore(tmp_path).load()) == ({'glob': 'X', 'prok': 'V', 'tegj': 'L'}, {})
+
+
+def test_crash_recovery_does_not_replay_price_updates(tmp_path):
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    registry.update_mineral('Gold', 10)
+    registry.update_mineral('Gold', 20)
+
+    # crash after the snapshot was replaced, but before the journal was truncated
+    with open(tmp_path / JOURNAL, "rb") as f:
+        journal = f.read()
+    store.compact(registry)
+    store.close()
+    with open(tmp_path / JOURNAL, "wb") as f:
+        f.write(journal)
+
+    store = RegistryStore(tmp_path, sync=False)
+    registry = store.load()
+    assert registry.price_updates == 2
+    assert registry.get_unit_price_range('Gold', 1, 2) == ((10, 1), (20, 1))
+    registry.update_mineral('Gold', 30)
+    store.close()
+
+    registry = RegistryStore(tmp_path).load()
+    assert registry.price_updates == 3
+    assert registry.get_unit_price_at('Gold', 2) == (20, 1) and registry.get_unit_price_at('Gold', 3) == (30, 1)
+    assert len(registry.price_history['Gold'][0]) == 3
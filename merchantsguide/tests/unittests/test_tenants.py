@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from merchantsguide.registry import Registry
+from merchantsguide.tenants import TenantMerchant, Tenants, DEFAULT_TENANT
+
+
+def test_tenants_are_isolated():
+    template = Registry.new()
+    template.update_numeral('glob', 'I')
+    tenants = Tenants(template)
+    assert len(tenants) == 0 and 'a' not in tenants
+
+    # new tenants start from the template, sharing its tables until they update them
+    a, b = tenants['a'], tenants['b']
+    assert a is tenants['a'] and sorted(tenants) == ['a', 'b']
+    assert a.alien_numerals is b.alien_numerals is template.alien_numerals
+    a.update_numeral('glob', 'V')
+    b.update_mineral('Iron', 3)
+    assert a.get_numeral('glob') == 'V' and b.get_numeral('glob') == template.get_numeral('glob') == 'I'
+    assert 'Iron' not in a.mineral_prices and 'Iron' not in template.mineral_prices
+
+    tenants.remove('a')
+    assert 'a' not in tenants
+    with pytest.raises(ValueError):
+        tenants.remove('a')
+
+
+def test_share_numerals():
+    tenants = Tenants()
+    for name in ['a', 'b', 'c']:
+        tenants[name].update_numeral('glob', 'I')
+        tenants[name].update_numeral('prok', 'V')
+    tenants['c'].update_numeral('pish', 'X')
+    assert tenants['a'].int2alien(4) == 'glob prok'
+
+    assert tenants.share_numerals() == 1
+    a, b, c = tenants['a'], tenants['b'], tenants['c']
+    assert b.alien_numerals is a.alien_numerals and b.roman_numerals is a.roman_numerals
+    assert c.alien_numerals is not a.alien_numerals
+    assert tenants.share_numerals() == 0
+    assert b.int2alien(6) == 'prok glob'
+
+    # shared tables are copied on update
+    b.update_numeral('glob', 'X')
+    assert a.get_numeral('glob') == 'I' and b.get_numeral('glob') == 'X'
+    assert a.int2alien(4) == 'glob prok' and b.int2alien(15) == 'glob prok'
+
+    with pytest.raises(ValueError):
+        a.share_numerals(c)
+
+
+def test_tenant_merchant():
+    tenants = Tenants()
+    m = TenantMerchant(tenants)
+    assert m.tenant == DEFAULT_TENANT
+    assert m.single_command("glob is I") is None
+    assert m.single_command("@desk glob is V") is None
+    assert m.single_command("how much is glob ?") == "glob is 1"
+    assert m.single_command("@desk how much is glob ?") == "glob is 5"
+    assert m.registry is tenants[DEFAULT_TENANT]
+
+    # select a tenant for the following commands
+    assert m.single_command("@desk") is None
+    assert m.registry is tenants['desk']
+    assert m.single_command("how much is glob ?") == "glob is 5"
+    assert m.single_command(f"@{DEFAULT_TENANT} how much is glob glob ?") == "glob glob is 2"
+    assert m.single_command("@ how much is glob ?") == "I have no idea what you are talking about"
+
+    # sessions select tenants independently
+    assert TenantMerchant(tenants).single_command("how much is glob ?") == "glob is 1"
+
+    # only updates create tenants, queries of unknown tenants are answered by the template
+    assert m.single_command("@nobody how much is glob ?") == "Unknown alien numeral 'glob'"
+    assert m.single_command("@nobody") is None
+    assert m.single_command("how many Credits is glob Iron ?") == "Unknown alien numeral 'glob'"
+    assert sorted(tenants) == [DEFAULT_TENANT, 'desk']
+
+    out = io.StringIO()
+    TenantMerchant(tenants).run_stream(io.StringIO("@other glob is X\n@other\nhow much is glob ?\n@desk\n"
+                                                   "how much is glob ?\n"), out)
+    assert out.getvalue() == "glob is 10\nglob is 5\n"
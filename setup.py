@@ -10,7 +10,9 @@ setup(
     author_email='gavin.luedemann@gmail.com',
     description='Merchan\'t Guide to the Galaxy',
     install_requires=[
-        'parsimonious~=0.8.1',
-        'singleton-decorator~=1.0.0'
-    ]
+        'parsimonious~=0.8.1'
+    ],
+    extras_require={
+        'numpy': ['numpy']
+    }
 )